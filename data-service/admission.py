@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Lower runs first; scheduled jobs use "low" so API triggers are never stuck behind them
+LANES = {"high": 0, "normal": 1, "low": 2}
+
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "20"))
+# Deferred jobs in progress (mostly waiting on batches), and how long one waits for a slot to crawl in
+MAX_DEFERRED_JOBS = int(os.getenv("MAX_DEFERRED_JOBS", "20"))
+SLOT_MAX_WAIT_SECONDS = float(os.getenv("SLOT_MAX_WAIT_SECONDS", "3600"))
+# Deferred jobs last as long as their batches, so a rejected one is told to come back later
+DEFERRED_RETRY_AFTER_SECONDS = 600
+
+
+class QueueFull(Exception):
+    """The job queue is saturated; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Job queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class SlotUnavailable(Exception):
+    """No slot was granted within run_in_slot's max_wait."""
+
+
+@dataclass(order=True)
+class QueuedJob:
+    sort_key: tuple[int, int]
+    job_id: str = field(compare=False)
+    lane: str = field(compare=False)
+    run: Callable[[], Awaitable[None]] = field(compare=False)
+    done: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class JobQueue:
+    """
+    Admission control for generation jobs.
+
+    At most max_concurrent jobs run at once; the rest wait in a bounded priority
+    queue (by lane, then FIFO). The low lane only gets half the queue, so
+    background work cannot crowd out triggered jobs. Deferred jobs start at once,
+    up to max_deferred of them, and take a slot only for the parts that need one.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_JOBS,
+        max_pending: int = MAX_PENDING_JOBS,
+        max_deferred: int = MAX_DEFERRED_JOBS
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.max_deferred = max_deferred
+        self._deferred: dict[str, asyncio.Task] = {}
+        self._heap: list[QueuedJob] = []
+        self._running: dict[str, float] = {}  # job_id -> started (monotonic)
+        self._seq = itertools.count()
+        self._waits: deque[float] = deque(maxlen=100)
+        self._durations: deque[float] = deque(maxlen=50)
+        self.rejected = 0
+
+    def submit(self, job_id: str, run: Callable[[], Awaitable[None]], lane: str = "normal") -> asyncio.Future:
+        """Queue a job, or raise QueueFull. The returned future resolves when the job finishes."""
+        limit = self.max_pending // 2 if lane == "low" else self.max_pending
+        if len(self._heap) >= limit:
+            self.rejected += 1
+            raise QueueFull(self.retry_after())
+
+        job = QueuedJob(
+            sort_key=(LANES[lane], next(self._seq)),
+            job_id=job_id,
+            lane=lane,
+            run=run,
+            done=asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._heap, job)
+        self._dispatch()
+        return job.done
+
+    def start_deferred(self, job_id: str, run: Callable[[], Awaitable[None]]) -> asyncio.Future:
+        """Start a deferred job now, or raise QueueFull when max_deferred are already in progress."""
+        if len(self._deferred) >= self.max_deferred:
+            self.rejected += 1
+            raise QueueFull(DEFERRED_RETRY_AFTER_SECONDS)
+        task = asyncio.create_task(self._run_deferred(job_id, run))
+        self._deferred[job_id] = task
+        return task
+
+    async def _run_deferred(self, job_id: str, run: Callable[[], Awaitable[None]]) -> None:
+        try:
+            await run()
+        except Exception as e:
+            logger.error(f"[Job {job_id}] Crashed: {type(e).__name__}: {e}")
+        finally:
+            self._deferred.pop(job_id, None)
+
+    async def run_in_slot(
+        self,
+        job_id: str,
+        run: Callable[[], Awaitable[T]],
+        lane: str = "normal",
+        max_wait: float = SLOT_MAX_WAIT_SECONDS
+    ) -> T:
+        """
+        Run part of a job while holding a slot, in the caller's task (and context).
+        For jobs that need a slot only some of the time; a full queue is retried after
+        retry_after. Raises SlotUnavailable if no slot is granted within max_wait.
+        """
+        granted = asyncio.Event()
+        finished = asyncio.Event()
+        deadline = time.monotonic() + max_wait
+
+        async def hold() -> None:
+            granted.set()
+            await finished.wait()
+
+        while True:
+            try:
+                self.submit(job_id, hold, lane=lane)
+                break
+            except QueueFull as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SlotUnavailable(f"Job queue still full after {max_wait:.0f}s")
+                logger.info(f"[Job {job_id}] Queue full, retrying in {min(e.retry_after, remaining):.0f}s")
+                await asyncio.sleep(min(e.retry_after, remaining))
+        try:
+            try:
+                await asyncio.wait_for(granted.wait(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                raise SlotUnavailable(f"No job slot granted within {max_wait:.0f}s") from None
+            return await run()
+        finally:
+            if not granted.is_set():
+                self._withdraw(hold)
+            finished.set()
+
+    def position(self, job_id: str) -> int | None:
+        """1-based place in the queue, or None if the job is not waiting."""
+        for i, job in enumerate(sorted(self._heap)):
+            if job.job_id == job_id:
+                return i + 1
+        return None
+
+    def _withdraw(self, run: Callable[[], Awaitable[None]]) -> None:
+        """Drop a job that is still waiting, identified by its run callable."""
+        self._heap = [job for job in self._heap if job.run is not run]
+        heapq.heapify(self._heap)
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up."""
+        avg = sum(self._durations) / len(self._durations) if self._durations else 60.0
+        waves = (len(self._heap) + 1) / max(self.max_concurrent, 1)
+        return int(min(max(math.ceil(avg * waves), 5), 600))
+
+    def _dispatch(self) -> None:
+        while self._heap and len(self._running) < self.max_concurrent:
+            job = heapq.heappop(self._heap)
+            wait = time.monotonic() - job.enqueued_at
+            self._waits.append(wait)
+            self._running[job.job_id] = time.monotonic()
+            logger.info(f"[Job {job.job_id}] Dispatched from {job.lane} lane after {wait:.1f}s in queue")
+            asyncio.create_task(self._run(job))
+
+    async def _run(self, job: QueuedJob) -> None:
+        try:
+            await job.run()
+        except Exception as e:
+            logger.error(f"[Job {job.job_id}] Crashed: {type(e).__name__}: {e}")
+        finally:
+            self._durations.append(time.monotonic() - self._running.pop(job.job_id))
+            if not job.done.done():
+                job.done.set_result(None)
+            self._dispatch()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        waits = sorted(self._waits)
+        return {
+            "running": len(self._running),
+            "max_concurrent": self.max_concurrent,
+            "pending": len(self._heap),
+            "max_pending": self.max_pending,
+            "pending_by_lane": {lane: sum(j.lane == lane for j in self._heap) for lane in LANES},
+            "oldest_pending_seconds": round(max((now - j.enqueued_at for j in self._heap), default=0.0), 1),
+            "wait_avg_seconds": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_p95_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+            "deferred": len(self._deferred),
+            "max_deferred": self.max_deferred,
+            "rejected": self.rejected,
+        }
+
+
+# Process-wide queue for /generate-markets, bulk jobs and schedules
+job_queue = JobQueue()
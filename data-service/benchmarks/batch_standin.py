@@ -0,0 +1,191 @@
+"""
+Local stand-in for an OpenAI-compatible Batch API, for running deferred jobs without a provider.
+
+Usage (from data-service/):
+    python -m benchmarks.batch_standin --port 8100 --delay 30
+    BATCH_API_BASE_URL=http://localhost:8100/v1 BATCH_POLL_SECONDS=5 uvicorn main:app
+
+Serves the files and batches endpoints the service uses, keeping everything in memory.
+A batch is "validating", then "in_progress" for --delay seconds, then answered line by
+line: by default with canned responses (link selections pick the first links offered,
+chunks get one market per page), or with --upstream by sending each request to the
+chat completions API as a regular call (OPENAI_API_KEY / OPENAI_BASE_URL).
+"""
+import argparse
+import asyncio
+import email
+import json
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+
+app = FastAPI(title="Batch API stand-in")
+
+files: dict[str, bytes] = {}
+batches: dict[str, dict] = {}
+settings = {"delay": 30.0, "upstream": False}
+
+PAGE_HEADER = re.compile(r"^--- PAGE: (\S+) ---$", re.M)
+
+
+def canned_content(body: dict) -> str:
+    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    if "selected_urls" in prompt:
+        urls = [line.split('"url": "')[1].rstrip('",') for line in prompt.splitlines() if '"url": "' in line]
+        return json.dumps({"selected_urls": urls[:3]})
+    now = datetime.now(timezone.utc)
+    markets = [
+        {
+            "question": f"Will the event reported at {url} happen by {(now + timedelta(days=7)):%B %d}?",
+            "description": f"Stand-in market for {url}.",
+            "source_url": url,
+            "category": "news",
+            "betting_closes_at": (now + timedelta(days=6)).isoformat(),
+            "resolves_at": (now + timedelta(days=7)).isoformat(),
+            "resolution_context": "Resolved from the linked article.",
+        }
+        for url in PAGE_HEADER.findall(prompt)
+    ]
+    return json.dumps({"markets": markets})
+
+
+async def complete(body: dict) -> dict:
+    if settings["upstream"]:
+        from openai import AsyncOpenAI
+        response = await AsyncOpenAI().chat.completions.create(**body)
+        return response.model_dump()
+    content = canned_content(body)
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4,
+        },
+    }
+
+
+async def process(batch: dict) -> None:
+    await asyncio.sleep(min(1.0, settings["delay"]))
+    batch.update(status="in_progress", in_progress_at=int(time.time()))
+    await asyncio.sleep(settings["delay"])
+    if batch["status"] != "in_progress":
+        return
+
+    output, failures = [], []
+    for raw in files[batch["input_file_id"]].decode().splitlines():
+        if not raw.strip():
+            continue
+        line = json.loads(raw)
+        try:
+            response = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": await complete(line["body"])}
+            output.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line["custom_id"], "response": response, "error": None})
+            batch["request_counts"]["completed"] += 1
+        except Exception as e:
+            error = {"code": type(e).__name__, "message": str(e)}
+            failures.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line["custom_id"], "response": None, "error": error})
+            batch["request_counts"]["failed"] += 1
+
+    for key, lines in (("output_file_id", output), ("error_file_id", failures)):
+        if lines:
+            file_id = f"file-{uuid.uuid4().hex[:12]}"
+            files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode()
+            batch[key] = file_id
+    batch.update(status="completed", completed_at=int(time.time()))
+
+
+@app.post("/v1/files")
+async def upload_file(request: Request):
+    # Parsed by hand so the stand-in needs nothing beyond the service's own dependencies
+    header = f"Content-Type: {request.headers['content-type']}\r\n\r\n".encode()
+    message = email.message_from_bytes(header + await request.body())
+    parts = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+    if "file" not in parts:
+        raise HTTPException(status_code=400, detail="file is required")
+    content = parts["file"].get_payload(decode=True)
+    file_id = f"file-{uuid.uuid4().hex[:12]}"
+    files[file_id] = content
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": parts["file"].get_filename(),
+        "purpose": parts["purpose"].get_payload(decode=True).decode() if "purpose" in parts else "batch",
+    }
+
+
+@app.get("/v1/files/{file_id}/content")
+async def file_content(file_id: str):
+    if file_id not in files:
+        raise HTTPException(status_code=404, detail="No such file")
+    return Response(files[file_id], media_type="application/jsonl")
+
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    params = await request.json()
+    if params.get("input_file_id") not in files:
+        raise HTTPException(status_code=400, detail="Unknown input_file_id")
+    total = sum(1 for line in files[params["input_file_id"]].splitlines() if line.strip())
+    batch = {
+        "id": f"batch_{uuid.uuid4().hex[:12]}",
+        "object": "batch",
+        "endpoint": params.get("endpoint"),
+        "errors": None,
+        "input_file_id": params["input_file_id"],
+        "completion_window": params.get("completion_window", "24h"),
+        "status": "validating",
+        "output_file_id": None,
+        "error_file_id": None,
+        "created_at": int(time.time()),
+        "in_progress_at": None,
+        "completed_at": None,
+        "request_counts": {"total": total, "completed": 0, "failed": 0},
+        "metadata": params.get("metadata") or {},
+    }
+    batches[batch["id"]] = batch
+    asyncio.create_task(process(batch))
+    return batch
+
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    if batch_id not in batches:
+        raise HTTPException(status_code=404, detail="No such batch")
+    return batches[batch_id]
+
+
+@app.post("/v1/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str):
+    if batch_id not in batches:
+        raise HTTPException(status_code=404, detail="No such batch")
+    if batches[batch_id]["status"] in ("validating", "in_progress"):
+        batches[batch_id]["status"] = "cancelled"
+    return batches[batch_id]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--delay", type=float, default=30.0, help="Seconds a batch stays in_progress")
+    parser.add_argument("--upstream", action="store_true", help="Answer requests with the real chat completions API")
+    args = parser.parse_args()
+    settings.update(delay=args.delay, upstream=args.upstream)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
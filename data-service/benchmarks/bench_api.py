@@ -0,0 +1,239 @@
+"""
+API responsiveness under concurrent job load, with fake origins and a fake LLM.
+
+Usage (from data-service/):
+    python -m benchmarks.bench_api --duration 30 --users 20 --background-jobs 4 \
+        --mix health=5,sources=2,job_status=4,generate=1
+
+The ASGI app is driven in-process (httpx.ASGITransport) while generation jobs crawl
+local fake origins (httpx.MockTransport, with latency) and call a fake LLM, all on
+the same event loop. Reports per-endpoint latency percentiles and error rates plus
+event-loop lag, as one JSON object. --max-p95-ms / --max-lag-ms make the run exit
+non-zero when exceeded, so it can gate regressions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import types
+
+from benchmarks.bench_memory import FakeCompletions, make_html
+
+ENDPOINTS = ("health", "sources", "job_status", "generate")
+
+
+class SlowCompletions(FakeCompletions):
+    """The memory benchmark's fake LLM, with a response delay."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.delay * random.uniform(0.5, 1.5))
+        return await super().create(**kwargs)
+
+
+def fake_origins(page_kb: int, latency: float):
+    import httpx
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+        return httpx.Response(200, html=make_html(str(request.url), page_kb))
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 1),
+        "p95_ms": round(pick(0.95) * 1000, 1),
+        "p99_ms": round(pick(0.99) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+async def monitor_loop_lag(samples: list[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    """Record how late a short sleep wakes up; anything blocking the loop shows up here."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - started - interval, 0.0))
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+
+    import crawler.http
+    import main
+    from sources import SOURCES, DataSource
+
+    # Bench sources crawl the fake origins without JS and answer to the fake LLM
+    for i in range(args.sources):
+        SOURCES[f"bench{i}"] = DataSource(
+            id=f"bench{i}",
+            seed_url=f"https://origin{i}.test/news",
+            category="news",
+            prompt="{current_date}\n{corpus}",
+            max_links_to_scrape=args.pages,
+        )
+    crawler.http._client = fake_origins(args.page_kb, args.origin_latency)
+    main.openai_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=SlowCompletions(args.llm_latency)))
+
+    async def no_oracle(markets, errors) -> None:
+        return None
+
+    main.post_to_oracle = no_oracle
+
+    weights = parse_mix(args.mix)
+    latencies: dict[str, list[float]] = {name: [] for name in weights}
+    outcomes: dict[str, dict[str, int]] = {name: {"ok": 0, "rejected": 0, "errors": 0} for name in weights}
+    job_ids: list[str] = []
+    lag: list[float] = []
+    stop = asyncio.Event()
+
+    def job_request() -> dict:
+        return {"source_ids": [f"bench{random.randrange(args.sources)}"], "target_count": 3}
+
+    async def call(client: httpx.AsyncClient, name: str) -> None:
+        if name == "job_status" and not job_ids:
+            name = "health"
+        started = time.perf_counter()
+        try:
+            if name == "health":
+                response = await client.get("/health")
+            elif name == "sources":
+                response = await client.get("/sources")
+            elif name == "job_status":
+                response = await client.get(f"/jobs/{random.choice(job_ids)}")
+            else:
+                response = await client.post("/generate-markets", json=job_request())
+                if response.status_code == 202:
+                    job_ids.append(response.json()["job_id"])
+        except Exception:
+            outcomes[name]["errors"] += 1
+            return
+        latencies[name].append(time.perf_counter() - started)
+        if response.status_code == 429:
+            outcomes[name]["rejected"] += 1
+        elif response.status_code >= 400:
+            outcomes[name]["errors"] += 1
+        else:
+            outcomes[name]["ok"] += 1
+
+    async def user(client: httpx.AsyncClient, deadline: float) -> None:
+        names, counts = zip(*weights.items())
+        while time.perf_counter() < deadline:
+            await call(client, random.choices(names, counts)[0])
+            await asyncio.sleep(args.think_ms / 1000)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        lag_task = asyncio.create_task(monitor_loop_lag(lag, stop))
+        for _ in range(args.background_jobs):
+            response = await client.post("/generate-markets", json=job_request())
+            if response.status_code == 202:
+                job_ids.append(response.json()["job_id"])
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(user(client, deadline) for _ in range(args.users)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+
+    completed = sum(1 for job_id in job_ids if main.jobs.get(job_id, {}).get("status") == "completed")
+    # Stop dispatching queued jobs and cancel the running ones, so the loop closes cleanly
+    main.job_queue.max_concurrent = 0
+    leftover = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in leftover:
+        task.cancel()
+    await asyncio.gather(*leftover, return_exceptions=True)
+
+    endpoints = {}
+    for name in weights:
+        total = sum(outcomes[name].values())
+        endpoints[name] = {
+            "requests": total,
+            "rps": round(total / elapsed, 1),
+            "error_rate": round(outcomes[name]["errors"] / total, 4) if total else 0.0,
+            "rejected": outcomes[name]["rejected"],
+            **percentiles(latencies[name]),
+        }
+    return {
+        "duration_s": round(elapsed, 1),
+        "users": args.users,
+        "mix": weights,
+        "jobs_started": len(job_ids),
+        "jobs_completed": completed,
+        "endpoints": endpoints,
+        "loop_lag": {"samples": len(lag), **percentiles(lag)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load after the background jobs start")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated API clients")
+    parser.add_argument("--mix", default="health=5,sources=2,job_status=4,generate=1")
+    parser.add_argument("--think-ms", type=float, default=50.0, help="Pause between a user's requests")
+    parser.add_argument("--background-jobs", type=int, default=4)
+    parser.add_argument("--sources", type=int, default=4, help="Fake origins (one bench source each)")
+    parser.add_argument("--pages", type=int, default=3, help="Articles crawled per job")
+    parser.add_argument("--page-kb", type=int, default=500)
+    parser.add_argument("--origin-latency", type=float, default=0.2, help="Mean fake origin response time (s)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Mean fake LLM response time (s)")
+    parser.add_argument("--max-concurrent-jobs", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if any endpoint's p95 exceeds this")
+    parser.add_argument("--max-lag-ms", type=float, help="Fail if event-loop lag p99 exceeds this")
+    args = parser.parse_args()
+
+    # Isolate the run: no archive, no state shared with other processes or earlier runs
+    os.environ.update({
+        "ARCHIVE_DIR": "",
+        "SHARED_CACHE_DB": "",
+        "FRONTIER_DB": ":memory:",
+        "LEASE_DB": ":memory:",
+        "SCHEDULER_ENABLED": "",
+        "MAX_CONCURRENT_JOBS": str(args.max_concurrent_jobs),
+    })
+    import logging
+    logging.disable(logging.CRITICAL)
+    random.seed(args.seed)
+
+    result = asyncio.run(run(args))
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+    failures = []
+    if args.max_p95_ms is not None:
+        failures += [
+            f"{name} p95 {stats['p95_ms']}ms > {args.max_p95_ms}ms"
+            for name, stats in result["endpoints"].items() if stats.get("p95_ms", 0) > args.max_p95_ms
+        ]
+    if args.max_lag_ms is not None and result["loop_lag"].get("p99_ms", 0) > args.max_lag_ms:
+        failures.append(f"loop lag p99 {result['loop_lag']['p99_ms']}ms > {args.max_lag_ms}ms")
+    if failures:
+        sys.stderr.write("\n".join(failures) + "\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Peak memory per crawl+generate job, with fake origins and a fake LLM.
+
+Usage (from data-service/):
+    python -m benchmarks.bench_memory --jobs 4 --pages 6 --page-kb 1500
+
+Each scenario runs in a fresh subprocess so ru_maxrss is the peak of that run only.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import sys
+import time
+import tracemalloc
+import types
+
+
+def make_html(url: str, size_kb: int) -> str:
+    """Synthetic news page: nav/sidebar noise around an <article> body."""
+    links = ''.join(
+        f'<li><a href="/news/story-{i}">Story {i} headline about fixtures</a></li>'
+        for i in range(200)
+    )
+    para = "<p>Enyimba host Rivers United on Sunday at 4pm in Aba in a top-of-table clash.</p>"
+    body = para * max(1, (size_kb * 1024) // len(para) // 2)
+    sidebar = "<div class='teaser'>" + para * max(1, (size_kb * 1024) // len(para) // 2) + "</div>"
+    return (
+        f"<html><head><title>{url}</title><script>var x = 1;</script></head><body>"
+        f"<nav><ul>{links}</ul></nav><aside>{sidebar}</aside>"
+        f"<article><h1>{url}</h1>{body}</article><footer>footer</footer></body></html>"
+    )
+
+
+class FakeCompletions:
+    async def create(self, **kwargs):
+        if kwargs.get("stream"):
+            async def events():
+                yield types.SimpleNamespace(
+                    choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content='{"markets": []}'))],
+                    usage=None,
+                )
+            return events()
+        content = kwargs["messages"][-1]["content"]
+        urls = [line.split('"url": "')[1].rstrip('",') for line in content.splitlines() if '"url": "' in line]
+        message = types.SimpleNamespace(content=json.dumps({"selected_urls": urls[:3]}))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def fake_client():
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=FakeCompletions()))
+
+
+def run_scenario(jobs: int, pages: int, page_kb: int, queue: multiprocessing.Queue) -> None:
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    import crawler
+    from crawler import guided_crawl, CrawlConfig
+    from generator import generate_markets
+
+    async def fake_fetch_page(client, url, referer=None, timeout=30, **kwargs):
+        return make_html(url, page_kb), url
+
+    real_sleep = asyncio.sleep
+
+    async def no_delay(_delay, *args, **kwargs):
+        await real_sleep(0)
+
+    crawler.fetch_page = fake_fetch_page
+    # Skip the crawler's politeness delay; only sleep is patched, the rest of asyncio is real
+    asyncio.sleep = no_delay
+
+    async def job(i: int) -> int:
+        config = CrawlConfig(seed_url=f"https://origin{i}.test/news", max_links_to_scrape=pages)
+        result = await guided_crawl(config, fake_client(), source_id=f"bench{i}")
+        await generate_markets(fake_client(), result.pages, "{current_date}\n{corpus}", 5)
+        return result.corpus_chars
+
+    async def main() -> int:
+        return sum(await asyncio.gather(*(job(i) for i in range(jobs))))
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    corpus_chars = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    queue.put({
+        "jobs": jobs,
+        "pages_per_job": pages,
+        "page_kb": page_kb,
+        "corpus_chars": corpus_chars,
+        "elapsed_s": round(elapsed, 2),
+        "peak_rss_mb": round(peak_rss / 1024, 1),
+        "rss_growth_per_job_mb": round((peak_rss - baseline_rss) / 1024 / jobs, 1),
+        "python_heap_peak_per_job_mb": round(py_peak / 1024 / 1024 / jobs, 1),
+    })
+
+
+def wait_for_result(proc: multiprocessing.Process, queue: multiprocessing.Queue, timeout: float) -> dict:
+    """The scenario's result; exits with the child's failure instead of waiting on a dead process."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if not proc.is_alive():
+                # It may have exited right after putting its result
+                try:
+                    return queue.get(timeout=1.0)
+                except queue_module.Empty:
+                    sys.exit(f"Scenario failed: child exited with code {proc.exitcode} (traceback above)")
+    proc.terminate()
+    sys.exit(f"Scenario timed out after {timeout:.0f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--page-kb", type=int, default=1500)
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds a scenario may run")
+    args = parser.parse_args()
+
+    # Isolate the run: no archive, no state shared with other processes or earlier runs
+    os.environ.update({"ARCHIVE_DIR": "", "SHARED_CACHE_DB": "", "FRONTIER_DB": ":memory:", "LEASE_DB": ":memory:"})
+    ctx = multiprocessing.get_context("spawn")
+    for jobs in args.jobs:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_scenario, args=(jobs, args.pages, args.page_kb, queue))
+        proc.start()
+        result = wait_for_result(proc, queue, args.timeout)
+        proc.join()
+        json.dump(result, sys.stdout)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,377 @@
 import asyncio
 import logging
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, AsyncIterator
 
-import httpx
-from openai import AsyncOpenAI
-
-from .config import CrawlConfig, CrawlResult
+from .archive import is_archiving, record_fetch, set_archive_source, take_fetch
+from .config import ArticlePage, CrawlConfig, CrawlResult, LinkInfo, PageSegment
+from .extraction import ExtractionProfile, container_cache, extraction_profile
+from .feeds import discover_from_feeds, robots_cache
+from .health import host_health
+from .prefetch import Prefetcher, rank_links, selection_history
+from .http import get_http_client
+from .frontier import CrawlBudget, CrawlFrontier, frontier_store, score_link
 from .fetcher import (
     fetch_page,
     fetch_page_js,
+    fetch_article_js,
+    extract_article,
     extract_links_with_context,
-    extract_article_content,
 )
 from generator.link_selector import select_links
+from generator.routing import model_router
+from shared_cache import cache_key, shared_cache
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
+# Minimum local link score for following a link beyond the AI-selected hop
+HOP_MIN_SCORE = 3.0
+
+# How long extraction results and link selections are shared with other workers
+EXTRACTION_CACHE_TTL_SECONDS = float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", "3600"))
+LINK_SELECTION_CACHE_TTL_SECONDS = 1800.0
+
 
 async def guided_crawl(
     config: CrawlConfig,
-    ai_client: AsyncOpenAI,
-    model: str = "gpt-4o-mini"
+    ai_client: "AsyncOpenAI",
+    source_id: str | None = None,
+    preselected: tuple[str, list[str]] | None = None
 ) -> CrawlResult:
+    """AI-guided crawl that collects every extracted page before returning."""
+    errors: list[str] = []
+    pages = [page async for page in iter_guided_crawl(config, ai_client, source_id, errors, preselected)]
+    return CrawlResult(pages=pages, errors=errors)
+
+
+async def iter_guided_crawl(
+    config: CrawlConfig,
+    ai_client: "AsyncOpenAI",
+    source_id: str | None = None,
+    errors: list[str] | None = None,
+    preselected: tuple[str, list[str]] | None = None
+) -> AsyncIterator[PageSegment]:
     """
     AI-guided crawl: fetch homepage -> AI selects links -> scrape articles.
+    Yields each page as soon as it is extracted; failed URLs are appended to errors.
+    
+    1. Discover article URLs: with discovery="feed", read RSS/sitemaps for items
+       newer than the last crawl; otherwise (or if feeds yield nothing) fetch the
+       seed page and let the AI select the best links not crawled recently
+    2. Crawl the frontier: discovered links first, then leftovers from earlier jobs and,
+       below max_depth, promising links found on fetched articles, until the budget is spent
     
-    1. Fetch seed URL
-    2. Extract all links with context
-    3. AI selects best links (up to max_links_to_scrape)
-    4. Fetch and extract article content from each selected link
+    preselected is a (seed URL, selected URLs) pair chosen ahead of time from seed_links()
+    (deferred jobs select links in a batch); it replaces the seed page fetch and selection.
     """
-    corpus_parts: list[str] = []
-    pages_visited: list[str] = []
-    errors: list[str] = []
+    errors = errors if errors is not None else []
+    set_archive_source(source_id)
+    frontier = await asyncio.to_thread(_frontier, config, source_id)
     
-    # Step 1: Fetch seed page
-    logger.info(f"Fetching seed URL: {config.seed_url}")
+    prefetcher = Prefetcher(lambda url, max_bytes: _fetch(config, url, config.seed_url, 1, max_bytes)) \
+        if config.prefetch_links else None
     
-    if config.use_javascript:
-        html, final_url = await fetch_page_js(
-            config.seed_url,
-            timeout=config.timeout_seconds,
-            wait_selector=config.wait_selector,
-            wait_timeout_ms=config.wait_timeout_ms
+    seed_url = config.seed_url
+    queued = 0
+    if config.discovery == "feed":
+        queued = await _discover_from_feeds(config, frontier)
+        if not queued:
+            logger.info("Feeds yielded no new articles, falling back to seed page")
+    
+    try:
+        if not queued and preselected is not None:
+            seed_url, selected_urls = preselected
+            _queue_selected(frontier, selected_urls)
+        elif not queued:
+            seed_url = await _discover_from_seed(config, ai_client, frontier, source_id, errors, prefetcher)
+            if seed_url is None:
+                return
+        
+        resumed = await asyncio.to_thread(frontier.resume)
+        if resumed:
+            logger.info(f"Resumed {resumed} frontier URLs from earlier crawls")
+        
+        if not len(frontier):
+            logger.warning("Nothing to crawl")
+            return
+        
+        # Fetch and extract article content from the frontier
+        try:
+            async for page in _crawl_frontier(config, frontier, seed_url, errors, prefetcher):
+                yield page
+        finally:
+            await asyncio.to_thread(frontier.save)
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+
+async def seed_links(
+    config: CrawlConfig,
+    source_id: str | None = None,
+    errors: list[str] | None = None
+) -> tuple[str, list[LinkInfo]] | None:
+    """
+    Fetch the seed page and return its final URL and the links not crawled recently, None if unreachable.
+    For selecting links out of band; pass the choice back as iter_guided_crawl(preselected=...).
+    """
+    set_archive_source(source_id)
+    frontier = await asyncio.to_thread(_frontier, config, source_id)
+    return await _fetch_seed_links(config, frontier, errors if errors is not None else [])
+
+
+def _frontier(config: CrawlConfig, source_id: str | None) -> CrawlFrontier:
+    """New frontier for a crawl; it loads the seen set from SQLite, so run it in a worker thread."""
+    return CrawlFrontier(
+        source_id or config.seed_url,
+        frontier_store,
+        CrawlBudget(
+            max_pages=config.max_pages or config.max_links_to_scrape,
+            max_bytes=config.max_bytes,
+            max_seconds=config.max_seconds
+        ),
+        max_depth=config.max_depth
+    )
+
+
+def _queue_selected(frontier: CrawlFrontier, selected_urls: list[str]) -> None:
+    for rank, url in enumerate(selected_urls):
+        frontier.push(url, depth=1, priority=100 - rank)
+
+
+async def _discover_from_feeds(config: CrawlConfig, frontier: CrawlFrontier) -> int:
+    """
+    Queue articles announced by RSS/Atom feeds or sitemaps since the last checkpoint.
+    No page rendering and no LLM call; robots.txt is honoured. Returns URLs queued.
+    """
+    checkpoint = await asyncio.to_thread(frontier_store.get_feed_checkpoint, frontier.source_id)
+    since = datetime.fromtimestamp(checkpoint, timezone.utc) if checkpoint else None
+    
+    client = get_http_client()
+    items = await discover_from_feeds(client, config.feed_urls, config.seed_url, since, robots_cache)
+    newest = max((item.published for item in items if item.published), default=None)
+    items = [
+        item for item in items
+        if not frontier.is_seen(item.url) and await robots_cache.can_fetch(client, item.url)
+    ]
+    
+    # Event keywords first, newest first among equals (items arrive newest first)
+    queued = 0
+    for rank, item in enumerate(items):
+        score = score_link(LinkInfo(url=item.url, text=item.title, context=item.summary))
+        queued += frontier.push(item.url, depth=1, priority=100 + score - rank / len(items))
+    
+    if newest:
+        await asyncio.to_thread(frontier_store.set_feed_checkpoint, frontier.source_id, newest.timestamp())
+    logger.info(f"Queued {queued} feed articles published since {since or 'the beginning'}")
+    return queued
+
+
+async def _discover_from_seed(
+    config: CrawlConfig,
+    ai_client: "AsyncOpenAI",
+    frontier: CrawlFrontier,
+    source_id: str | None,
+    errors: list[str],
+    prefetcher: Prefetcher | None = None
+) -> str | None:
+    """
+    Fetch the seed page and queue the AI-selected links. Returns the final seed URL, None if unreachable.
+    With a prefetcher, the likeliest links are fetched while the selector is still choosing.
+    """
+    found = await _fetch_seed_links(config, frontier, errors)
+    if found is None:
+        return None
+    seed_url, links = found
+    if not links:
+        return seed_url
+    
+    if prefetcher:
+        ranked = rank_links(links, frontier.source_id, selection_history)
+        prefetcher.start([link.url for link in ranked[:config.prefetch_links]])
+    
+    # Another worker may have asked about the same seed page already
+    key = cache_key(seed_url, [(link.url, link.text) for link in links], config.max_links_to_scrape)
+    selected_urls = await asyncio.to_thread(shared_cache.get, "link_selection", key)
+    if selected_urls is None:
+        logger.info("AI selecting relevant links...")
+        selected_urls = await model_router.call(
+            "link_selection",
+            lambda model, timeout: select_links(
+                ai_client, links, seed_url, model=model, timeout=timeout, max_links=config.max_links_to_scrape
+            ),
+            source_id=source_id
         )
-    else:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            html, final_url = await fetch_page(
-                client,
-                config.seed_url,
-                timeout=config.timeout_seconds
-            )
+        # An empty selection is also what select_links returns on errors, so it is not shared
+        if selected_urls:
+            await asyncio.to_thread(shared_cache.set, "link_selection", key, selected_urls, LINK_SELECTION_CACHE_TTL_SECONDS)
+    logger.info(f"AI selected {len(selected_urls)} links for scraping")
+    selection_history.record(frontier.source_id, links, selected_urls)
+    if prefetcher:
+        prefetcher.keep(selected_urls)
+    _queue_selected(frontier, selected_urls)
+    return seed_url
+
+
+async def _fetch_seed_links(
+    config: CrawlConfig,
+    frontier: CrawlFrontier,
+    errors: list[str]
+) -> tuple[str, list[LinkInfo]] | None:
+    """The seed page's final URL and its links not crawled recently; None if unreachable."""
+    logger.info(f"Fetching seed URL: {config.seed_url}")
+    html, final_url = await _fetch(config, config.seed_url, None, 0)
     
     if html is None:
         logger.error(f"Failed to fetch seed URL: {config.seed_url}")
         errors.append(config.seed_url)
-        return CrawlResult(text_corpus="", pages_visited=[], errors=errors)
+        return None
     
     seed_url = final_url or config.seed_url
     
-    # Step 2: Extract all links with context
     logger.info("Extracting links with context...")
     links = extract_links_with_context(html, seed_url)
+    del html  # Release the seed HTML before the LLM round-trip
     logger.info(f"Found {len(links)} links on seed page")
     
+    links = [link for link in links if not frontier.is_seen(link.url)]
     if not links:
-        logger.warning("No links found on seed page")
-        return CrawlResult(text_corpus="", pages_visited=[], errors=[])
-    
-    # Step 3: AI selects best links
-    logger.info("AI selecting relevant links...")
-    selected_urls = await select_links(ai_client, links, seed_url, model=model)
-    
-    if not selected_urls:
-        logger.warning("AI did not select any links")
-        return CrawlResult(text_corpus="", pages_visited=[], errors=[])
+        logger.warning("No new links found on seed page")
+    return seed_url, links
+
+
+async def _fetch(
+    config: CrawlConfig,
+    url: str,
+    referer: str | None,
+    depth: int,
+    max_bytes: int | None = None
+) -> tuple[str | None, str | None]:
+    if config.use_javascript:
+        return await fetch_page_js(
+            url,
+            referer=referer,
+            timeout=config.timeout_seconds,
+            wait_selector=config.wait_selector,
+            wait_timeout_ms=config.wait_timeout_ms
+        )
+    return await fetch_page(
+        get_http_client(),
+        url,
+        referer=referer,
+        timeout=config.timeout_seconds,
+        max_bytes=min(max_bytes or config.max_page_bytes, config.max_page_bytes),
+        # Leaf pages are only read up to their article, when that is where the story is
+        stop_after_article=depth > 0 and depth >= config.max_depth and _story_in_first_article(config, url)
+    )
+
+
+def _story_in_first_article(config: CrawlConfig, url: str) -> bool:
+    """
+    Whether extraction reads the page's first <article>: the source has no content selector
+    and the container learned for this page pattern is a bare <article>. Until a container
+    is learned the whole page is read, so a teaser <article> can't cut the story off.
+    """
+    if config.content_selector:
+        return False
+    learned = container_cache.peek(url)
+    return learned is not None and learned.rsplit(" > ", 1)[-1] == "article"
+
+
+async def _fetch_article(
+    config: CrawlConfig,
+    url: str,
+    referer: str,
+    depth: int,
+    profile: ExtractionProfile | None,
+    prefetcher: Prefetcher | None = None
+) -> ArticlePage | None:
+    """
+    Fetch and extract one frontier page. With extract_in_page, JS pages never ship their DOM to Python.
+    Extraction results are shared with other workers. Pages fetched by an archiving job are cached
+    with their HTML, so a later archiving job can archive a cache hit without fetching it again.
+    """
+    with_links = depth < config.max_depth
+    prefetched = await prefetcher.take(url) if prefetcher else None
+    key = cache_key(url, profile, with_links)
+    archiving = is_archiving()
+    if prefetched is None and (cached := await asyncio.to_thread(shared_cache.get, "article", key)):
+        if not archiving:
+            logger.debug(f"Shared cache hit for article {url}")
+            return ArticlePage.from_dict(cached)
+        if cached.get("fetch"):
+            logger.debug(f"Shared cache hit for article {url}, archiving its cached HTML")
+            await record_fetch(url, **cached["fetch"])
+            return ArticlePage.from_dict(cached)
     
-    # Limit to configured max
-    selected_urls = selected_urls[:config.max_links_to_scrape]
-    logger.info(f"AI selected {len(selected_urls)} links for scraping")
+    if prefetched is None and config.use_javascript and config.extract_in_page:
+        article = await fetch_article_js(
+            url,
+            referer=referer,
+            timeout=config.timeout_seconds,
+            wait_selector=config.wait_selector,
+            wait_timeout_ms=config.wait_timeout_ms,
+            profile=profile,
+            with_links=with_links
+        )
+    else:
+        html, final_url = prefetched or await _fetch(config, url, referer, depth)
+        if html is None:
+            return None
+        # Parse off the event loop so in-flight LLM streams keep flowing
+        article = await asyncio.to_thread(extract_article, html, final_url or url, profile, with_links)
     
-    # Step 4: Fetch and extract article content from each
-    for url in selected_urls:
-        logger.info(f"Scraping article: {url}")
-        
-        if config.use_javascript:
-            page_html, page_final_url = await fetch_page_js(
-                url,
-                referer=seed_url,
-                timeout=config.timeout_seconds,
-                wait_selector=config.wait_selector,
-                wait_timeout_ms=config.wait_timeout_ms
-            )
-        else:
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                page_html, page_final_url = await fetch_page(
-                    client,
-                    url,
-                    referer=seed_url,
-                    timeout=config.timeout_seconds
-                )
+    fetch = take_fetch(url)
+    if article is not None:
+        entry = article.to_dict() | ({"fetch": fetch} if fetch else {})
+        await asyncio.to_thread(shared_cache.set, "article", key, entry, EXTRACTION_CACHE_TTL_SECONDS)
+    return article
+
+
+async def _crawl_frontier(
+    config: CrawlConfig,
+    frontier: CrawlFrontier,
+    seed_url: str,
+    errors: list[str],
+    prefetcher: Prefetcher | None = None
+) -> AsyncIterator[PageSegment]:
+    profile = extraction_profile(config.content_selector, tuple(config.noise_selectors))
+    while (entry := frontier.pop()) is not None:
+        url = entry.url
+        if host_health.is_open(url):
+            # Degraded origin: keep the URL for a later job instead of failing through the frontier
+            frontier.push(url, entry.depth, entry.priority, carried=True)
+            logger.warning(f"Circuit open for {url}, stopping crawl with {len(frontier)} URLs left")
+            break
+        logger.info(f"Scraping article (depth {entry.depth}): {url}")
         
-        if page_html is None:
+        article = await _fetch_article(config, url, seed_url, entry.depth, profile, prefetcher)
+        if article is None:
             logger.warning(f"Failed to fetch: {url}")
             errors.append(url)
             continue
         
-        content = extract_article_content(page_html)
-        if content:
-            actual_url = page_final_url or url
-            corpus_parts.append(f"--- PAGE: {actual_url} ---\n{content}")
-            pages_visited.append(actual_url)
-            logger.info(f"Extracted {len(content)} chars from {actual_url}")
+        frontier.mark_fetched(url, article.html_bytes, article.final_url)
+        
+        # Next hop: queue promising links from this page (no LLM call)
+        if entry.depth < config.max_depth:
+            queued = sum(
+                frontier.push(link.url, entry.depth + 1, score)
+                for link in article.links
+                if (score := score_link(link)) >= HOP_MIN_SCORE
+            )
+            logger.info(f"Queued {queued} of {len(article.links)} links for depth {entry.depth + 1}")
+        
+        if article.text:
+            logger.info(f"Extracted {len(article.text)} chars from {article.final_url}")
+            yield PageSegment(url=article.final_url, text=article.text, published=article.published)
         
         # Brief delay between requests
         await asyncio.sleep(0.5)
-    
-    return CrawlResult(
-        text_corpus='\n\n'.join(corpus_parts),
-        pages_visited=pages_visited,
-        errors=errors
-    )
 
 
-__all__ = ['guided_crawl', 'CrawlConfig', 'CrawlResult']
+__all__ = ['guided_crawl', 'iter_guided_crawl', 'seed_links', 'CrawlConfig', 'CrawlResult', 'LinkInfo', 'PageSegment']
@@ -0,0 +1,203 @@
+import asyncio
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+# Empty ARCHIVE_DIR disables archiving
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+COMPRESSION_LEVEL = 6
+
+
+@dataclass(slots=True)
+class ArchivedPage:
+    """Index entry for one archived fetch; the body lives in a zstd frame of `file`."""
+    job_id: str
+    source_id: str
+    url: str
+    final_url: str
+    status: int
+    fetched_at: float
+    file: str
+    offset: int
+    length: int
+
+
+class CrawlArchive:
+    """
+    Append-only, WARC-like archive of raw fetched pages.
+
+    Each page is one WARC response record compressed as its own zstd frame and
+    appended to a daily file, so a page can be read back from its offset without
+    decompressing the rest. A SQLite index maps job and source to records.
+    Appends take an exclusive file lock, so workers can share one directory.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    job_id TEXT, source_id TEXT, url TEXT, final_url TEXT, status INTEGER,
+                    fetched_at REAL, file TEXT, offset INTEGER, length INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS pages_by_job ON pages (job_id, source_id);
+            """)
+        return self._conn
+
+    def append(
+        self,
+        job_id: str,
+        source_id: str,
+        url: str,
+        final_url: str,
+        status: int,
+        headers: dict[str, str],
+        html: str
+    ) -> None:
+        fetched_at = time.time()
+        frame = self._compressor.compress(_warc_record(job_id, source_id, url, final_url, status, headers, html, fetched_at))
+        file = f"crawl-{datetime.fromtimestamp(fetched_at, timezone.utc):%Y%m%d}.warc.zst"
+
+        with self._lock:
+            conn = self._connect()
+            with open(os.path.join(self.directory, file), "ab") as f:
+                # Other workers append to the same daily file; the lock keeps offset and frame together
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(frame)
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            with conn:
+                conn.execute(
+                    "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, source_id, url, final_url, status, fetched_at, file, offset, len(frame))
+                )
+
+    def pages(self, job_id: str) -> list[ArchivedPage]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT * FROM pages WHERE job_id = ? ORDER BY rowid", (job_id,)
+            ).fetchall()
+        return [ArchivedPage(*row) for row in rows]
+
+    def read_html(self, page: ArchivedPage) -> str:
+        """Decompress one record and return its HTML body."""
+        with open(os.path.join(self.directory, page.file), "rb") as f:
+            f.seek(page.offset)
+            frame = f.read(page.length)
+        record = zstandard.ZstdDecompressor().decompress(frame)
+        # WARC headers, then the HTTP header block, then the body
+        _, _, http = record.partition(b"\r\n\r\n")
+        _, _, body = http.partition(b"\r\n\r\n")
+        return body.rstrip(b"\r\n").decode("utf-8")
+
+
+def _warc_record(
+    job_id: str,
+    source_id: str,
+    url: str,
+    final_url: str,
+    status: int,
+    headers: dict[str, str],
+    html: str,
+    fetched_at: float
+) -> bytes:
+    http_block = f"HTTP/1.1 {status}\r\n" + "".join(
+        f"{k}: {v}\r\n" for k, v in headers.items()
+        # The body is stored decoded as UTF-8, so transfer headers no longer apply
+        if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+    )
+    payload = (http_block + "\r\n").encode() + html.encode("utf-8")
+    warc_headers = (
+        "WARC/1.1\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"X-Final-URI: {final_url}\r\n"
+        f"X-Job-ID: {job_id}\r\n"
+        f"X-Source-ID: {source_id}\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+    )
+    return warc_headers.encode() + b"\r\n" + payload + b"\r\n\r\n"
+
+
+@dataclass(slots=True)
+class ArchiveRecorder:
+    """Tags fetches made by the current job (and source) for the archive."""
+    job_id: str
+    source_id: str = ""
+    # This job's fetches by URL, until the crawler takes them to cache alongside the extraction
+    fetches: dict[str, dict] = field(default_factory=dict)
+
+
+_recorder: ContextVar[ArchiveRecorder | None] = ContextVar("archive_recorder", default=None)
+
+
+def start_archive(job_id: str) -> None:
+    """Archive every page fetched by the current job task."""
+    if ARCHIVE_DIR:
+        _recorder.set(ArchiveRecorder(job_id))
+
+
+def set_archive_source(source_id: str | None) -> None:
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.source_id = source_id or ""
+
+
+def is_archiving() -> bool:
+    """Whether pages fetched by the current job are archived (and so need their full HTML)."""
+    return _recorder.get() is not None
+
+
+async def record_fetch(url: str, final_url: str, status: int, headers: dict[str, str], html: str) -> None:
+    """
+    Archive a fetched page if the current job is recording; never fails the fetch.
+    Compression, the file lock and the index insert run in a worker thread, off the event loop.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return
+    recorder.fetches[url] = {"final_url": final_url, "status": status, "headers": dict(headers), "html": html}
+    try:
+        await asyncio.to_thread(
+            crawl_archive.append, recorder.job_id, recorder.source_id, url, final_url, status, headers, html
+        )
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Failed to archive {url}: {e}")
+
+
+def take_fetch(url: str) -> dict | None:
+    """
+    The current job's archived fetch of url (final_url, status, headers, html), if any.
+    Cached with the page's extraction, it lets a later job archive a cache hit with record_fetch.
+    """
+    recorder = _recorder.get()
+    return recorder.fetches.pop(url, None) if recorder is not None else None
+
+
+# Process-wide archive
+crawl_archive = CrawlArchive(ARCHIVE_DIR)
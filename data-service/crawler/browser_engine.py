@@ -1,37 +1,176 @@
+import asyncio
 import logging
-from typing import ClassVar
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, ClassVar, TYPE_CHECKING
 
-from playwright.async_api import async_playwright, Browser, Playwright
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Playwright
 
 logger = logging.getLogger(__name__)
 
+# Browser processes in the farm (each Firefox runs its own renderer processes)
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+# Recycle a browser after this many renders; Firefox memory grows with every context it has hosted
+MAX_RENDERS = int(os.getenv("BROWSER_MAX_RENDERS", "200"))
+DRAIN_TIMEOUT_SECONDS = 30.0
+
+
+@dataclass
+class BrowserSlot:
+    """One browser process in the farm."""
+    index: int
+    browser: "Browser | None" = None
+    active: int = 0
+    renders: int = 0
+    total_renders: int = 0
+    crashes: int = 0
+    restarts: int = 0
+    started_at: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    on_disconnected: Callable | None = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    @property
+    def needs_recycle(self) -> bool:
+        return self.renders >= MAX_RENDERS
+
 
 class BrowserEngine:
-    """Manages a persistent browser instance for JavaScript rendering."""
-
-    _browser: ClassVar[Browser | None] = None
-    _playwright: ClassVar[Playwright | None] = None
-
-    @classmethod
-    async def get_browser(cls) -> Browser:
-        """Get or create the browser instance."""
-        if cls._browser is None:
-            logger.info("Starting Playwright Firefox browser...")
-            cls._playwright = await async_playwright().start()
-            cls._browser = await cls._playwright.firefox.launch(
-                headless=True,
-            )
-            logger.info("Playwright Firefox browser started")
-        return cls._browser
-
-    @classmethod
-    async def shutdown(cls) -> None:
-        """Close browser and stop Playwright."""
-        if cls._browser:
-            logger.info("Shutting down Playwright browser...")
-            await cls._browser.close()
-            cls._browser = None
+    """
+    Manages a farm of persistent browser instances for JavaScript rendering.
+
+    Renders go to the least-loaded browser. Browsers that crash or disconnect are
+    relaunched on the next acquire, and a browser is recycled once it has served
+    MAX_RENDERS renders and is idle. shutdown() drains in-flight renders first.
+    """
+
+    _slots: ClassVar[list[BrowserSlot]] = []
+    _playwright: ClassVar["Playwright | None"] = None
+    _start_lock: ClassVar[asyncio.Lock | None] = None
+    _draining: ClassVar[bool] = False
+
+    @classmethod
+    async def _ensure_started(cls) -> None:
+        if cls._start_lock is None:
+            cls._start_lock = asyncio.Lock()
+        async with cls._start_lock:
+            if cls._playwright is None:
+                # Imported on first use so processes that never render JS don't pay for it
+                from playwright.async_api import async_playwright
+                logger.info(f"Starting Playwright with a farm of {POOL_SIZE} Firefox browser(s)...")
+                cls._playwright = await async_playwright().start()
+                cls._slots = [BrowserSlot(index=i) for i in range(POOL_SIZE)]
+
+    @classmethod
+    async def _launch(cls, slot: BrowserSlot) -> None:
+        """(Re)start the browser in a slot. Caller holds slot.lock."""
+        if slot.browser is not None:
+            slot.restarts += 1
+            # A planned close (recycle, or cleanup after a crash) must not count as a crash
+            slot.browser.remove_listener("disconnected", slot.on_disconnected)
+            try:
+                await slot.browser.close()
+            except Exception as e:
+                logger.debug(f"Browser {slot.index} close failed: {e}")
+        slot.browser = await cls._playwright.firefox.launch(
+            headless=True,
+        )
+        slot.on_disconnected = lambda _: cls._on_disconnected(slot)
+        slot.browser.on("disconnected", slot.on_disconnected)
+        slot.renders = 0
+        slot.started_at = time.monotonic()
+        logger.info(f"Playwright Firefox browser {slot.index} started")
+
+    @classmethod
+    def _on_disconnected(cls, slot: BrowserSlot) -> None:
+        if not cls._draining:
+            slot.crashes += 1
+            logger.error(f"Browser {slot.index} disconnected, will relaunch on next use")
+
+    @classmethod
+    async def acquire(cls) -> BrowserSlot:
+        """Reserve the least-loaded browser, (re)launching it if needed. Pair with release()."""
+        if cls._draining:
+            raise RuntimeError("Browser farm is shutting down")
+        await cls._ensure_started()
+
+        # Least in-flight renders wins; browsers due for recycling only take work when
+        # every other one is busy. Unstarted or crashed slots are (re)launched below.
+        slot = min(cls._slots, key=lambda s: (s.needs_recycle, s.active))
+        slot.active += 1
+        try:
+            async with slot.lock:
+                if not slot.healthy or (slot.needs_recycle and slot.active == 1):
+                    await cls._launch(slot)
+        except Exception:
+            slot.active -= 1
+            raise
+        return slot
+
+    @classmethod
+    def release(cls, slot: BrowserSlot) -> None:
+        slot.active -= 1
+        slot.renders += 1
+        slot.total_renders += 1
+
+    @classmethod
+    async def warm_up(cls) -> None:
+        """Launch every browser and run stealth once in each, so the first JS render skips both."""
+        from playwright_stealth import stealth_async
+        await cls._ensure_started()
+        for slot in cls._slots:
+            async with slot.lock:
+                if not slot.healthy:
+                    await cls._launch(slot)
+                context = await slot.browser.new_context()
+                try:
+                    await stealth_async(await context.new_page())
+                finally:
+                    await context.close()
+
+    @classmethod
+    def metrics(cls) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "index": s.index,
+                "healthy": s.healthy,
+                "active": s.active,
+                "renders": s.renders,
+                "total_renders": s.total_renders,
+                "crashes": s.crashes,
+                "restarts": s.restarts,
+                "uptime_seconds": round(now - s.started_at) if s.browser else 0,
+            }
+            for s in cls._slots
+        ]
+
+    @classmethod
+    async def shutdown(cls, drain_timeout: float = DRAIN_TIMEOUT_SECONDS) -> None:
+        """Stop accepting renders, wait for in-flight ones, then close browsers and Playwright."""
+        cls._draining = True
+        deadline = time.monotonic() + drain_timeout
+        while any(s.active for s in cls._slots) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if any(s.active for s in cls._slots):
+            logger.warning(f"Closing browsers with {sum(s.active for s in cls._slots)} render(s) still in flight")
+
+        for slot in cls._slots:
+            if slot.browser:
+                logger.info(f"Shutting down Playwright browser {slot.index}...")
+                try:
+                    await slot.browser.close()
+                except Exception as e:
+                    logger.warning(f"Error closing browser {slot.index}: {e}")
+                slot.browser = None
+        cls._slots = []
         if cls._playwright:
             await cls._playwright.stop()
             cls._playwright = None
             logger.info("Playwright stopped")
+        cls._draining = False
@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class LinkInfo:
     """Link with context for AI selection."""
     url: str
@@ -17,10 +18,78 @@ class CrawlConfig:
     wait_selector: str | None = None
     wait_timeout_ms: int = 5000
     timeout_seconds: int = 30
+    max_depth: int = 1                  # 1 = seed -> articles; 2 also follows links found on articles
+    max_pages: int | None = None        # Page budget, defaults to max_links_to_scrape
+    max_bytes: int = 20_000_000         # HTML byte budget per crawl
+    max_page_bytes: int = 3_000_000     # Bytes read per page before truncating
+    max_seconds: float = 300.0          # Wall-clock budget per crawl
+    discovery: str = "seed"             # "seed": AI picks links on seed page; "feed": RSS/sitemap URLs
+    feed_urls: list[str] = field(default_factory=list)  # Empty in feed mode = sitemaps from robots.txt
+    content_selector: str | None = None  # CSS selector for the story container; learned per host if unset
+    noise_selectors: list[str] = field(default_factory=list)  # CSS selectors stripped before extraction
+    prefetch_links: int = 0             # Likely links fetched while the AI selector runs (seed discovery)
+    extract_in_page: bool = False       # JS sources: extract inside the browser instead of shipping the DOM
 
 
-@dataclass
+@dataclass(slots=True)
+class PageSegment:
+    """Extracted text of one crawled page. Chunks reference segments instead of copying them."""
+    url: str
+    text: str
+    published: datetime | None = None  # From JSON-LD/meta tags, when the page declares it
+
+    @property
+    def header(self) -> str:
+        return f"--- PAGE: {self.url} ---\n"
+
+    def __len__(self) -> int:
+        return len(self.header) + len(self.text)
+
+
+@dataclass(slots=True)
+class ArticlePage:
+    """A fetched frontier page after extraction; the HTML itself is not kept."""
+    final_url: str
+    text: str
+    links: list[LinkInfo]   # Only collected when the page's links will be followed
+    html_bytes: int
+    published: datetime | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "final_url": self.final_url,
+            "text": self.text,
+            "links": [[link.url, link.text, link.context] for link in self.links],
+            "html_bytes": self.html_bytes,
+            "published": self.published.isoformat() if self.published else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ArticlePage":
+        return cls(
+            final_url=data["final_url"],
+            text=data["text"],
+            links=[LinkInfo(url=url, text=text, context=context) for url, text, context in data["links"]],
+            html_bytes=data["html_bytes"],
+            published=datetime.fromisoformat(data["published"]) if data["published"] else None
+        )
+
+
+@dataclass(slots=True)
 class CrawlResult:
-    text_corpus: str
-    pages_visited: list[str]
+    pages: list[PageSegment]
     errors: list[str]
+
+    @property
+    def pages_visited(self) -> list[str]:
+        return [p.url for p in self.pages]
+
+    @property
+    def corpus_chars(self) -> int:
+        """Size of the joined corpus, without building it."""
+        return sum(len(p) for p in self.pages) + 2 * max(len(self.pages) - 1, 0)
+
+    @property
+    def text_corpus(self) -> str:
+        """Joined corpus. Builds a new string on every access; prefer pages."""
+        return '\n\n'.join(p.header + p.text for p in self.pages)
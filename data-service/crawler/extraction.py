@@ -0,0 +1,192 @@
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from .feeds import parse_date
+
+logger = logging.getLogger(__name__)
+
+# Minimum text a container must hold to be trusted over detection
+MIN_CONTAINER_CHARS = 200
+
+# Paragraph-like elements whose text is scored, and the minimum score to accept a container
+SCORED_TAGS = ['p', 'pre', 'blockquote']
+MIN_DETECTION_SCORE = 5.0
+
+POSITIVE_HINTS = re.compile(r"article|content|story|post|body|entry|text", re.I)
+NEGATIVE_HINTS = re.compile(r"comment|sidebar|related|footer|promo|teaser|share|social|advert|newsletter|nav", re.I)
+
+# Publish dates declared in JSON-LD, meta tags or <time>, in order of trust
+_PUBLISHED_NAMES = r"(?:article:published_time|og:published_time|datePublished|pubdate|publish-date|parsely-pub-date)"
+PUBLISHED_PATTERNS = [
+    re.compile(r'"datePublished"\s*:\s*"([^"]+)"'),
+    re.compile(rf'<meta[^>]+(?:property|name|itemprop)=["\']{_PUBLISHED_NAMES}["\'][^>]*content=["\']([^"\']+)', re.I),
+    re.compile(rf'<meta[^>]+content=["\']([^"\']+)["\'][^>]*(?:property|name|itemprop)=["\']{_PUBLISHED_NAMES}["\']', re.I),
+    re.compile(r'<time[^>]+datetime=["\']([^"\']+)', re.I),
+]
+
+
+@dataclass(frozen=True)
+class ExtractionProfile:
+    """Per-source extraction rules: where the story lives and what to strip from it."""
+    content_selector: str | None = None
+    noise_selectors: tuple[str, ...] = ()
+
+    @property
+    def compiled_content(self):
+        return compile_selector(self.content_selector) if self.content_selector else None
+
+    @property
+    def compiled_noise(self) -> list:
+        return [compile_selector(sel) for sel in self.noise_selectors]
+
+
+@lru_cache(maxsize=256)
+def compile_selector(selector: str):
+    """Compile a CSS selector once per process (soupsieve is imported with bs4, on first use)."""
+    import soupsieve
+    return soupsieve.compile(selector)
+
+
+@lru_cache(maxsize=64)
+def extraction_profile(content_selector: str | None, noise_selectors: tuple[str, ...] = ()) -> ExtractionProfile | None:
+    """Shared profile for a source's selectors, or None if it declares none."""
+    if not content_selector and not noise_selectors:
+        return None
+    return ExtractionProfile(content_selector, noise_selectors)
+
+
+def published_at(html: str) -> datetime | None:
+    """The page's declared publish date, found by pattern without parsing the document."""
+    for pattern in PUBLISHED_PATTERNS:
+        match = pattern.search(html)
+        if match and (published := parse_date(match.group(1))):
+            return published
+    return None
+
+
+def path_pattern(url: str) -> str:
+    """Coarse page template key: first path segment kept, numbers and slugs wildcarded."""
+    segments = [s for s in urlparse(url).path.split('/') if s]
+    if not segments:
+        return "/"
+    pattern = [segments[0] if not segments[0].isdigit() else "N"]
+    pattern += ["N" if s.isdigit() else "*" for s in segments[1:]]
+    return "/" + "/".join(pattern)
+
+
+class ContainerCache:
+    """Learned article-container selectors per (host, path pattern)."""
+
+    def __init__(self) -> None:
+        self._selectors: dict[tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str) -> tuple[str, str]:
+        return (urlparse(url).netloc.lower(), path_pattern(url))
+
+    def get(self, url: str) -> str | None:
+        selector = self._selectors.get(self.key(url))
+        with self._lock:
+            if selector:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return selector
+
+    def peek(self, url: str) -> str | None:
+        """The learned selector, without counting a hit or miss."""
+        return self._selectors.get(self.key(url))
+
+    def put(self, url: str, selector: str) -> None:
+        with self._lock:
+            self._selectors[self.key(url)] = selector
+        logger.info(f"Learned container '{selector}' for {self.key(url)}")
+
+    def forget(self, url: str) -> None:
+        with self._lock:
+            self._selectors.pop(self.key(url), None)
+
+    def snapshot(self) -> dict:
+        return {"learned": len(self._selectors), "hits": self.hits, "misses": self.misses}
+
+
+def _hint_weight(node) -> float:
+    hints = " ".join([node.get('id') or ""] + (node.get('class') or []))
+    weight = 1.0
+    if node.name in ('article', 'main'):
+        weight *= 1.25
+    if hints and POSITIVE_HINTS.search(hints):
+        weight *= 1.25
+    if hints and NEGATIVE_HINTS.search(hints):
+        weight *= 0.3
+    return weight
+
+
+def detect_container(soup):
+    """
+    Pick the node holding the story by text density: every paragraph adds a score
+    (longer, comma-rich, link-poor text scores higher) to its parent and half to
+    its grandparent; id/class hints and <article>/<main> adjust the totals.
+    """
+    scores: dict[int, float] = {}
+    nodes: dict[int, object] = {}
+    for para in soup.find_all(SCORED_TAGS):
+        text = para.get_text(" ", strip=True)
+        if len(text) < 25:
+            continue
+        link_chars = sum(len(a.get_text(strip=True)) for a in para.find_all('a'))
+        score = (1 + text.count(',') + min(len(text) // 100, 3)) * (1 - link_chars / len(text))
+
+        parent = para.parent
+        grandparent = parent.parent if parent is not None else None
+        for node, share in ((parent, 1.0), (grandparent, 0.5)):
+            if node is None or node.name in ('body', 'html', '[document]'):
+                continue
+            scores[id(node)] = scores.get(id(node), 0.0) + score * share
+            nodes[id(node)] = node
+
+    best, best_score = None, MIN_DETECTION_SCORE
+    for key, score in scores.items():
+        weighted = score * _hint_weight(nodes[key])
+        if weighted > best_score:
+            best, best_score = nodes[key], weighted
+    return best
+
+
+def selector_for(node, soup) -> str | None:
+    """A CSS selector that selects exactly this node first in this page, or None."""
+    import soupsieve
+
+    parts: list[str] = []
+    current = node
+    while current is not None and current.name not in ('html', '[document]') and len(parts) < 4:
+        # Ids with digits are usually per-article (post-12345) and won't match the next page
+        if current.get('id') and not any(ch.isdigit() for ch in current['id']):
+            parts.append(f"{current.name}#{soupsieve.escape(current['id'])}")
+            break
+        classes = [c for c in current.get('class') or [] if c]
+        if classes:
+            parts.append(current.name + "".join(f".{soupsieve.escape(c)}" for c in classes))
+        else:
+            parts.append(current.name)
+        if current is node and classes and soup.select_one(parts[0]) is node:
+            break
+        current = current.parent
+
+    selector = " > ".join(reversed(parts))
+    try:
+        return selector if soup.select_one(selector) is node else None
+    except Exception:
+        return None
+
+
+# Process-wide learned selectors
+container_cache = ContainerCache()
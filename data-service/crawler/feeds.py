@@ -0,0 +1,204 @@
+import logging
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from .browser import get_browser_headers, USER_AGENTS
+
+logger = logging.getLogger(__name__)
+
+ROBOTS_TTL_SECONDS = 24 * 3600
+MAX_FEED_BYTES = 10_000_000
+MAX_NESTED_SITEMAPS = 5
+
+
+@dataclass(slots=True)
+class FeedItem:
+    """An article URL announced by an RSS/Atom feed or a sitemap."""
+    url: str
+    title: str = ""
+    summary: str = ""
+    published: datetime | None = None
+
+
+@dataclass(slots=True)
+class RobotsEntry:
+    parser: RobotFileParser
+    sitemaps: list[str]
+    fetched_at: float
+
+
+class RobotsCache:
+    """robots.txt per host, fetched once and reused for ROBOTS_TTL_SECONDS."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, RobotsEntry] = {}
+
+    async def get(self, client: httpx.AsyncClient, url: str) -> RobotsEntry:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        entry = self._entries.get(origin)
+        if entry and time.time() - entry.fetched_at < ROBOTS_TTL_SECONDS:
+            return entry
+
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = await client.get(f"{origin}/robots.txt", headers=get_browser_headers(), timeout=10)
+            if response.status_code >= 400:
+                parser.parse([])  # No robots.txt: everything allowed
+            else:
+                parser.parse(response.text.splitlines())
+        except httpx.HTTPError as e:
+            logger.warning(f"robots.txt unavailable for {origin}: {e}")
+            parser.parse([])
+
+        entry = RobotsEntry(parser=parser, sitemaps=list(parser.site_maps() or []), fetched_at=time.time())
+        self._entries[origin] = entry
+        return entry
+
+    async def can_fetch(self, client: httpx.AsyncClient, url: str) -> bool:
+        entry = await self.get(client, url)
+        # Rules for a generic crawler apply; our UA rotates between browser strings
+        return entry.parser.can_fetch("*", url) and entry.parser.can_fetch(USER_AGENTS[0], url)
+
+
+def _local(tag: str) -> str:
+    """Tag name without its XML namespace."""
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def parse_date(value: str | None) -> datetime | None:
+    """Parse RFC 822 (RSS) or ISO 8601 (Atom/sitemap) dates as aware UTC datetimes."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _item_from_element(elem: ET.Element, base_url: str) -> FeedItem | None:
+    fields: dict[str, str] = {}
+    link = ""
+    for child in elem.iter():
+        name = _local(child.tag)
+        if name == "link":
+            # Atom: <link href="..." rel="alternate"/>; RSS: <link>...</link>
+            href = child.get("href")
+            if href and child.get("rel", "alternate") == "alternate":
+                link = link or href
+            elif child.text and not link:
+                link = child.text.strip()
+        elif name in ("loc", "title", "description", "summary", "pubdate", "published",
+                      "updated", "lastmod", "publication_date", "date") and child.text:
+            fields.setdefault(name, child.text.strip())
+
+    url = link or fields.get("loc", "")
+    if not url:
+        return None
+    published = next(
+        (d for key in ("publication_date", "pubdate", "published", "date", "updated", "lastmod")
+         if (d := parse_date(fields.get(key)))),
+        None
+    )
+    return FeedItem(
+        url=urljoin(base_url, url),
+        title=fields.get("title", ""),
+        summary=fields.get("description", fields.get("summary", ""))[:200],
+        published=published,
+    )
+
+
+async def iter_feed(client: httpx.AsyncClient, feed_url: str, depth: int = 0) -> AsyncIterator[FeedItem]:
+    """
+    Stream-parse an RSS/Atom feed, sitemap or sitemap index.
+    Elements are cleared as soon as they are read, so memory stays flat on large sitemaps.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    nested: list[str] = []
+    received = 0
+
+    try:
+        async with client.stream("GET", feed_url, headers=get_browser_headers(), timeout=30) as response:
+            response.raise_for_status()
+            async for data in response.aiter_bytes():
+                received += len(data)
+                if received > MAX_FEED_BYTES:
+                    logger.warning(f"Feed {feed_url} exceeds {MAX_FEED_BYTES} bytes, truncating")
+                    break
+                parser.feed(data)
+                for _, elem in parser.read_events():
+                    name = _local(elem.tag)
+                    if name in ("item", "entry", "url"):
+                        item = _item_from_element(elem, feed_url)
+                        if item:
+                            yield item
+                        elem.clear()
+                    elif name == "sitemap":
+                        loc = next((c.text.strip() for c in elem if _local(c.tag) == "loc" and c.text), None)
+                        if loc:
+                            nested.append(loc)
+                        elem.clear()
+    except (httpx.HTTPError, ET.ParseError) as e:
+        logger.warning(f"Failed to read feed {feed_url}: {type(e).__name__}: {e}")
+        return
+
+    # Sitemap index: newest child sitemaps are usually listed last
+    if depth == 0:
+        for child in nested[-MAX_NESTED_SITEMAPS:]:
+            async for item in iter_feed(client, child, depth + 1):
+                yield item
+
+
+async def discover_from_feeds(
+    client: httpx.AsyncClient,
+    feed_urls: list[str],
+    seed_url: str,
+    since: datetime | None,
+    robots: RobotsCache
+) -> list[FeedItem]:
+    """
+    Collect article URLs published after `since` from the given feeds, or from
+    the sitemaps listed in robots.txt (same site only) when no feeds are configured.
+    Items without a date are kept; the frontier's seen-set filters repeats.
+    """
+    site: str | None = None
+    if not feed_urls:
+        feed_urls = (await robots.get(client, seed_url)).sitemaps
+        site = urlparse(seed_url).netloc.removeprefix("www.")
+        if not feed_urls:
+            logger.info(f"No feeds configured and no sitemaps in robots.txt for {seed_url}")
+            return []
+
+    items: dict[str, FeedItem] = {}
+    for feed_url in feed_urls:
+        count = 0
+        async for item in iter_feed(client, feed_url):
+            if site and urlparse(item.url).netloc.removeprefix("www.") != site:
+                continue
+            if since and item.published and item.published <= since:
+                continue
+            items.setdefault(item.url, item)
+            count += 1
+        logger.info(f"Feed {feed_url}: {count} new items")
+
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(items.values(), key=lambda i: i.published or oldest, reverse=True)
+
+
+# Process-wide robots.txt cache
+robots_cache = RobotsCache()
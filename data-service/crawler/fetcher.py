@@ -1,51 +1,200 @@
 import asyncio
+import codecs
 import logging
+import os
 import random
+import re
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, TypeVar
 from urllib.parse import urljoin, urlparse
 
 import httpx
-from bs4 import BeautifulSoup
-from playwright_stealth import stealth_async
 
 from .browser import get_browser_headers, USER_AGENTS
+from .archive import is_archiving, record_fetch
 from .browser_engine import BrowserEngine
-from .config import LinkInfo
+from .config import ArticlePage, LinkInfo
+from .extraction import (
+    ExtractionProfile,
+    MIN_CONTAINER_CHARS,
+    compile_selector,
+    container_cache,
+    detect_container,
+    published_at,
+    selector_for,
+)
+from .feeds import parse_date
+from .health import host_health
+from .in_page import EXTRACT_ARTICLE_JS, in_page_args, links_from_result
+from shared_cache import cache_key, shared_cache
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page, Response
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Elements to remove (noise)
 NOISE_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside', 'form', 'noscript']
 
+# Default cap on bytes read per page
+MAX_PAGE_BYTES = int(os.getenv("FETCH_MAX_PAGE_BYTES", "3000000"))
+# How long fetched HTML is shared with other workers
+HTTP_CACHE_TTL_SECONDS = float(os.getenv("HTTP_CACHE_TTL_SECONDS", "600"))
+
+META_CHARSET = re.compile(r'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+# Statuses that mean the origin is blocking or rate-limiting us
+BLOCKING_STATUSES = (403, 429)
+
+ARTICLE_TAG = re.compile(r'<(/?)article\b[^>]*>', re.I)
+
 
 async def fetch_page(
     client: httpx.AsyncClient,
     url: str,
     referer: str | None = None,
-    timeout: int = 30
+    timeout: int = 30,
+    max_bytes: int = MAX_PAGE_BYTES,
+    stop_after_article: bool = False
 ) -> tuple[str | None, str | None]:
-    """Fetch page and return (html, final_url). Returns (None, None) on failure."""
+    """
+    Fetch page and return (html, final_url). Returns (None, None) on failure.
+    
+    The body is streamed and decoded incrementally, and reading stops at max_bytes
+    (the page is truncated). With stop_after_article, reading also stops once the
+    first <article> element has closed; callers set it only when extraction reads that element.
+    Pages fetched by any worker in the last HTTP_CACHE_TTL_SECONDS come from the shared cache.
+    """
+    key = cache_key(url, stop_after_article)
+    cached = await asyncio.to_thread(shared_cache.get, "http", key)
+    # Entries cached before status and headers were kept are fetched again
+    if cached and "status" in cached:
+        logger.debug(f"Shared cache hit for {url}")
+        await record_fetch(url, **cached)
+        return cached["html"], cached["final_url"]
+    
+    if not host_health.allow(url):
+        logger.info(f"Circuit open for {url}, skipping")
+        return None, None
+    timeout = host_health.timeout_for(url, timeout)
+    started = time.monotonic()
+    
     try:
         headers = get_browser_headers(referer)
-        response = await client.get(url, headers=headers, timeout=timeout, follow_redirects=True)
-        
-        content_type = response.headers.get('content-type', '')
-        if 'text/html' not in content_type:
-            logger.debug(f"Skipping non-HTML: {url} ({content_type})")
-            return None, None
-        
-        response.raise_for_status()
-        return response.text, str(response.url)
+        async with client.stream("GET", url, headers=headers, timeout=timeout, follow_redirects=True) as response:
+            # Check the status first, so a 429/5xx with a JSON body still counts against the host
+            response.raise_for_status()
+            content_type = response.headers.get('content-type', '')
+            if 'text/html' not in content_type:
+                if response.is_success:
+                    host_health.record_success(url, time.monotonic() - started)
+                logger.debug(f"Skipping non-HTML: {url} ({content_type})")
+                return None, None
+            
+            html = await _read_html(response, url, max_bytes, stop_after_article)
+            host_health.record_success(url, time.monotonic() - started)
+            if html is None:
+                return None, None
+            # Kept with the response's status and headers, so a cache hit archives the original fetch
+            fetched = {"final_url": str(response.url), "status": response.status_code, "headers": dict(response.headers), "html": html}
+            await record_fetch(url, **fetched)
+            await asyncio.to_thread(shared_cache.set, "http", key, fetched, HTTP_CACHE_TTL_SECONDS)
+            return html, str(response.url)
         
     except httpx.TimeoutException:
+        host_health.record_failure(url, f"timeout after {timeout:.0f}s")
         logger.warning(f"Timeout fetching {url}")
     except httpx.HTTPStatusError as e:
-        logger.warning(f"HTTP {e.response.status_code} for {url}")
+        status = e.response.status_code
+        if status in BLOCKING_STATUSES or status >= 500:
+            host_health.record_failure(url, f"HTTP {status}")
+        else:
+            host_health.record_success(url, time.monotonic() - started)
+        logger.warning(f"HTTP {status} for {url}")
     except Exception as e:
+        host_health.record_failure(url, type(e).__name__)
         logger.warning(f"Error fetching {url}: {e}")
     
     return None, None
 
 
+def _sniff_charset(head: bytes) -> str:
+    """Charset from a <meta> tag in the first bytes of the document, else UTF-8."""
+    match = META_CHARSET.search(head[:4096].decode('ascii', errors='ignore'))
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+class _ArticleEndScanner:
+    """Finds where the first top-level <article> closes in text fed piece by piece."""
+    
+    def __init__(self) -> None:
+        self.depth = 0
+        self.opened = False
+        self._carry = ""
+        self._offset = 0  # Position of _carry in the full text
+    
+    def feed(self, text: str) -> int | None:
+        """Offset just past the closing </article>, or None if it has not been seen yet."""
+        buf = self._carry + text
+        last = 0
+        for match in ARTICLE_TAG.finditer(buf):
+            last = match.end()
+            if not match.group(1):
+                self.depth += 1
+                self.opened = True
+            elif self.opened:
+                self.depth -= 1
+                if self.depth == 0:
+                    return self._offset + match.end()
+        # Keep a tail in case a tag is split across pieces
+        keep_from = max(last, len(buf) - 1024)
+        self._offset += keep_from
+        self._carry = buf[keep_from:]
+        return None
+
+
+async def _read_html(response: httpx.Response, url: str, max_bytes: int, stop_after_article: bool) -> str | None:
+    declared = int(response.headers.get('content-length') or 0)
+    if declared > max_bytes:
+        logger.warning(f"{url} declares {declared} bytes, reading only the first {max_bytes}")
+    
+    decoder = None
+    scanner = _ArticleEndScanner() if stop_after_article else None
+    parts: list[str] = []
+    received = 0
+    
+    async for data in response.aiter_bytes():
+        if decoder is None:
+            if data.startswith(b'%PDF') or b'\x00' in data[:1024]:
+                logger.warning(f"Skipping binary body served as HTML: {url}")
+                return None
+            charset = response.charset_encoding or _sniff_charset(data)
+            decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+        
+        data = data[:max_bytes - received]
+        received += len(data)
+        text = decoder.decode(data)
+        parts.append(text)
+        
+        if scanner and (end := scanner.feed(text)) is not None:
+            html = ''.join(parts)[:end]
+            logger.debug(f"Stopped reading {url} after </article> ({received} bytes)")
+            return html
+        if received >= max_bytes:
+            logger.warning(f"Truncated {url} at {max_bytes} bytes")
+            break
+    
+    if decoder is not None:
+        parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
 async def fetch_page_js(
     url: str,
     referer: str | None = None,
@@ -54,14 +203,85 @@ async def fetch_page_js(
     wait_timeout_ms: int = 5000
 ) -> tuple[str | None, str | None]:
     """Fetch page with JavaScript rendering via Playwright."""
+    async def content(page: "Page", response: "Response | None") -> tuple[str, str]:
+        logger.debug(f"[JS] Getting page content")
+        html = await page.content()
+        final_url = page.url
+        logger.info(f"[JS] Success: got {len(html)} chars from {final_url}")
+        await record_fetch(url, final_url, response.status if response else 200, response.headers if response else {}, html)
+        return html, final_url
+    
+    return await _render(url, referer, timeout, wait_selector, wait_timeout_ms, content) or (None, None)
+
+
+async def fetch_article_js(
+    url: str,
+    referer: str | None = None,
+    timeout: int = 30,
+    wait_selector: str | None = None,
+    wait_timeout_ms: int = 5000,
+    profile: ExtractionProfile | None = None,
+    with_links: bool = False
+) -> ArticlePage | None:
+    """
+    Render a page and extract its article inside the browser.
+    Only the text, links and publish date cross the Playwright pipe; the full DOM is
+    serialized only when the current job archives its pages.
+    """
+    async def extract(page: "Page", response: "Response | None") -> ArticlePage:
+        if is_archiving():
+            html = await page.content()
+            await record_fetch(url, page.url, response.status if response else 200, response.headers if response else {}, html)
+        result = await page.evaluate(EXTRACT_ARTICLE_JS, in_page_args(profile, container_cache.get(page.url), NOISE_TAGS, with_links))
+        
+        if result["forget"]:
+            container_cache.forget(page.url)
+        if result["learned"]:
+            container_cache.put(page.url, result["learned"])
+        lines = [line.strip() for line in result["text"].split('\n') if line.strip()]
+        article = ArticlePage(
+            final_url=page.url,
+            text='\n'.join(lines),
+            links=links_from_result(result),
+            html_bytes=result["htmlBytes"] or len(result["text"]),
+            published=parse_date(result["published"])
+        )
+        logger.info(f"[JS] Extracted {len(article.text)} chars in page from {page.url} ({article.html_bytes} HTML bytes not transferred)")
+        return article
+    
+    return await _render(url, referer, timeout, wait_selector, wait_timeout_ms, extract)
+
+
+async def _render(
+    url: str,
+    referer: str | None,
+    timeout: int,
+    wait_selector: str | None,
+    wait_timeout_ms: int,
+    collect: Callable[["Page", "Response | None"], Awaitable[T]]
+) -> T | None:
+    """Render url in a pooled browser and hand the loaded page to collect. None on failure."""
     logger.debug(f"[JS] Starting fetch for {url}")
     
+    # Fail fast on a degraded origin before waiting for a browser
+    if host_health.is_open(url):
+        logger.info(f"[JS] Circuit open for {url}, skipping")
+        return None
+    
     try:
-        browser = await BrowserEngine.get_browser()
-        logger.debug(f"[JS] Got browser instance")
+        slot = await BrowserEngine.acquire()
+        browser = slot.browser
+        logger.debug(f"[JS] Got browser {slot.index} ({slot.active} active)")
     except Exception as e:
         logger.error(f"[JS] Failed to get browser: {type(e).__name__}: {e}")
-        return None, None
+        return None
+    
+    # Only once the browser is in hand, so a half-open probe is never taken and then dropped
+    if not host_health.allow(url):
+        logger.info(f"[JS] Circuit open for {url}, skipping")
+        BrowserEngine.release(slot)
+        return None
+    timeout = host_health.timeout_for(url, timeout)
 
     context = None
     page = None
@@ -84,6 +304,7 @@ async def fetch_page_js(
         logger.debug(f"[JS] Page created")
 
         # Apply stealth patches BEFORE navigation
+        from playwright_stealth import stealth_async
         logger.debug(f"[JS] Applying stealth patches")
         await stealth_async(page)
         logger.debug(f"[JS] Stealth patches applied")
@@ -98,13 +319,19 @@ async def fetch_page_js(
             logger.debug(f"[JS] Set referer header")
 
         # Navigate - use 'load' instead of 'networkidle' for reliability
-        logger.info(f"[JS] Navigating to {url} (timeout={timeout}s)")
+        logger.info(f"[JS] Navigating to {url} (timeout={timeout:.0f}s)")
+        started = time.monotonic()
         response = await page.goto(url, wait_until='load', timeout=timeout * 1000)
         
         if response:
             logger.info(f"[JS] Navigation complete: status={response.status}, url={response.url}")
+            if response.status in BLOCKING_STATUSES or response.status >= 500:
+                host_health.record_failure(url, f"HTTP {response.status}")
+            else:
+                host_health.record_success(url, time.monotonic() - started)
         else:
             logger.warning(f"[JS] Navigation returned no response")
+            host_health.record_success(url, time.monotonic() - started)
 
         # Optionally wait for specific selector
         if wait_selector:
@@ -119,17 +346,14 @@ async def fetch_page_js(
         await page.evaluate('window.scrollTo(0, document.body.scrollHeight / 4)')
         await asyncio.sleep(0.3)
 
-        logger.debug(f"[JS] Getting page content")
-        html = await page.content()
-        final_url = page.url
-        logger.info(f"[JS] Success: got {len(html)} chars from {final_url}")
-        return html, final_url
+        return await collect(page, response)
 
     except Exception as e:
+        host_health.record_failure(url, type(e).__name__)
         logger.error(f"[JS] Fetch failed for {url}: {type(e).__name__}: {e}")
         import traceback
         logger.debug(f"[JS] Traceback: {traceback.format_exc()}")
-        return None, None
+        return None
 
     finally:
         if context:
@@ -139,11 +363,18 @@ async def fetch_page_js(
                 logger.debug(f"[JS] Context closed")
             except Exception as e:
                 logger.warning(f"[JS] Error closing context: {e}")
+        BrowserEngine.release(slot)
+
+
+def _soup(html: str):
+    """Parse with lxml; bs4 is imported on first use to keep service startup light."""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'lxml')
 
 
 def extract_text(html: str) -> str:
     """Extract visible text from HTML, removing noise elements."""
-    soup = BeautifulSoup(html, 'lxml')
+    soup = _soup(html)
     
     # Remove noise elements
     for tag in soup.find_all(NOISE_TAGS):
@@ -152,33 +383,84 @@ def extract_text(html: str) -> str:
     # Get text with whitespace preservation
     text = soup.get_text(separator='\n', strip=True)
     
+    # Break the tree's reference cycles so it is freed now, not at the next GC pass
+    soup.decompose()
+    
     # Clean up excessive whitespace
     lines = [line.strip() for line in text.split('\n') if line.strip()]
     return '\n'.join(lines)
 
 
-def extract_article_content(html: str) -> str:
-    """Extract text from <article> or <main> tags only, with fallback."""
-    soup = BeautifulSoup(html, 'lxml')
+def extract_article_content(
+    html: str,
+    url: str | None = None,
+    profile: ExtractionProfile | None = None
+) -> str:
+    """
+    Extract the story text from a page with a single parse.
+    
+    Container order: the source profile's content selector, the container learned
+    for this host and path pattern, then text-density detection (remembered for the
+    next page of the same pattern), then <article>/<main>. Falls back to the whole
+    page without noise elements.
+    """
+    soup = _soup(html)
+    
+    if profile:
+        for pattern in profile.compiled_noise:
+            for tag in pattern.select(soup):
+                tag.decompose()
     
-    # Try <article> first, then <main>
-    container = soup.find('article') or soup.find('main')
+    container = None
+    if profile and profile.compiled_content:
+        container = profile.compiled_content.select_one(soup)
     
-    if container:
+    if container is None and url:
+        learned = container_cache.get(url)
+        if learned:
+            container = compile_selector(learned).select_one(soup)
+            if container is None or len(container.get_text(strip=True)) < MIN_CONTAINER_CHARS:
+                container_cache.forget(url)
+                container = None
+    
+    if container is None:
+        container = detect_container(soup)
+        if container is not None and url and (selector := selector_for(container, soup)):
+            container_cache.put(url, selector)
+    
+    if container is None:
+        container = soup.find('article') or soup.find('main')
+    
+    if container is not None:
         # Remove noise within the container
         for tag in container.find_all(['script', 'style', 'nav', 'aside', 'footer', 'form']):
             tag.decompose()
         text = container.get_text(separator='\n', strip=True)
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        return '\n'.join(lines)
+    else:
+        # Fallback to full page extraction
+        for tag in soup.find_all(NOISE_TAGS):
+            tag.decompose()
+        text = soup.get_text(separator='\n', strip=True)
     
-    # Fallback to full page extraction
-    return extract_text(html)
+    soup.decompose()
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return '\n'.join(lines)
+
+
+def extract_article(html: str, url: str, profile: ExtractionProfile | None = None, with_links: bool = False) -> ArticlePage:
+    """Python counterpart of fetch_article_js for pages fetched as HTML."""
+    return ArticlePage(
+        final_url=url,
+        text=extract_article_content(html, url, profile),
+        links=extract_links_with_context(html, url) if with_links else [],
+        html_bytes=len(html),
+        published=published_at(html)
+    )
 
 
 def extract_links_with_context(html: str, base_url: str) -> list[LinkInfo]:
     """Extract links with anchor text and surrounding context."""
-    soup = BeautifulSoup(html, 'lxml')
+    soup = _soup(html)
     base_domain = urlparse(base_url).netloc
     seen_urls: set[str] = set()
     links: list[LinkInfo] = []
@@ -225,12 +507,13 @@ def extract_links_with_context(html: str, base_url: str) -> list[LinkInfo]:
         
         links.append(LinkInfo(url=clean_url, text=anchor_text, context=context))
     
+    soup.decompose()
     return links
 
 
 def extract_links(html: str, base_url: str, same_domain_only: bool) -> list[str]:
     """Extract all links from HTML, optionally filtering to same domain."""
-    soup = BeautifulSoup(html, 'lxml')
+    soup = _soup(html)
     base_domain = urlparse(base_url).netloc
     links = []
     
@@ -0,0 +1,264 @@
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from .config import LinkInfo
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change page content
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src|amp|cmpid|ocid)$", re.I)
+
+# Anchor/context words that suggest an upcoming, resolvable event
+EVENT_KEYWORDS = re.compile(
+    r"\b(fixtures?|vs\.?|v|match(day)?|preview|kick-?off|live|schedule[ds]?|upcoming|final|"
+    r"election|poll|vote|primar(y|ies)|deadline|budget|summit|hearing|verdict|launch|release|"
+    r"tomorrow|tonight|this week(end)?|next week|round \d+|week \d+)\b",
+    re.I,
+)
+DATE_IN_PATH = re.compile(r"/20\d\d[/-]\d{1,2}")
+
+# Highest-priority leftovers kept per source between jobs
+MAX_PENDING = 500
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonical form for seen-set lookups: lowercase host, no fragment/tracking params, sorted query."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and not ((scheme == "http" and parsed.port == 80) or (scheme == "https" and parsed.port == 443)):
+        host = f"{host}:{parsed.port}"
+
+    path = re.sub(r"/{2,}", "/", parsed.path or "/")
+    if len(path) > 1 and path.endswith("/"):
+        path = path[:-1]
+
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(k)
+    ))
+    return urlunparse((scheme, host, path, "", query, ""))
+
+
+def score_link(link: LinkInfo) -> float:
+    """Cheap local estimate of how likely a link leads to an upcoming-event article."""
+    text = f"{link.text} {link.context}"
+    score = 0.0
+    score += 2.0 * min(len(EVENT_KEYWORDS.findall(text)), 3)
+    path = urlparse(link.url).path
+    if DATE_IN_PATH.search(path):
+        score += 1.0
+    if path.count("/") >= 2 or len(path) > 30:
+        score += 1.0  # Article-like rather than section-like
+    if 20 <= len(link.text) <= 160:
+        score += 1.0  # Headline-length anchor
+    return score
+
+
+@dataclass
+class CrawlBudget:
+    """Per-source limits on a single crawl."""
+    max_pages: int
+    max_bytes: int = 20_000_000
+    max_seconds: float = 300.0
+    pages: int = 0
+    bytes: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def consume(self, size: int) -> None:
+        self.pages += 1
+        self.bytes += size
+
+    def exhausted(self) -> str | None:
+        """Reason the budget is spent, or None."""
+        if self.pages >= self.max_pages:
+            return f"page budget ({self.max_pages})"
+        if self.bytes >= self.max_bytes:
+            return f"byte budget ({self.max_bytes})"
+        if time.monotonic() - self.started_at >= self.max_seconds:
+            return f"time budget ({self.max_seconds:.0f}s)"
+        return None
+
+
+@dataclass(order=True)
+class FrontierEntry:
+    sort_key: tuple[int, float, int]
+    url: str = field(compare=False)
+    depth: int = field(compare=False)
+    priority: float = field(compare=False)
+
+
+class FrontierStore:
+    """
+    SQLite persistence for per-source seen sets and leftover frontier entries.
+    Calls block; the crawler makes them in a worker thread, once when a crawl starts and once when it ends.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS seen (
+                    source_id TEXT, url TEXT, fetched_at REAL,
+                    PRIMARY KEY (source_id, url)
+                );
+                CREATE TABLE IF NOT EXISTS pending (
+                    source_id TEXT, url TEXT, depth INTEGER, priority REAL, discovered_at REAL,
+                    PRIMARY KEY (source_id, url)
+                );
+                CREATE TABLE IF NOT EXISTS feed_state (
+                    source_id TEXT PRIMARY KEY, checkpoint REAL
+                );
+            """)
+        return self._conn
+
+    def load_seen(self, source_id: str, since: float) -> set[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT url FROM seen WHERE source_id = ? AND fetched_at >= ?", (source_id, since)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def load_pending(self, source_id: str, since: float) -> list[tuple[str, int, float]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT url, depth, priority FROM pending WHERE source_id = ? AND discovered_at >= ?",
+                (source_id, since)
+            ).fetchall()
+        return [(r[0], r[1], r[2]) for r in rows]
+
+    def get_feed_checkpoint(self, source_id: str) -> float | None:
+        """Publish time of the newest feed item seen by the last crawl."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT checkpoint FROM feed_state WHERE source_id = ?", (source_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_feed_checkpoint(self, source_id: str, checkpoint: float) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO feed_state VALUES (?, ?)", (source_id, checkpoint))
+
+    def save(self, source_id: str, fetched: list[str], pending: list[FrontierEntry], expire_before: float) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO seen VALUES (?, ?, ?)",
+                    [(source_id, url, now) for url in fetched]
+                )
+                conn.execute("DELETE FROM pending WHERE source_id = ?", (source_id,))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pending VALUES (?, ?, ?, ?, ?)",
+                    [(source_id, e.url, e.depth, e.priority, now) for e in pending]
+                )
+                conn.execute("DELETE FROM seen WHERE fetched_at < ?", (expire_before,))
+
+
+class CrawlFrontier:
+    """
+    Priority frontier for one source's crawl.
+
+    URLs are canonicalized and checked against a seen-set that persists across
+    jobs (pages fetched within recrawl_seconds are not fetched again). Entries
+    beyond max_depth are dropped, and pop() stops once the budget is spent.
+    Whatever is left is saved so the next job resumes instead of rediscovering it.
+    Construction, resume() and save() hit the store; everything else stays in memory.
+    """
+
+    def __init__(
+        self,
+        source_id: str,
+        store: FrontierStore,
+        budget: CrawlBudget,
+        max_depth: int = 1,
+        recrawl_seconds: float = float(os.getenv("FRONTIER_RECRAWL_HOURS", "6")) * 3600
+    ) -> None:
+        self.source_id = source_id
+        self.store = store
+        self.budget = budget
+        self.max_depth = max_depth
+        self.recrawl_seconds = recrawl_seconds
+        self._heap: list[FrontierEntry] = []
+        self._queued: set[str] = set()
+        self._fetched: list[str] = []
+        self._counter = 0
+        self._seen = store.load_seen(source_id, time.time() - recrawl_seconds)
+
+    def resume(self) -> int:
+        """Re-queue entries left over by earlier jobs."""
+        count = 0
+        for url, depth, priority in self.store.load_pending(self.source_id, time.time() - self.recrawl_seconds):
+            if self.push(url, depth, priority, carried=True):
+                count += 1
+        return count
+
+    def is_seen(self, url: str) -> bool:
+        return canonicalize_url(url) in self._seen
+
+    def push(self, url: str, depth: int, priority: float = 0.0, carried: bool = False) -> bool:
+        """
+        Queue a URL unless it is too deep, recently fetched or already queued.
+        Carried-over entries rank below anything discovered in this job.
+        """
+        canonical = canonicalize_url(url)
+        if depth > self.max_depth or canonical in self._seen or canonical in self._queued:
+            return False
+        self._queued.add(canonical)
+        self._counter += 1
+        heapq.heappush(self._heap, FrontierEntry((int(carried), -priority, self._counter), url, depth, priority))
+        return True
+
+    def pop(self) -> FrontierEntry | None:
+        reason = self.budget.exhausted()
+        if reason:
+            if self._heap:
+                logger.info(f"[{self.source_id}] Frontier stopped by {reason}, {len(self._heap)} URLs left")
+            return None
+        if not self._heap:
+            return None
+        entry = heapq.heappop(self._heap)
+        self._queued.discard(canonicalize_url(entry.url))
+        return entry
+
+    def mark_fetched(self, url: str, size: int, final_url: str | None = None) -> None:
+        self.budget.consume(size)
+        for u in {canonicalize_url(url), canonicalize_url(final_url or url)}:
+            self._seen.add(u)
+            self._fetched.append(u)
+
+    def save(self) -> None:
+        try:
+            self.store.save(
+                self.source_id,
+                self._fetched,
+                heapq.nsmallest(MAX_PENDING, self._heap),
+                expire_before=time.time() - self.recrawl_seconds
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"[{self.source_id}] Failed to persist frontier: {e}")
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+# Process-wide store; FRONTIER_DB=":memory:" disables persistence
+frontier_store = FrontierStore(os.getenv("FRONTIER_DB", "data/frontier.sqlite3"))
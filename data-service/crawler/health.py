@@ -0,0 +1,140 @@
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "120"))
+# A half-open probe that hasn't reported back by now was abandoned (cancelled, or never started);
+# well past the longest fetch, so a slow probe isn't doubled up
+PROBE_TIMEOUT_SECONDS = 90.0
+
+# Adaptive timeout = TIMEOUT_FACTOR x p95 latency, clamped to [MIN_TIMEOUT_SECONDS, configured timeout]
+MIN_SAMPLES = 5
+TIMEOUT_FACTOR = 2.0
+MIN_TIMEOUT_SECONDS = 5.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+@dataclass
+class HostHealth:
+    """Latency samples and circuit state for one origin."""
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=50))
+    consecutive_failures: int = 0
+    state: str = CLOSED
+    opened_at: float = 0.0
+    probe_started_at: float | None = None
+    successes: int = 0
+    failures: int = 0
+    rejected: int = 0
+
+    def p95(self) -> float | None:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    @property
+    def probing(self) -> bool:
+        """A half-open probe is in flight and hasn't timed out."""
+        return self.probe_started_at is not None and time.monotonic() - self.probe_started_at < PROBE_TIMEOUT_SECONDS
+
+
+class HostHealthRegistry:
+    """
+    Per-host circuit breakers for the crawler.
+
+    A host opens after FAILURE_THRESHOLD consecutive failures (timeouts, connection
+    errors, 403/429/5xx) and rejects fetches for COOLDOWN_SECONDS. After that one
+    probe is let through (half-open); success closes the circuit, failure reopens it.
+    A probe that never reports either is given up after PROBE_TIMEOUT_SECONDS and
+    the next fetch probes instead.
+    """
+
+    def __init__(self) -> None:
+        self._hosts: dict[str, HostHealth] = {}
+
+    def _get(self, url: str) -> HostHealth:
+        return self._hosts.setdefault(host_of(url), HostHealth())
+
+    def is_open(self, url: str) -> bool:
+        """True while the host is cooling down (does not consume the half-open probe)."""
+        health = self._hosts.get(host_of(url))
+        if health is None or health.state == CLOSED:
+            return False
+        if health.state == HALF_OPEN:
+            return health.probing
+        return time.monotonic() - health.opened_at < COOLDOWN_SECONDS
+
+    def allow(self, url: str) -> bool:
+        """Whether a fetch to this host may start now."""
+        health = self._get(url)
+        if health.state == OPEN and time.monotonic() - health.opened_at >= COOLDOWN_SECONDS:
+            health.state = HALF_OPEN
+            health.probe_started_at = None
+        if health.state == HALF_OPEN and not health.probing:
+            health.probe_started_at = time.monotonic()
+            logger.info(f"Circuit half-open for {host_of(url)}, probing with {url}")
+            return True
+        if health.state != CLOSED:
+            health.rejected += 1
+            return False
+        return True
+
+    def timeout_for(self, url: str, default: float) -> float:
+        """Timeout from the host's observed p95 latency, never above the configured default."""
+        p95 = self._get(url).p95()
+        if p95 is None:
+            return default
+        return min(default, max(MIN_TIMEOUT_SECONDS, p95 * TIMEOUT_FACTOR))
+
+    def record_success(self, url: str, latency: float) -> None:
+        health = self._get(url)
+        health.latencies.append(latency)
+        health.successes += 1
+        health.consecutive_failures = 0
+        if health.state != CLOSED:
+            logger.info(f"Circuit closed for {host_of(url)}")
+        health.state = CLOSED
+        health.probe_started_at = None
+
+    def record_failure(self, url: str, reason: str) -> None:
+        health = self._get(url)
+        health.failures += 1
+        health.consecutive_failures += 1
+        if health.state == HALF_OPEN or health.consecutive_failures >= FAILURE_THRESHOLD:
+            if health.state != OPEN:
+                logger.warning(
+                    f"Circuit open for {host_of(url)} after {health.consecutive_failures} failures "
+                    f"(last: {reason}), pausing {COOLDOWN_SECONDS:.0f}s"
+                )
+            health.state = OPEN
+            health.opened_at = time.monotonic()
+            health.probe_started_at = None
+
+    def snapshot(self) -> dict[str, dict]:
+        return {
+            host: {
+                "state": h.state,
+                "p95_seconds": round(p95, 2) if (p95 := h.p95()) is not None else None,
+                "successes": h.successes,
+                "failures": h.failures,
+                "rejected": h.rejected,
+            }
+            for host, h in self._hosts.items()
+        }
+
+
+# Process-wide registry shared by HTTP and browser fetches
+host_health = HostHealthRegistry()
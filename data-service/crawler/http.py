@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide client so crawls reuse pooled connections instead of reconnecting per page."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+        )
+    return _client
+
+
+async def prime_connections(urls: list[str]) -> int:
+    """Open pooled connections (DNS, TCP, TLS) to the given origins ahead of the first crawl."""
+    client = get_http_client()
+    results = await asyncio.gather(*(client.head(url, timeout=10) for url in urls), return_exceptions=True)
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            logger.info(f"Could not prime connection to {url}: {result}")
+    return sum(not isinstance(r, Exception) for r in results)
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,176 @@
+from .config import LinkInfo
+from .extraction import (
+    ExtractionProfile,
+    MIN_CONTAINER_CHARS,
+    MIN_DETECTION_SCORE,
+    NEGATIVE_HINTS,
+    POSITIVE_HINTS,
+    SCORED_TAGS,
+)
+
+# Runs inside the rendered page. Mirrors extract_article_content / extract_links_with_context /
+# published_at, so only the article text, links and publish date cross the Playwright pipe.
+EXTRACT_ARTICLE_JS = r"""
+(args) => {
+    const result = {text: "", links: [], published: null, learned: null, forget: false, htmlBytes: 0};
+
+    const nav = performance.getEntriesByType("navigation")[0];
+    result.htmlBytes = nav ? (nav.decodedBodySize || nav.transferSize || 0) : 0;
+
+    const textOf = (node, sep) => {
+        const parts = [];
+        const walker = document.createTreeWalker(node, NodeFilter.SHOW_TEXT);
+        while (walker.nextNode()) {
+            const t = walker.currentNode.nodeValue.trim();
+            if (t) parts.push(t);
+        }
+        return parts.join(sep);
+    };
+    const query = (selector) => {
+        try { return document.querySelector(selector); } catch (e) { return null; }
+    };
+
+    // Publish date: JSON-LD, then meta tags, then <time>
+    for (const script of document.querySelectorAll('script[type="application/ld+json"]')) {
+        const m = /"datePublished"\s*:\s*"([^"]+)"/.exec(script.textContent);
+        if (m) { result.published = m[1]; break; }
+    }
+    if (!result.published) {
+        const meta = document.querySelector(args.publishedMeta);
+        const time = document.querySelector("time[datetime]");
+        result.published = meta ? meta.content : (time ? time.getAttribute("datetime") : null);
+    }
+
+    // Links are taken from the whole page, before anything is removed
+    if (args.withLinks) {
+        const base = new URL(location.href);
+        const seen = new Set();
+        for (const a of document.querySelectorAll("a[href]")) {
+            const href = a.getAttribute("href");
+            if (/^(#|javascript:|mailto:|tel:)/.test(href)) continue;
+            let url;
+            try { url = new URL(href, base); } catch (e) { continue; }
+            if (!/^https?:$/.test(url.protocol) || url.host !== base.host) continue;
+            const clean = url.origin + url.pathname + url.search;
+            if (seen.has(clean)) continue;
+            seen.add(clean);
+            const text = textOf(a, "");
+            if (!text) continue;
+            const parent = a.parentElement && a.parentElement.closest("p, li, div, h1, h2, h3, h4, article");
+            result.links.push([clean, text, parent ? textOf(parent, "").slice(0, 200) : ""]);
+        }
+    }
+
+    for (const selector of args.noise) {
+        try { document.querySelectorAll(selector).forEach((n) => n.remove()); } catch (e) {}
+    }
+
+    const positive = new RegExp(args.positiveHints, "i");
+    const negative = new RegExp(args.negativeHints, "i");
+    const hintWeight = (node) => {
+        const hints = [node.id || ""].concat(Array.from(node.classList)).join(" ").trim();
+        let weight = 1.0;
+        if (["article", "main"].includes(node.localName)) weight *= 1.25;
+        if (hints && positive.test(hints)) weight *= 1.25;
+        if (hints && negative.test(hints)) weight *= 0.3;
+        return weight;
+    };
+    const detect = () => {
+        const scores = new Map();
+        for (const para of document.querySelectorAll(args.scoredTags.join(","))) {
+            const text = textOf(para, " ");
+            if (text.length < 25) continue;
+            let linkChars = 0;
+            para.querySelectorAll("a").forEach((a) => { linkChars += textOf(a, "").length; });
+            const score = (1 + (text.match(/,/g) || []).length + Math.min(Math.floor(text.length / 100), 3))
+                * (1 - linkChars / text.length);
+            const parent = para.parentElement;
+            const grandparent = parent ? parent.parentElement : null;
+            for (const [node, share] of [[parent, 1.0], [grandparent, 0.5]]) {
+                if (!node || ["body", "html"].includes(node.localName)) continue;
+                scores.set(node, (scores.get(node) || 0) + score * share);
+            }
+        }
+        let best = null, bestScore = args.minDetectionScore;
+        for (const [node, score] of scores) {
+            const weighted = score * hintWeight(node);
+            if (weighted > bestScore) { best = node; bestScore = weighted; }
+        }
+        return best;
+    };
+    const selectorFor = (node) => {
+        const parts = [];
+        let current = node;
+        while (current && current.localName !== "html" && parts.length < 4) {
+            // Ids with digits are usually per-article (post-12345) and won't match the next page
+            if (current.id && !/\d/.test(current.id)) {
+                parts.push(current.localName + "#" + CSS.escape(current.id));
+                break;
+            }
+            const classes = Array.from(current.classList).filter(Boolean);
+            parts.push(current.localName + classes.map((c) => "." + CSS.escape(c)).join(""));
+            if (current === node && classes.length && query(parts[0]) === node) break;
+            current = current.parentElement;
+        }
+        const selector = parts.reverse().join(" > ");
+        return query(selector) === node ? selector : null;
+    };
+
+    let container = args.content ? query(args.content) : null;
+    if (!container && args.learned) {
+        container = query(args.learned);
+        if (!container || container.textContent.trim().length < args.minContainerChars) {
+            result.forget = true;
+            container = null;
+        }
+    }
+    if (!container) {
+        container = detect();
+        if (container) result.learned = selectorFor(container);
+    }
+    if (!container) container = document.querySelector("article") || document.querySelector("main");
+
+    if (container) {
+        container.querySelectorAll("script, style, nav, aside, footer, form").forEach((n) => n.remove());
+    } else {
+        container = document.body || document.documentElement;
+        container.querySelectorAll(args.noiseTags.join(",")).forEach((n) => n.remove());
+    }
+    result.text = textOf(container, "\n");
+    return result;
+}
+"""
+
+PUBLISHED_META = ", ".join(
+    f'meta[{attr}="{name}"]'
+    for name in (
+        "article:published_time", "og:published_time", "datePublished", "pubdate", "publish-date", "parsely-pub-date"
+    )
+    for attr in ("property", "name", "itemprop")
+)
+
+
+def in_page_args(
+    profile: ExtractionProfile | None,
+    learned: str | None,
+    noise_tags: list[str],
+    with_links: bool
+) -> dict:
+    """Arguments for EXTRACT_ARTICLE_JS; the Python-side thresholds and hints are passed in."""
+    return {
+        "content": profile.content_selector if profile else None,
+        "noise": list(profile.noise_selectors) if profile else [],
+        "learned": learned,
+        "withLinks": with_links,
+        "publishedMeta": PUBLISHED_META,
+        "scoredTags": SCORED_TAGS,
+        "positiveHints": POSITIVE_HINTS.pattern,
+        "negativeHints": NEGATIVE_HINTS.pattern,
+        "minDetectionScore": MIN_DETECTION_SCORE,
+        "minContainerChars": MIN_CONTAINER_CHARS,
+        "noiseTags": noise_tags,
+    }
+
+
+def links_from_result(result: dict) -> list[LinkInfo]:
+    return [LinkInfo(url=url, text=text, context=context) for url, text, context in result.get("links", [])]
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable
+
+from .config import LinkInfo
+from .extraction import path_pattern
+from .frontier import canonicalize_url, score_link
+
+logger = logging.getLogger(__name__)
+
+# Total bytes a crawl may spend on speculative fetches
+PREFETCH_MAX_BYTES = int(os.getenv("PREFETCH_MAX_BYTES", "4000000"))
+
+FetchResult = tuple[str | None, str | None]
+
+
+class SelectionHistory:
+    """How often the link selector picked links of each path pattern, per source."""
+
+    def __init__(self) -> None:
+        self._offered: dict[tuple[str, str], int] = {}
+        self._chosen: dict[tuple[str, str], int] = {}
+
+    def record(self, source_key: str, links: list[LinkInfo], selected_urls: list[str]) -> None:
+        selected = {canonicalize_url(u) for u in selected_urls}
+        for link in links:
+            key = (source_key, path_pattern(link.url))
+            self._offered[key] = self._offered.get(key, 0) + 1
+            if canonicalize_url(link.url) in selected:
+                self._chosen[key] = self._chosen.get(key, 0) + 1
+
+    def pick_rate(self, source_key: str, url: str) -> float:
+        key = (source_key, path_pattern(url))
+        # Smoothed so a single observation doesn't dominate
+        return self._chosen.get(key, 0) / (self._offered.get(key, 0) + 2)
+
+
+def rank_links(links: list[LinkInfo], source_key: str, history: "SelectionHistory") -> list[LinkInfo]:
+    """Links ordered by the local event heuristic plus the selector's past picks for their pattern."""
+    return sorted(
+        links,
+        key=lambda link: score_link(link) + 4.0 * history.pick_rate(source_key, link.url),
+        reverse=True
+    )
+
+
+class Prefetcher:
+    """
+    Speculative fetches of likely picks while link selection is in flight.
+
+    keep() cancels in-flight fetches of links the model did not pick; pages that
+    already arrived stay available to take() for the rest of the crawl.
+    """
+
+    def __init__(self, fetch: Callable[[str, int], Awaitable[FetchResult]], max_bytes: int = PREFETCH_MAX_BYTES) -> None:
+        self._fetch = fetch
+        self.max_bytes = max_bytes
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.used = 0
+        self.cancelled = 0
+
+    def start(self, urls: list[str]) -> None:
+        if not urls:
+            return
+        per_page = self.max_bytes // len(urls)
+        for url in urls:
+            self._tasks[canonicalize_url(url)] = asyncio.create_task(self._fetch(url, per_page))
+        logger.info(f"Prefetching {len(urls)} likely links while the selector runs")
+
+    def keep(self, selected_urls: list[str]) -> None:
+        selected = {canonicalize_url(u) for u in selected_urls}
+        for key, task in list(self._tasks.items()):
+            if key not in selected and not task.done():
+                task.cancel()
+                del self._tasks[key]
+                self.cancelled += 1
+
+    async def take(self, url: str) -> FetchResult | None:
+        """Prefetched result for url, or None if it was not prefetched or the prefetch failed."""
+        task = self._tasks.pop(canonicalize_url(url), None)
+        if task is None or task.cancelled():
+            return None
+        result = await task
+        # A failed fetch is (None, None), which is truthy; the caller fetches the page itself
+        if not (result and result[0]):
+            return None
+        self.used += 1
+        return result
+
+    def close(self) -> None:
+        """Cancel whatever is still in flight and drop unused pages."""
+        wasted = len(self._tasks)
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        if self.used or self.cancelled or wasted:
+            logger.info(f"Prefetch: {self.used} used, {self.cancelled} cancelled, {wasted} unused")
+
+
+# Process-wide selector history
+selection_history = SelectionHistory()
@@ -1,135 +1,256 @@
-import json
+import asyncio
 import logging
 import os
+import time
+from dataclasses import asdict
 from datetime import datetime, timezone
+from typing import TYPE_CHECKING, AsyncIterator, TypeVar
 
-from openai import AsyncOpenAI
+from crawler.config import PageSegment
+from shared_cache import cache_key, shared_cache
+from .batch import BatchFailed, DeferredBatch
+from .chunker import ChunkPacker, CorpusChunk, chunk_corpus, chunk_pages
+from .models import MarketProposal, MARKETS_RESPONSE_FORMAT
+from .models_config import get_max_corpus_chars, supports_json_schema
+from .prompts import compile_prompt
+from .usage import record_usage, usage_snapshot
+from .packer import PackedSource, pack_corpora, render_packed_corpus, split_by_source
+from .routing import model_router, start_job_budget, LatencyBudgetExceeded
+from .similarity import DEFAULT_THRESHOLD, DedupeStats, SimilarityIndex, recent_markets
+from .stream_parser import MarketStreamParser
+from .temporal import PREFILTER_ENABLED, PrefilterStats, prefilter_page, prefilter_pages
 
-from .chunker import chunk_corpus
-from .models import MarketProposal
-from .models_config import get_max_corpus_chars
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-def clean_json_response(content: str) -> str:
-    """Strip markdown code blocks if present."""
-    content = content.strip()
-    if content.startswith("```"):
-        first_newline = content.find("\n")
-        if first_newline != -1:
-            content = content[first_newline + 1:]
-        if content.endswith("```"):
-            content = content[:-3]
-    return content.strip()
+# How long generated markets for a chunk are shared with other workers
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "21600"))
 
 
-def dedupe_proposals(proposals: list[MarketProposal]) -> list[MarketProposal]:
-    """Remove duplicate markets based on question similarity."""
+def dedupe_proposals(
+    proposals: list[T],
+    threshold: float | None = None,
+    stats: DedupeStats | None = None,
+    check_recent: bool = False
+) -> list[T]:
+    """
+    Remove duplicate and near-duplicate markets based on question similarity.
+    Near-duplicates are merged into the earlier proposal, keeping the richer description.
+    With check_recent, questions close to markets recently delivered to Oracle are dropped too.
+    """
+    threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+    stats = stats or DedupeStats()
     seen_questions: set[str] = set()
-    unique: list[MarketProposal] = []
+    index = SimilarityIndex(threshold)
+    unique: list[T] = []
     for p in proposals:
         normalized = p.question.lower().strip()
-        if normalized not in seen_questions:
-            seen_questions.add(normalized)
-            unique.append(p)
+        if normalized in seen_questions:
+            stats.exact_duplicates += 1
+            continue
+        if check_recent and recent_markets.contains(p.question, threshold):
+            stats.recent_duplicates += 1
+            logger.debug(f"Dropped recently delivered market: {p.question}")
+            continue
+        match = index.query(p.question)
+        if match is not None:
+            key, score = match
+            stats.near_duplicates += 1
+            logger.debug(f"Near-duplicate ({score:.2f}): {p.question!r} ~ {unique[key].question!r}")
+            if len(p.description) > len(unique[key].description):
+                unique[key] = p
+            continue
+        seen_questions.add(normalized)
+        index.add(len(unique), p.question)
+        unique.append(p)
     return unique
 
 
+def chunk_request(chunk: str, prompt_template: str, model: str, current_date: str) -> dict:
+    """chat.completions.create arguments for one chunk; also the body of a batch request."""
+    return {
+        "model": model,
+        "messages": compile_prompt(prompt_template).messages(corpus=chunk, current_date=current_date),
+        "response_format": MARKETS_RESPONSE_FORMAT if supports_json_schema(model) else {"type": "json_object"},
+        "temperature": 0.7,
+        "max_tokens": 2000,
+    }
+
+
+def _proposal(m) -> MarketProposal | None:
+    """The proposal for one AI market object, or None (logged) if it is malformed or invalid."""
+    try:
+        proposal = MarketProposal.from_dict(m)
+        if proposal.is_valid():
+            return proposal
+        logger.warning(f"Invalid proposal skipped: {m.get('question', 'no question')}")
+    except Exception as e:
+        logger.warning(f"Failed to parse market: {e}")
+    return None
+
+
+class SalvagedProposals(list):
+    """Markets kept from a truncated or failed response; used for this job but never cached."""
+
+
+def parse_markets(content: str | None) -> list[MarketProposal]:
+    """Valid proposals from a complete (not streamed) generation response, such as a batch result."""
+    parser = MarketStreamParser()
+    proposals: list[MarketProposal] = []
+    for m in parser.feed(content or ""):
+        if proposal := _proposal(m):
+            proposals.append(proposal)
+    if not parser.complete:
+        logger.warning(f"AI response was truncated or malformed; salvaged {len(proposals)} markets")
+    return proposals
+
+
 async def process_chunk(
-    client: AsyncOpenAI,
+    client: "AsyncOpenAI",
     chunk: str,
     prompt_template: str,
     model: str,
-    current_date: str
+    current_date: str,
+    timeout: float | None = None
 ) -> list[MarketProposal]:
-    """Process a single chunk and return market proposals."""
-    prompt = prompt_template.replace("{corpus}", chunk).replace("{current_date}", current_date)
+    """
+    Process a single chunk and return market proposals.
+    The response is streamed and each market is validated as soon as its object closes,
+    so a truncated or malformed tail only loses the markets after it. What is kept from
+    such a response is returned as SalvagedProposals.
+    """
+    parser = MarketStreamParser()
+    proposals: list[MarketProposal] = []
+    started = time.monotonic()
 
     try:
-        response = await client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.7,
-            max_tokens=2000
+        stream = await client.chat.completions.create(
+            **chunk_request(chunk, prompt_template, model, current_date),
+            stream=True,
+            extra_body={"stream_options": {"include_usage": True}},
+            timeout=timeout
         )
 
-        content = response.choices[0].message.content
-        if content is None:
-            logger.error("AI returned None content")
-            return []
+        async for event in stream:
+            if getattr(event, "usage", None):
+                record_usage("generation", event.usage)
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if not delta:
+                continue
 
-        content = clean_json_response(content)
-        logger.debug(f"AI response (first 500 chars): {content[:500]}")
+            for m in parser.feed(delta):
+                if proposal := _proposal(m):
+                    if not proposals:
+                        logger.debug(f"First market after {time.monotonic() - started:.2f}s")
+                    proposals.append(proposal)
 
-        try:
-            data = json.loads(content)
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error: {e}")
-            logger.error(f"Raw content: {content[:1000]}")
-            return []
+    except Exception as e:
+        if not proposals:
+            logger.error(f"AI generation failed for chunk: {type(e).__name__}: {e}")
+            raise
+        logger.warning(f"AI stream failed after {len(proposals)} markets, keeping them: {type(e).__name__}: {e}")
+        return SalvagedProposals(proposals)
 
-        raw_markets = data.get("markets", [])
-        if not raw_markets:
-            logger.info("AI returned empty markets array for chunk")
-            return []
+    if not parser.complete:
+        logger.warning(f"AI response was truncated or malformed; salvaged {len(proposals)} markets")
+        return SalvagedProposals(proposals)
+    elif parser.objects_seen == 0:
+        logger.info("AI returned empty markets array for chunk")
 
-        proposals: list[MarketProposal] = []
-        for m in raw_markets:
-            try:
-                proposal = MarketProposal(
-                    question=m.get("question", ""),
-                    description=m.get("description", ""),
-                    source_url=m.get("source_url", ""),
-                    category=m.get("category", "news"),
-                    betting_closes_at=m.get("betting_closes_at", ""),
-                    resolves_at=m.get("resolves_at", ""),
-                    resolution_context=m.get("resolution_context", "")
-                )
-                if proposal.is_valid():
-                    proposals.append(proposal)
-                else:
-                    logger.warning(f"Invalid proposal skipped: {m.get('question', 'no question')}")
-            except Exception as e:
-                logger.warning(f"Failed to parse market: {e}")
+    return proposals
 
-        return proposals
 
-    except Exception as e:
-        logger.error(f"AI generation failed for chunk: {type(e).__name__}: {e}")
-        raise
+async def generate_chunk(
+    client: "AsyncOpenAI",
+    chunk: str,
+    prompt_template: str,
+    current_date: str,
+    source_id: str | None = None,
+    refresh: bool = False
+) -> list[MarketProposal]:
+    """
+    Process a chunk through the generation route, falling back to faster tiers on timeout or rate limit.
+    Complete responses are shared with other workers for the same chunk, prompt and day;
+    with refresh, a cached response is ignored and replaced.
+    """
+    key = cache_key(prompt_template, chunk, current_date[:10], source_id)
+    if not refresh and (cached := await asyncio.to_thread(shared_cache.get, "generation", key)) is not None:
+        logger.info(f"Shared cache hit for chunk ({len(cached)} markets)")
+        return [MarketProposal.from_dict(m) for m in cached]
+    
+    proposals = await model_router.call(
+        "generation",
+        lambda model, timeout: process_chunk(client, chunk, prompt_template, model, current_date, timeout),
+        source_id=source_id,
+        min_context_chars=len(chunk) + len(prompt_template)
+    )
+    # A salvaged partial would otherwise stand in for the full response until the entry expires
+    if not isinstance(proposals, SalvagedProposals):
+        await asyncio.to_thread(
+            shared_cache.set, "generation", key, [asdict(p) for p in proposals], LLM_CACHE_TTL_SECONDS
+        )
+    return proposals
+
+
+def get_max_chunk_chars(model: str, prompt_template: str) -> int:
+    """Max corpus chars per request for a model, honouring AI_MAX_TOKENS_OVERRIDE."""
+    max_tokens_override = os.getenv("AI_MAX_TOKENS_OVERRIDE", "")
+    prompt_overhead = len(prompt_template) + 500
+    if max_tokens_override:
+        return int(int(max_tokens_override) * 4) - prompt_overhead
+    return get_max_corpus_chars(model, prompt_overhead)
 
 
 async def generate_markets(
-    client: AsyncOpenAI,
-    corpus: str,
+    client: "AsyncOpenAI",
+    corpus: str | list[PageSegment],
     prompt_template: str,
-    target_count: int = 5
+    target_count: int = 5,
+    dedupe_stats: DedupeStats | None = None,
+    source_id: str | None = None,
+    prefilter_stats: PrefilterStats | None = None,
+    refresh: bool = False
 ) -> list[MarketProposal]:
     """
     Use AI to generate market proposals from crawled text.
     Automatically chunks corpus to fit within model token limits.
+    Page segments are chunked by reference; each chunk's text only exists while it is sent.
+    Pages with no upcoming events are dropped (or trimmed) first, see temporal.prefilter_page.
+    With refresh, cached responses are bypassed (see generate_chunk).
     """
-    if not corpus.strip():
+    if not isinstance(corpus, str):
+        corpus = prefilter_pages(corpus, datetime.now(timezone.utc), prefilter_stats)
+    if not corpus or (isinstance(corpus, str) and not corpus.strip()):
         logger.warning("Empty corpus, skipping AI call")
         return []
 
-    # Get model config from environment
-    model = os.getenv("AI_MODEL", "gpt-4-turbo-preview")
-    max_tokens_override = os.getenv("AI_MAX_TOKENS_OVERRIDE", "")
-
-    # Calculate max chunk size
-    prompt_overhead = len(prompt_template) + 500
-    if max_tokens_override:
-        max_chars = int(int(max_tokens_override) * 4) - prompt_overhead
-    else:
-        max_chars = get_max_corpus_chars(model, prompt_overhead)
+    # Chunk for the primary model; fallbacks must fit the same chunks
+    model = model_router.primary("generation", source_id)
+    max_chars = get_max_chunk_chars(model, prompt_template)
 
     logger.info(f"Using model: {model}, max_chars per chunk: {max_chars}")
 
     # Chunk corpus
-    chunks = chunk_corpus(corpus, max_chars)
+    chunks = chunk_corpus(corpus, max_chars) if isinstance(corpus, str) else chunk_pages(corpus, max_chars)
+    return await generate_from_chunks(client, chunks, prompt_template, target_count, dedupe_stats, source_id, refresh)
+
+
+async def generate_from_chunks(
+    client: "AsyncOpenAI",
+    chunks: list[CorpusChunk],
+    prompt_template: str,
+    target_count: int = 5,
+    dedupe_stats: DedupeStats | None = None,
+    source_id: str | None = None,
+    refresh: bool = False
+) -> list[MarketProposal]:
+    """Generate and dedupe markets for chunks that are already prefiltered and sized for the model."""
     logger.info(f"Processing {len(chunks)} chunk(s)")
 
     # Process each chunk
@@ -138,7 +259,7 @@ async def generate_markets(
 
     for i, chunk in enumerate(chunks):
         try:
-            proposals = await process_chunk(client, chunk, prompt_template, model, current_date)
+            proposals = await generate_chunk(client, chunk.render(), prompt_template, current_date, source_id, refresh)
             all_proposals.extend(proposals)
             logger.info(f"Chunk {i+1}/{len(chunks)}: {len(proposals)} markets")
         except Exception as e:
@@ -146,10 +267,187 @@ async def generate_markets(
             # Continue with other chunks
 
     # Deduplicate
-    unique = dedupe_proposals(all_proposals)
+    if dedupe_stats is not None:
+        dedupe_stats.total += len(all_proposals)
+    unique = dedupe_proposals(all_proposals, stats=dedupe_stats)
     logger.info(f"Generated {len(unique)} unique proposals from {len(all_proposals)} total")
 
     return unique[:target_count]
 
 
-__all__ = ['generate_markets', 'MarketProposal']
+async def generate_markets_streaming(
+    client: "AsyncOpenAI",
+    pages: AsyncIterator[PageSegment],
+    prompt_template: str,
+    target_count: int = 5,
+    dedupe_stats: DedupeStats | None = None,
+    source_id: str | None = None,
+    prefilter_stats: PrefilterStats | None = None
+) -> list[MarketProposal]:
+    """
+    Generate markets while the crawl is still running.
+    Pages are prefiltered and packed into chunks as they arrive and each full chunk is
+    dispatched at once, so crawl and LLM latency overlap once a corpus outgrows one chunk
+    (or PIPELINE_CHUNK_CHARS caps the chunk size). At most PIPELINE_MAX_IN_FLIGHT
+    chunks are in flight; beyond that the crawl waits (backpressure).
+    """
+    model = model_router.primary("generation", source_id)
+    max_chars = get_max_chunk_chars(model, prompt_template)
+    # Chunks fill the model's context by default: each extra chunk is another request that
+    # resends the prompt prefix. A cap trades that for earlier dispatch and more overlap.
+    if chunk_cap := os.getenv("PIPELINE_CHUNK_CHARS"):
+        max_chars = min(max_chars, int(chunk_cap))
+    in_flight = asyncio.Semaphore(int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "2")))
+    current_date = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    packer = ChunkPacker(max_chars)
+    tasks: list[asyncio.Task] = []
+
+    async def run_chunk(n: int, text: str) -> list[MarketProposal]:
+        try:
+            proposals = await generate_chunk(client, text, prompt_template, current_date, source_id)
+            logger.info(f"Chunk {n}: {len(proposals)} markets")
+            return proposals
+        except Exception as e:
+            logger.error(f"Chunk {n} failed: {e}")
+            return []
+        finally:
+            in_flight.release()
+
+    async def dispatch(chunks: list) -> None:
+        for chunk in chunks:
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(run_chunk(len(tasks) + 1, chunk.render())))
+
+    try:
+        async for page in pages:
+            if PREFILTER_ENABLED and (page := prefilter_page(page, datetime.now(timezone.utc), prefilter_stats)) is None:
+                continue
+            await dispatch(packer.add(page))
+        await dispatch(packer.flush())
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    all_proposals = [p for proposals in results for p in proposals]
+    if dedupe_stats is not None:
+        dedupe_stats.total += len(all_proposals)
+    unique = dedupe_proposals(all_proposals, stats=dedupe_stats)
+    logger.info(f"Generated {len(unique)} unique proposals from {len(all_proposals)} total across {len(tasks)} chunk(s)")
+
+    return unique[:target_count]
+
+
+def add_generation_requests(
+    batch: DeferredBatch,
+    pages: list[PageSegment],
+    prompt_template: str,
+    source_id: str | None = None,
+    prefilter_stats: PrefilterStats | None = None
+) -> list[str]:
+    """
+    Deferred mode: prefilter and chunk a source's pages as generate_markets does, and
+    queue one batch request per chunk. Returns the request ids for markets_from_batch.
+    """
+    pages = prefilter_pages(pages, datetime.now(timezone.utc), prefilter_stats)
+    model = model_router.primary("generation", source_id)
+    current_date = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    chunks = chunk_pages(pages, get_max_chunk_chars(model, prompt_template))
+    logger.info(f"Queued {len(chunks)} chunk(s) for {source_id} in the generation batch")
+    return [
+        batch.add("generation", chunk_request(chunk.render(), prompt_template, model, current_date))
+        for chunk in chunks
+    ]
+
+
+def markets_from_batch(
+    contents: dict[str, str | None],
+    request_ids: list[str],
+    target_count: int = 5,
+    dedupe_stats: DedupeStats | None = None
+) -> list[MarketProposal]:
+    """Validate and dedupe the markets a finished batch returned for one source's chunks."""
+    all_proposals = [p for request_id in request_ids for p in parse_markets(contents.get(request_id))]
+    if dedupe_stats is not None:
+        dedupe_stats.total += len(all_proposals)
+    unique = dedupe_proposals(all_proposals, stats=dedupe_stats)
+    logger.info(f"Generated {len(unique)} unique proposals from {len(all_proposals)} total across {len(request_ids)} chunk(s)")
+    return unique[:target_count]
+
+
+async def generate_markets_packed(
+    client: "AsyncOpenAI",
+    sources: list[PackedSource],
+    prompt_template: str,
+    target_counts: dict[str, int],
+    dedupe_stats: DedupeStats | None = None,
+    prefilter_stats: PrefilterStats | None = None
+) -> dict[str, list[MarketProposal]]:
+    """
+    Generate markets for several sources sharing a prompt family.
+    Small corpora are bin-packed into shared requests with per-section source tags,
+    and the returned markets are split back out per source.
+    """
+    # A packed request is routed like the family's first source
+    route_id = sources[0].source_id if sources else None
+    model = model_router.primary("generation", route_id)
+    max_chars = get_max_chunk_chars(model, prompt_template)
+    current_date = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+    now = datetime.now(timezone.utc)
+    for s in sources:
+        s.pages = prefilter_pages(s.pages, now, prefilter_stats)
+
+    results: dict[str, list[MarketProposal]] = {s.source_id: [] for s in sources}
+    bins, oversized = pack_corpora([s for s in sources if s.pages], max_chars)
+
+    for i, group in enumerate(bins):
+        source_ids = [s.source_id for s in group]
+        try:
+            proposals = await generate_chunk(client, render_packed_corpus(group), prompt_template, current_date, route_id)
+        except Exception as e:
+            logger.error(f"Packed request {i+1}/{len(bins)} ({source_ids}) failed: {e}")
+            continue
+        if dedupe_stats is not None:
+            dedupe_stats.total += len(proposals)
+        for source_id, markets in split_by_source(proposals, group).items():
+            results[source_id].extend(markets)
+        logger.info(f"Packed request {i+1}/{len(bins)}: {len(proposals)} markets for {source_ids}")
+
+    # Corpora too large to share a request fall back to per-source chunking (already prefiltered)
+    for s in oversized:
+        results[s.source_id] = await generate_from_chunks(
+            client,
+            chunk_pages(s.pages, max_chars),
+            prompt_template,
+            target_counts.get(s.source_id, 5),
+            dedupe_stats,
+            s.source_id
+        )
+
+    return {
+        source_id: dedupe_proposals(markets, stats=dedupe_stats)[:target_counts.get(source_id, 5)]
+        for source_id, markets in results.items()
+    }
+
+
+__all__ = [
+    'add_generation_requests',
+    'BatchFailed',
+    'DeferredBatch',
+    'generate_markets',
+    'generate_markets_packed',
+    'generate_markets_streaming',
+    'dedupe_proposals',
+    'DedupeStats',
+    'MarketProposal',
+    'LatencyBudgetExceeded',
+    'markets_from_batch',
+    'PackedSource',
+    'PageSegment',
+    'PrefilterStats',
+    'model_router',
+    'recent_markets',
+    'start_job_budget',
+    'usage_snapshot',
+]
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable
+
+import httpx
+
+from .usage import record_usage
+
+logger = logging.getLogger(__name__)
+
+# Any OpenAI-compatible Batch API; point it at benchmarks/batch_standin.py to run deferred jobs locally
+BATCH_API_BASE_URL = os.getenv("BATCH_API_BASE_URL") or os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+# The provider's 24h completion window, plus slack for upload and download
+BATCH_MAX_WAIT_SECONDS = float(os.getenv("BATCH_MAX_WAIT_SECONDS", str(26 * 3600)))
+COMPLETION_WINDOW = "24h"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchFailed(Exception):
+    """A batch ended without results (failed, cancelled, or waited on past BATCH_MAX_WAIT_SECONDS)."""
+
+
+class BatchClient:
+    """
+    Minimal client for the files and batches endpoints of an OpenAI-compatible Batch API.
+    The pinned openai SDK predates client.batches, so this speaks the REST API directly.
+    """
+
+    def __init__(self, base_url: str = BATCH_API_BASE_URL, api_key: str | None = None) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self._client: httpx.AsyncClient | None = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            api_key = self.api_key or os.getenv("OPENAI_API_KEY", "")
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+                timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+        return self._client
+
+    async def submit(self, lines: list[dict], metadata: dict[str, str] | None = None) -> dict:
+        """Upload lines as a JSONL batch file and start a batch on it. Returns the batch object."""
+        payload = "".join(json.dumps(line) + "\n" for line in lines).encode()
+        response = await self._http().post(
+            "/files",
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", payload, "application/jsonl")}
+        )
+        response.raise_for_status()
+        input_file_id = response.json()["id"]
+
+        response = await self._http().post("/batches", json={
+            "input_file_id": input_file_id,
+            "endpoint": "/v1/chat/completions",
+            "completion_window": COMPLETION_WINDOW,
+            "metadata": metadata or {},
+        })
+        response.raise_for_status()
+        return response.json()
+
+    async def retrieve(self, batch_id: str) -> dict:
+        response = await self._http().get(f"/batches/{batch_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def cancel(self, batch_id: str) -> None:
+        response = await self._http().post(f"/batches/{batch_id}/cancel")
+        response.raise_for_status()
+
+    async def results(self, batch: dict) -> dict[str, dict]:
+        """Output and error lines of a finished batch, by custom_id."""
+        lines: dict[str, dict] = {}
+        for file_id in (batch.get("error_file_id"), batch.get("output_file_id")):
+            if not file_id:
+                continue
+            response = await self._http().get(f"/files/{file_id}/content")
+            response.raise_for_status()
+            for raw in response.text.splitlines():
+                if raw.strip():
+                    line = json.loads(raw)
+                    lines[line["custom_id"]] = line
+        return lines
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+def batch_status(batch: dict) -> dict:
+    """The parts of a batch object worth reporting on a job."""
+    counts = batch.get("request_counts") or {}
+    return {
+        "id": batch.get("id"),
+        "status": batch.get("status"),
+        "total": counts.get("total"),
+        "completed": counts.get("completed"),
+        "failed": counts.get("failed"),
+    }
+
+
+class DeferredBatch:
+    """
+    Chat completion requests collected across a job's sources and submitted as one batch file.
+    Each request is added with its pipeline stage, so usage is recorded per stage.
+    """
+
+    def __init__(self, client: BatchClient | None = None, metadata: dict[str, str] | None = None) -> None:
+        self.client = client or batch_client
+        self.metadata = metadata or {}
+        self._requests: dict[str, tuple[str, dict]] = {}  # custom_id -> (stage, body)
+
+    def add(self, stage: str, body: dict) -> str:
+        """Queue a chat.completions.create body; returns its custom_id."""
+        custom_id = f"{stage}-{len(self._requests)}"
+        self._requests[custom_id] = (stage, body)
+        return custom_id
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    async def run(self, on_update: Callable[[dict], None] | None = None) -> dict[str, str | None]:
+        """
+        Submit the batch, poll until it finishes and return each request's message content
+        (None for requests that failed). on_update receives batch_status() after every poll.
+        """
+        if not self._requests:
+            return {}
+        lines = [
+            {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+            for custom_id, (_, body) in self._requests.items()
+        ]
+        batch = await self.client.submit(lines, self.metadata)
+        logger.info(f"Submitted batch {batch['id']} with {len(lines)} requests")
+
+        deadline = time.monotonic() + BATCH_MAX_WAIT_SECONDS
+        while batch.get("status") not in TERMINAL_STATUSES:
+            if on_update:
+                on_update(batch_status(batch))
+            if time.monotonic() > deadline:
+                try:
+                    await self.client.cancel(batch["id"])
+                except httpx.HTTPError as e:
+                    logger.warning(f"Failed to cancel batch {batch['id']}: {e}")
+                raise BatchFailed(f"Batch {batch['id']} still {batch.get('status')} after {BATCH_MAX_WAIT_SECONDS:.0f}s")
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+            try:
+                batch = await self.client.retrieve(batch["id"])
+            except httpx.HTTPError as e:
+                # A failed poll doesn't affect the batch; try again next interval
+                logger.warning(f"Polling batch {batch['id']} failed, retrying: {e}")
+        if on_update:
+            on_update(batch_status(batch))
+
+        # Expired batches still return the requests that completed in the window
+        if not batch.get("output_file_id"):
+            raise BatchFailed(f"Batch {batch['id']} {batch.get('status')}: {batch.get('errors') or 'no output'}")
+        results = await self.client.results(batch)
+
+        contents: dict[str, str | None] = {}
+        for custom_id, (stage, _) in self._requests.items():
+            response = (results.get(custom_id) or {}).get("response") or {}
+            if response.get("status_code") != 200:
+                error = (results.get(custom_id) or {}).get("error") or response.get("body") or "missing from output"
+                logger.warning(f"Batch {batch['id']} request {custom_id} failed: {error}")
+                contents[custom_id] = None
+                continue
+            body = response["body"]
+            record_usage(f"{stage}_batch", body.get("usage"))
+            contents[custom_id] = body["choices"][0]["message"]["content"]
+
+        failed = sum(content is None for content in contents.values())
+        logger.info(f"Batch {batch['id']} {batch['status']}: {len(contents) - failed} results, {failed} failed")
+        return contents
+
+
+# Process-wide Batch API client
+batch_client = BatchClient()
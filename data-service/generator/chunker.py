@@ -1,44 +1,140 @@
 import logging
+from dataclasses import dataclass, field
+
+from crawler.config import PageSegment
 
 logger = logging.getLogger(__name__)
 
+PAGE_SEPARATOR = "\n\n"
+
 
-def chunk_corpus(corpus: str, max_chars: int) -> list[str]:
+@dataclass(slots=True)
+class CorpusChunk:
     """
-    Split corpus into chunks that fit within token limits.
-    Splits on page boundaries (--- PAGE: ... ---) to keep context intact.
+    A chunk that references slices of existing strings by offset.
+    The chunk text is only materialized by render(), right before it is sent.
+    """
+    parts: list[tuple[str, int, int]] = field(default_factory=list)  # (text, start, end)
+    size: int = 0
+
+    def add(self, text: str, start: int = 0, end: int | None = None) -> None:
+        end = len(text) if end is None else end
+        self.parts.append((text, start, end))
+        self.size += end - start
+
+    def render(self) -> str:
+        return ''.join(text[start:end] for text, start, end in self.parts)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def chunk_pages(pages: list[PageSegment], max_chars: int) -> list[CorpusChunk]:
+    """
+    Pack page segments into chunks that fit within token limits, keeping pages intact.
+    A single page larger than max_chars is truncated.
+    """
+    chunks: list[CorpusChunk] = []
+    current = CorpusChunk()
+
+    for page in pages:
+        header = page.header
+        sep = len(PAGE_SEPARATOR) if current.size else 0
+
+        if current.size + sep + len(page) > max_chars and current.size:
+            chunks.append(current)
+            current = CorpusChunk()
+            sep = 0
+
+        if sep:
+            current.add(PAGE_SEPARATOR)
+        if len(page) > max_chars:
+            logger.warning(f"Single page exceeds max_chars ({len(page)} > {max_chars}), truncating")
+            current.add(header, 0, min(len(header), max_chars))
+            current.add(page.text, 0, max(max_chars - len(header), 0))
+        else:
+            current.add(header)
+            current.add(page.text)
+
+    if current.size:
+        chunks.append(current)
+
+    if len(chunks) > 1:
+        logger.info(f"Split {len(pages)} pages into {len(chunks)} chunks")
+    return chunks
+
+
+def chunk_corpus(corpus: str, max_chars: int) -> list[CorpusChunk]:
+    """
+    Split a joined corpus into chunks that fit within token limits.
+    Splits on page boundaries (--- PAGE: ... ---) by offset, without copying pages.
     """
     if len(corpus) <= max_chars:
-        return [corpus]
+        chunk = CorpusChunk()
+        chunk.add(corpus)
+        return [chunk]
 
-    chunks: list[str] = []
-    # Split on page boundaries
-    pages = corpus.split("\n\n--- PAGE:")
+    # Page boundaries: each page starts at a marker (the first page at 0)
+    marker = "\n\n--- PAGE:"
+    starts = [0]
+    pos = corpus.find(marker)
+    while pos != -1:
+        if pos > 0:
+            starts.append(pos)
+        pos = corpus.find(marker, pos + 1)
+    bounds = zip(starts, starts[1:] + [len(corpus)])
 
-    current_chunk = ""
-    for i, page in enumerate(pages):
-        # Restore the page marker (except for first page which doesn't have it)
-        page_with_marker = f"\n\n--- PAGE:{page}" if i > 0 else page
+    chunks: list[CorpusChunk] = []
+    current = CorpusChunk()
+    for start, end in bounds:
+        if current.size + (end - start) <= max_chars:
+            current.add(corpus, start, end)
+            continue
 
-        # Check if adding this page would exceed limit
-        if len(current_chunk) + len(page_with_marker) <= max_chars:
-            current_chunk += page_with_marker
+        if current.size:
+            chunks.append(current)
+        current = CorpusChunk()
+        if end - start > max_chars:
+            logger.warning(f"Single page exceeds max_chars ({end - start} > {max_chars}), truncating")
+            current.add(corpus, start, start + max_chars)
         else:
-            # Save current chunk if not empty
-            if current_chunk.strip():
-                chunks.append(current_chunk)
-            
-            # Start new chunk with this page
-            # If single page exceeds limit, truncate it
-            if len(page_with_marker) > max_chars:
-                logger.warning(f"Single page exceeds max_chars ({len(page_with_marker)} > {max_chars}), truncating")
-                current_chunk = page_with_marker[:max_chars]
-            else:
-                current_chunk = page_with_marker
-
-    # Don't forget the last chunk
-    if current_chunk.strip():
-        chunks.append(current_chunk)
+            current.add(corpus, start, end)
+
+    if current.size:
+        chunks.append(current)
 
     logger.info(f"Split corpus ({len(corpus)} chars) into {len(chunks)} chunks")
     return chunks
+
+
+class ChunkPacker:
+    """
+    Packs pages into chunks as they arrive from a streaming crawl.
+    add() returns chunks that are full and ready to dispatch; flush() returns the rest.
+    """
+
+    def __init__(self, max_chars: int) -> None:
+        self.max_chars = max_chars
+        self._pending: list[PageSegment] = []
+        self._size = 0
+
+    def add(self, page: PageSegment) -> list[CorpusChunk]:
+        ready: list[CorpusChunk] = []
+        sep = len(PAGE_SEPARATOR) if self._pending else 0
+        if self._pending and self._size + sep + len(page) > self.max_chars:
+            ready.extend(self.flush())
+            sep = 0
+
+        self._pending.append(page)
+        self._size += sep + len(page)
+        if self._size >= self.max_chars:
+            ready.extend(self.flush())
+        return ready
+
+    def flush(self) -> list[CorpusChunk]:
+        if not self._pending:
+            return []
+        chunks = chunk_pages(self._pending, self.max_chars)
+        self._pending = []
+        self._size = 0
+        return chunks
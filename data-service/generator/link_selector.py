@@ -1,21 +1,20 @@
 import json
 import logging
 from datetime import datetime, timezone
-
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING
 
 from crawler.config import LinkInfo
+from .prompts import compile_prompt
+from .usage import record_usage
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
 LINK_SELECTOR_PROMPT = """You are selecting news links for prediction market generation.
 
-AVAILABLE LINKS FROM {source_url}:
-{links_json}
-
-TODAY: {current_date}
-
-TASK: Select exactly 3 links most likely to contain upcoming events suitable for YES/NO prediction markets.
+TASK: Select the links most likely to contain upcoming events suitable for YES/NO prediction markets, best first, up to the number requested below.
 
 PRIORITIZE:
 - Sports fixtures, match schedules
@@ -30,22 +29,22 @@ AVOID:
 - Generic category/archive pages
 - About/contact pages
 
-Return JSON: {{"selected_urls": ["url1", "url2", "url3"]}}
+Return JSON: {"selected_urls": ["url1", "url2", ...]}
 
-If fewer than 3 good links exist, return what you have. Never return an empty array unless there are truly no relevant links."""
+If fewer good links exist than requested, return what you have. Never return an empty array unless there are truly no relevant links.
 
+TODAY: {current_date}
 
-async def select_links(
-    client: AsyncOpenAI,
-    links: list[LinkInfo],
-    source_url: str,
-    model: str = "gpt-4o-mini"
-) -> list[str]:
-    """AI selects the most relevant links for market generation."""
-    if not links:
-        logger.warning("No links provided for selection")
-        return []
-    
+SELECT UP TO: {max_links} links
+
+AVAILABLE LINKS FROM {source_url}:
+{links_json}"""
+
+LINK_SELECTOR_FIELDS = ("current_date", "max_links", "source_url", "links_json")
+
+
+def link_selection_request(links: list[LinkInfo], source_url: str, model: str, max_links: int = 3) -> dict:
+    """chat.completions.create arguments for a link selection; also the body of a batch request."""
     # Format links for AI
     links_data = [
         {"url": link.url, "text": link.text, "context": link.context}
@@ -53,35 +52,58 @@ async def select_links(
     ]
     
     current_date = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-    prompt = LINK_SELECTOR_PROMPT.format(
+    messages = compile_prompt(LINK_SELECTOR_PROMPT, LINK_SELECTOR_FIELDS).messages(
         source_url=source_url,
         links_json=json.dumps(links_data, indent=2),
-        current_date=current_date
+        current_date=current_date,
+        max_links=str(max_links)
     )
+    return {
+        "model": model,
+        "messages": messages,
+        "response_format": {"type": "json_object"},
+        "temperature": 0.3,  # Lower temperature for more consistent selection
+        "max_tokens": 500,
+    }
+
+
+def parse_link_selection(content: str | None, links: list[LinkInfo], max_links: int = 3) -> list[str]:
+    """Selected URLs from a link selection response, limited to the links offered. Raises json.JSONDecodeError."""
+    if not content:
+        logger.error("AI returned empty content for link selection")
+        return []
+    
+    data = json.loads(content)
+    selected = data.get("selected_urls", [])
+    
+    # Validate URLs exist in original links
+    valid_urls = {link.url for link in links}
+    validated = [url for url in selected if url in valid_urls]
+    
+    logger.info(f"AI selected {len(validated)} links from {len(links)} available")
+    return validated[:max_links]
+
+
+async def select_links(
+    client: "AsyncOpenAI",
+    links: list[LinkInfo],
+    source_url: str,
+    model: str = "gpt-4o-mini",
+    timeout: float | None = None,
+    max_links: int = 3
+) -> list[str]:
+    """AI selects the most relevant links for market generation."""
+    if not links:
+        logger.warning("No links provided for selection")
+        return []
     
     try:
         response = await client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.3,  # Lower temperature for more consistent selection
-            max_tokens=500
+            **link_selection_request(links, source_url, model, max_links),
+            timeout=timeout
         )
-        
-        content = response.choices[0].message.content
-        if not content:
-            logger.error("AI returned empty content for link selection")
-            return []
-        
-        data = json.loads(content)
-        selected = data.get("selected_urls", [])
-        
-        # Validate URLs exist in original links
-        valid_urls = {link.url for link in links}
-        validated = [url for url in selected if url in valid_urls]
-        
-        logger.info(f"AI selected {len(validated)} links from {len(links)} available")
-        return validated[:3]  # Hard cap at 3
+        record_usage("link_selection", getattr(response, "usage", None))
+        return parse_link_selection(response.choices[0].message.content, links, max_links)
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse AI link selection: {e}")
@@ -91,4 +113,4 @@ async def select_links(
         raise
 
 
-__all__ = ['select_links', 'LinkInfo']
+__all__ = ['select_links', 'link_selection_request', 'parse_link_selection', 'LinkInfo']
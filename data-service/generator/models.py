@@ -1,8 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class MarketProposal:
     question: str
     description: str
@@ -12,6 +12,23 @@ class MarketProposal:
     resolves_at: str        # ISO timestamp
     resolution_context: str
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "MarketProposal":
+        """Build a proposal from a raw AI market object; nulls become "" and other values strings."""
+        def text(name: str, default: str = "") -> str:
+            value = data.get(name)
+            return default if value is None else str(value)
+
+        return cls(
+            question=text("question"),
+            description=text("description"),
+            source_url=text("source_url"),
+            category=text("category", "news"),
+            betting_closes_at=text("betting_closes_at"),
+            resolves_at=text("resolves_at"),
+            resolution_context=text("resolution_context")
+        )
+
     def is_valid(self) -> bool:
         """Validate the proposal."""
         if not self.question or not self.question.endswith('?'):
@@ -33,3 +50,31 @@ class MarketProposal:
             return False
         
         return True
+
+
+MARKET_FIELDS: list[str] = [f.name for f in fields(MarketProposal)]
+
+# Strict structured-output schema mirroring MarketProposal
+MARKETS_RESPONSE_FORMAT: dict = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "market_proposals",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "markets": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {name: {"type": "string"} for name in MARKET_FIELDS},
+                        "required": MARKET_FIELDS,
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["markets"],
+            "additionalProperties": False,
+        },
+    },
+}
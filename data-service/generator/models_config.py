@@ -7,6 +7,8 @@ class ModelConfig:
     max_tokens: int          # Total context window
     max_output_tokens: int   # Reserved for response
     chars_per_token: float   # Approximation for chunking
+    supports_json_schema: bool = False  # Strict structured outputs
+    tier: int = 0            # Fallback order: higher tiers are cheaper/faster
 
 
 MODELS: dict[str, ModelConfig] = {
@@ -15,31 +17,46 @@ MODELS: dict[str, ModelConfig] = {
         max_tokens=128000,
         max_output_tokens=4096,
         chars_per_token=4.0,
+        tier=0,
     ),
     "gpt-4o": ModelConfig(
         name="gpt-4o",
         max_tokens=128000,
         max_output_tokens=4096,
         chars_per_token=4.0,
+        supports_json_schema=True,
+        tier=1,
     ),
     "gpt-4o-mini": ModelConfig(
         name="gpt-4o-mini",
         max_tokens=128000,
         max_output_tokens=4096,
         chars_per_token=4.0,
+        supports_json_schema=True,
+        tier=2,
     ),
     "gpt-3.5-turbo": ModelConfig(
         name="gpt-3.5-turbo",
         max_tokens=16385,
         max_output_tokens=4096,
         chars_per_token=4.0,
+        tier=3,
     ),
 }
 
 
+def get_context_chars(model_name: str) -> int:
+    """Approximate input capacity of a model in characters."""
+    config = MODELS.get(model_name, MODELS["gpt-4-turbo-preview"])
+    return int((config.max_tokens - config.max_output_tokens) * config.chars_per_token)
+
+
 def get_max_corpus_chars(model_name: str, prompt_chars: int) -> int:
     """Calculate max corpus size for a model, accounting for prompt overhead."""
-    config = MODELS.get(model_name, MODELS["gpt-4-turbo-preview"])
-    available_tokens = config.max_tokens - config.max_output_tokens
-    available_chars = int(available_tokens * config.chars_per_token)
-    return available_chars - prompt_chars - 1000  # Safety margin
+    return get_context_chars(model_name) - prompt_chars - 1000  # Safety margin
+
+
+def supports_json_schema(model_name: str) -> bool:
+    """Whether a model accepts strict json_schema response formats."""
+    config = MODELS.get(model_name)
+    return config.supports_json_schema if config else False
@@ -0,0 +1,103 @@
+import logging
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from crawler.config import PageSegment
+from .models import MarketProposal
+
+logger = logging.getLogger(__name__)
+
+SOURCE_HEADER = "=== SOURCE: {source_id} ==="
+SOURCE_FOOTER = "=== END SOURCE: {source_id} ==="
+
+
+@dataclass(slots=True)
+class PackedSource:
+    """A crawled corpus waiting to be packed into a shared generation request."""
+    source_id: str
+    pages: list[PageSegment]
+    seed_url: str = ""
+
+    @property
+    def page_urls(self) -> list[str]:
+        return [p.url for p in self.pages]
+
+    def corpus_chars(self) -> int:
+        return sum(len(p) for p in self.pages) + 2 * max(len(self.pages) - 1, 0)
+
+    def section_chars(self) -> int:
+        """Size of this corpus once wrapped in its source tags."""
+        return (
+            self.corpus_chars()
+            + len(SOURCE_HEADER.format(source_id=self.source_id))
+            + len(SOURCE_FOOTER.format(source_id=self.source_id))
+            + 4
+        )
+
+
+def pack_corpora(sources: list[PackedSource], max_chars: int) -> tuple[list[list[PackedSource]], list[PackedSource]]:
+    """
+    Bin-pack corpora into groups that each fit in a single request (first-fit decreasing).
+    Returns (bins, oversized) where oversized corpora must be chunked on their own.
+    """
+    bins: list[list[PackedSource]] = []
+    bin_sizes: list[int] = []
+    oversized: list[PackedSource] = []
+
+    for source in sorted(sources, key=lambda s: s.section_chars(), reverse=True):
+        size = source.section_chars()
+        if size > max_chars:
+            oversized.append(source)
+            continue
+
+        for i, used in enumerate(bin_sizes):
+            if used + size <= max_chars:
+                bins[i].append(source)
+                bin_sizes[i] += size
+                break
+        else:
+            bins.append([source])
+            bin_sizes.append(size)
+
+    logger.info(f"Packed {len(sources) - len(oversized)} corpora into {len(bins)} request(s), {len(oversized)} oversized")
+    return bins, oversized
+
+
+def render_packed_corpus(sources: list[PackedSource]) -> str:
+    """Join corpora into one corpus with per-section source tags."""
+    parts: list[str] = []
+    for i, s in enumerate(sources):
+        if i:
+            parts.append('\n\n')
+        parts.append(SOURCE_HEADER.format(source_id=s.source_id) + '\n')
+        for j, page in enumerate(s.pages):
+            if j:
+                parts.append('\n\n')
+            parts.append(page.header)
+            parts.append(page.text)
+        parts.append('\n' + SOURCE_FOOTER.format(source_id=s.source_id))
+    return ''.join(parts)
+
+
+def split_by_source(
+    proposals: list[MarketProposal],
+    sources: list[PackedSource]
+) -> dict[str, list[MarketProposal]]:
+    """Assign markets from a packed request back to the source whose pages they cite."""
+    by_url: dict[str, str] = {}
+    by_host: dict[str, str] = {}
+    for s in sources:
+        for url in s.page_urls:
+            by_url[url.rstrip('/')] = s.source_id
+        host = urlparse(s.seed_url).netloc
+        if host:
+            by_host.setdefault(host, s.source_id)
+
+    result: dict[str, list[MarketProposal]] = {s.source_id: [] for s in sources}
+    for p in proposals:
+        source_id = by_url.get(p.source_url.rstrip('/')) or by_host.get(urlparse(p.source_url).netloc)
+        if source_id is None:
+            logger.warning(f"Packed market cites unknown source, dropped: {p.source_url}")
+            continue
+        result[source_id].append(p)
+    return result
@@ -1,5 +1,7 @@
 from .npfl import NPFL_PROMPT
 from .punch import PUNCH_PROMPT
 from .bbc import BBC_PROMPT
+from .news import NEWS_PROMPT
+from .template import CompiledPrompt, compile_prompt
 
-__all__ = ['NPFL_PROMPT', 'PUNCH_PROMPT', 'BBC_PROMPT']
+__all__ = ['NPFL_PROMPT', 'PUNCH_PROMPT', 'BBC_PROMPT', 'NEWS_PROMPT', 'CompiledPrompt', 'compile_prompt']
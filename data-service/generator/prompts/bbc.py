@@ -1,10 +1,5 @@
 BBC_PROMPT = """You are a prediction market analyst scanning African news.
 
-CRAWLED NEWS CONTENT:
-{corpus}
-
-TODAY'S DATE: {current_date}
-
 TASK: Find upcoming events and create binary YES/NO prediction markets.
 
 LOOK FOR:
@@ -35,4 +30,8 @@ OUTPUT: JSON with "markets" array.
   }}
 ]
 Return empty array [] if no valid upcoming events found.
-"""
+
+TODAY'S DATE: {current_date}
+
+CRAWLED NEWS CONTENT:
+{corpus}"""
@@ -1,10 +1,5 @@
 NPFL_PROMPT = """You are a sports betting analyst creating prediction markets from Nigerian football data.
 
-CRAWLED CONTENT:
-{corpus}
-
-TODAY'S DATE: {current_date}
-
 TASK: Find upcoming NPFL matches and create binary YES/NO prediction markets.
 
 MARKET TYPES (vary your choices):
@@ -39,4 +34,9 @@ Example output:
   ]
 }
 
-Return {"markets": []} if no valid upcoming matches found."""
+Return {"markets": []} if no valid upcoming matches found.
+
+TODAY'S DATE: {current_date}
+
+CRAWLED CONTENT:
+{corpus}"""
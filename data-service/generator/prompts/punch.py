@@ -1,10 +1,5 @@
 PUNCH_PROMPT = """You are a prediction market analyst scanning Nigerian news for upcoming events.
 
-CRAWLED NEWS CONTENT:
-{corpus}
-
-TODAY'S DATE: {current_date}
-
 TASK: Find upcoming events with clear binary outcomes and create YES/NO prediction markets.
 
 EVENT TYPES TO LOOK FOR:
@@ -50,4 +45,9 @@ Example:
 }
 
 Return {"markets": []} if no valid upcoming events with clear binary outcomes are found.
-Do NOT create markets for past events or events without specific timing."""
+Do NOT create markets for past events or events without specific timing.
+
+TODAY'S DATE: {current_date}
+
+CRAWLED NEWS CONTENT:
+{corpus}"""
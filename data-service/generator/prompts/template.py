@@ -0,0 +1,63 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Placeholders filled per request; everything else in a template is static
+DYNAMIC_FIELDS = ("corpus", "current_date")
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """
+    A prompt template split once into a static prefix and a dynamic tail.
+
+    The prefix (rules, examples) is sent unchanged as the system message so
+    provider-side prompt caching can reuse it across calls. The tail holds the
+    placeholders and is rendered in a single join, without rescanning the corpus.
+    """
+    prefix: str
+    segments: tuple[str, ...]   # Literal text, alternating with fields
+    fields: tuple[str, ...]     # Placeholder names between segments
+
+    def render_tail(self, **values: str) -> str:
+        """Render the dynamic part of the prompt."""
+        parts: list[str] = [self.segments[0]]
+        for name, literal in zip(self.fields, self.segments[1:]):
+            parts.append(values[name])
+            parts.append(literal)
+        return ''.join(parts)
+
+    def render(self, **values: str) -> str:
+        """Render the whole prompt as a single string."""
+        return self.prefix + self.render_tail(**values)
+
+    def messages(self, **values: str) -> list[dict[str, str]]:
+        """Render chat messages: static instructions first, dynamic content last."""
+        return [
+            {"role": "system", "content": self.prefix},
+            {"role": "user", "content": self.render_tail(**values)},
+        ]
+
+
+@lru_cache(maxsize=64)
+def compile_prompt(template: str, fields: tuple[str, ...] = DYNAMIC_FIELDS) -> CompiledPrompt:
+    """
+    Precompile a template. The static prefix ends at the last blank line before
+    the first placeholder, so the heading that introduces dynamic content
+    (e.g. "TODAY'S DATE:") travels with it.
+    """
+    pattern = re.compile(r"\{(" + "|".join(re.escape(f) for f in fields) + r")\}")
+    first = pattern.search(template)
+    if first is None:
+        return CompiledPrompt(prefix=template, segments=("",), fields=())
+
+    split_at = template.rfind("\n\n", 0, first.start())
+    split_at = 0 if split_at == -1 else split_at + 2
+    prefix, tail = template[:split_at], template[split_at:]
+
+    pieces = pattern.split(tail)
+    return CompiledPrompt(
+        prefix=prefix.rstrip(),
+        segments=tuple(pieces[0::2]),
+        fields=tuple(pieces[1::2]),
+    )
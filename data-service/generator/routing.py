@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from functools import cache
+from typing import Awaitable, Callable, TypeVar
+
+from .models_config import MODELS, get_context_chars
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Per-stage defaults when neither AI_MODEL_<STAGE> nor AI_MODEL is set
+DEFAULT_STAGE_MODELS = {
+    "link_selection": "gpt-4o-mini",
+    "generation": "gpt-4-turbo-preview",
+}
+
+DEFAULT_STAGE_TIMEOUTS = {
+    "link_selection": 30.0,
+    "generation": 120.0,
+}
+
+@cache
+def fallback_errors() -> tuple[type[BaseException], ...]:
+    """
+    Errors that mean "this model is slow or saturated right now", not "this request is bad".
+    The SDK is imported on the first call, which only happens once a client exists.
+    """
+    import openai
+    return (
+        asyncio.TimeoutError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+class LatencyBudgetExceeded(Exception):
+    """The job ran out of its latency budget before an LLM call could start."""
+
+
+class JobBudget:
+    """Wall-clock latency budget for one job."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+_current_budget: ContextVar[JobBudget | None] = ContextVar("job_budget", default=None)
+
+
+def start_job_budget(seconds: float | None = None) -> JobBudget:
+    """Start a latency budget for the current job task (JOB_LATENCY_BUDGET_SECONDS by default)."""
+    budget = JobBudget(seconds or float(os.getenv("JOB_LATENCY_BUDGET_SECONDS", "900")))
+    _current_budget.set(budget)
+    return budget
+
+
+def current_budget() -> JobBudget | None:
+    return _current_budget.get()
+
+
+class ModelRouter:
+    """
+    Picks models per pipeline stage and per source, with fallback to cheaper/faster tiers.
+
+    Resolution order for the primary model: source override, AI_MODEL_<STAGE>,
+    AI_MODEL, then the stage default. Fallbacks are every configured model of a
+    higher tier than the primary that can still fit the request.
+    """
+
+    def __init__(self) -> None:
+        self._source_models: dict[str, dict[str, str]] = {}
+
+    def set_source_models(self, source_id: str, models: dict[str, str]) -> None:
+        self._source_models[source_id] = dict(models)
+
+    def primary(self, stage: str, source_id: str | None = None) -> str:
+        override = self._source_models.get(source_id or "", {}).get(stage)
+        if override:
+            return override
+        return (
+            os.getenv(f"AI_MODEL_{stage.upper()}")
+            or os.getenv("AI_MODEL")
+            or DEFAULT_STAGE_MODELS[stage]
+        )
+
+    def chain(self, stage: str, source_id: str | None = None, min_context_chars: int = 0) -> list[str]:
+        """Primary model followed by fallback tiers, cheapest last."""
+        primary = self.primary(stage, source_id)
+        primary_tier = MODELS[primary].tier if primary in MODELS else -1
+        fallbacks = sorted(
+            (m for m in MODELS.values() if m.tier > primary_tier and m.name != primary),
+            key=lambda m: m.tier
+        )
+        return [primary] + [m.name for m in fallbacks if get_context_chars(m.name) >= min_context_chars]
+
+    def timeout(self, stage: str) -> float:
+        return float(os.getenv(f"AI_TIMEOUT_{stage.upper()}", DEFAULT_STAGE_TIMEOUTS[stage]))
+
+    async def call(
+        self,
+        stage: str,
+        call: Callable[[str, float], Awaitable[T]],
+        source_id: str | None = None,
+        min_context_chars: int = 0
+    ) -> T:
+        """
+        Run call(model, timeout) down the fallback chain until one succeeds.
+        Timeouts are capped by the job's remaining budget; once less than half a
+        stage timeout is left, skip straight to the fastest tier.
+        """
+        chain = self.chain(stage, source_id, min_context_chars)
+        stage_timeout = self.timeout(stage)
+        budget = current_budget()
+        last_error: BaseException | None = None
+
+        for attempt, model in enumerate(chain):
+            timeout = stage_timeout
+            if budget is not None:
+                remaining = budget.remaining()
+                if remaining <= 0:
+                    raise LatencyBudgetExceeded(f"{stage}: job latency budget of {budget.seconds:.0f}s exhausted")
+                if remaining < stage_timeout / 2 and model != chain[-1]:
+                    logger.info(f"[{stage}] {remaining:.0f}s of budget left, skipping {model} for faster tier")
+                    continue
+                timeout = min(timeout, remaining)
+
+            try:
+                # The SDK timeout lets streamed calls salvage partial output; wait_for is the hard stop
+                return await asyncio.wait_for(call(model, timeout), timeout + 5)
+            except fallback_errors() as e:
+                last_error = e
+                if attempt < len(chain) - 1:
+                    logger.warning(f"[{stage}] {model} failed ({type(e).__name__}), falling back to {chain[attempt + 1]}")
+
+        raise last_error or LatencyBudgetExceeded(f"{stage}: no model available")
+
+
+# Process-wide router
+model_router = ModelRouter()
@@ -0,0 +1,201 @@
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+
+from shared_cache import SharedCache, cache_key, shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no identity for a market question
+STOPWORDS = {
+    "will", "the", "a", "an", "in", "on", "at", "of", "to", "by", "be", "and", "or",
+    "is", "are", "this", "that", "for", "with", "vs", "v", "their", "its", "his", "her",
+    "before", "after", "during", "than", "any",
+}
+
+# Verbs the model uses interchangeably in YES/NO questions
+SYNONYMS = {
+    "defeat": "beat", "defeats": "beat", "beats": "beat", "overcome": "beat",
+    "wins": "win", "won": "win", "winning": "win",
+    "passes": "pass", "passed": "pass",
+    "exceeds": "exceed", "surpass": "exceed", "surpasses": "exceed", "above": "exceed",
+}
+
+NUM_PERM = 64
+BANDS = 32          # 32 bands x 2 rows: pairs at ~0.5 similarity almost always collide
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_SEEDS = [(2 * i + 1) * 0x9E3779B1 % _PRIME for i in range(NUM_PERM)]
+_OFFSETS = [(i + 7) * 0x85EBCA77 % _PRIME for i in range(NUM_PERM)]
+
+DEFAULT_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.6"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def question_features(question: str) -> frozenset[str]:
+    """Normalized unigrams plus ordered bigrams, so "A beat B" and "B beat A" stay apart."""
+    tokens = []
+    for tok in _TOKEN_RE.findall(question.lower()):
+        if tok in STOPWORDS:
+            continue
+        tok = SYNONYMS.get(tok, tok)
+        tokens.append(tok)
+    bigrams = {f"{a}_{b}" for a, b in zip(tokens, tokens[1:])}
+    return frozenset(tokens) | bigrams
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    """Jaccard similarity of two feature sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(features: frozenset[str]) -> tuple[int, ...]:
+    """MinHash signature with deterministic (process-independent) hashing."""
+    hashes = [zlib.crc32(f.encode()) for f in features] or [0]
+    return tuple(
+        min((seed * h + offset) % _PRIME for h in hashes)
+        for seed, offset in zip(_SEEDS, _OFFSETS)
+    )
+
+
+class SimilarityIndex:
+    """MinHash LSH index over market questions; candidates are verified exactly."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._features: dict[int, frozenset[str]] = {}
+        self._buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+
+    def _bands(self, signature: tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+    def add(self, key: int, question: str) -> None:
+        features = question_features(question)
+        self._features[key] = features
+        for band in self._bands(minhash(features)):
+            self._buckets.setdefault(band, []).append(key)
+
+    def remove(self, key: int) -> None:
+        features = self._features.pop(key, None)
+        if features is None:
+            return
+        for band in self._bands(minhash(features)):
+            bucket = self._buckets.get(band)
+            if bucket and key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def query(self, question: str) -> tuple[int, float] | None:
+        """Return (key, score) of the most similar indexed question above threshold."""
+        features = question_features(question)
+        candidates: set[int] = set()
+        for band in self._bands(minhash(features)):
+            candidates.update(self._buckets.get(band, ()))
+
+        best: tuple[int, float] | None = None
+        for key in candidates:
+            score = similarity(features, self._features[key])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+
+class RecentMarketIndex:
+    """
+    Questions recently delivered to Oracle, so later jobs don't resend near-duplicates.
+
+    Delivered questions are also written to the shared cache; sync() pulls in the
+    ones other workers delivered, so dedupe covers every worker on the host.
+    """
+
+    NAMESPACE = "recent_markets"
+
+    def __init__(
+        self,
+        cache: SharedCache | None = None,
+        ttl_seconds: float = float(os.getenv("DEDUPE_RECENT_TTL_HOURS", "72")) * 3600,
+        max_size: int = 5000
+    ) -> None:
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._index = SimilarityIndex()
+        self._entries: deque[tuple[int, float, str]] = deque()  # (index key, added at, shared key)
+        self._known: set[str] = set()
+        self._next_key = 0
+        # sync() runs in a worker thread while jobs query on the event loop
+        self._lock = threading.Lock()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        while self._entries and (self._entries[0][1] < cutoff or len(self._entries) > self.max_size):
+            key, _, shared_key = self._entries.popleft()
+            self._index.remove(key)
+            self._known.discard(shared_key)
+
+    def _add_local(self, shared_key: str, question: str, added_at: float) -> bool:
+        if shared_key in self._known:
+            return False
+        self._known.add(shared_key)
+        self._index.add(self._next_key, question)
+        self._entries.append((self._next_key, added_at, shared_key))
+        self._next_key += 1
+        return True
+
+    def add(self, questions: list[str]) -> None:
+        now = time.time()
+        delivered = []
+        with self._lock:
+            for q in questions:
+                shared_key = cache_key(q.lower().strip())
+                if self._add_local(shared_key, q, now):
+                    delivered.append((shared_key, q))
+            self._expire()
+        if self.cache is not None:
+            for shared_key, q in delivered:
+                self.cache.set(self.NAMESPACE, shared_key, {"question": q, "added_at": now}, self.ttl_seconds)
+
+    def sync(self) -> int:
+        """Pull in questions delivered by other workers; returns how many were new."""
+        if self.cache is None:
+            return 0
+        entries = sorted(self.cache.items(self.NAMESPACE), key=lambda item: item[1]["added_at"])
+        with self._lock:
+            added = sum(self._add_local(key, value["question"], value["added_at"]) for key, value in entries)
+            self._expire()
+        if added:
+            logger.debug(f"Synced {added} recently delivered markets from other workers")
+        return added
+
+    def contains(self, question: str, threshold: float) -> bool:
+        with self._lock:
+            self._expire()
+            self._index.threshold = threshold
+            return self._index.query(question) is not None
+
+
+@dataclass
+class DedupeStats:
+    """Per-job dedupe counters."""
+    total: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    recent_duplicates: int = 0
+    kept: int = 0
+
+
+# Process-wide index of markets already delivered to Oracle by any worker
+recent_markets = RecentMarketIndex(shared_cache)
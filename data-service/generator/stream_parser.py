@@ -0,0 +1,80 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MarketStreamParser:
+    """
+    Incremental scanner for streamed JSON market output.
+
+    Tracks string/escape state and container nesting as text arrives, and
+    returns each object that is a direct element of an array (i.e. each
+    market in {"markets": [...]} or a bare [...]) as soon as its closing
+    brace is seen. Markets that closed before a truncated or malformed
+    tail are kept.
+    """
+
+    def __init__(self) -> None:
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._capture: list[str] | None = None
+        self._capture_depth = 0
+        self._started = False
+        self.objects_seen = 0
+        self.parse_errors = 0
+
+    def feed(self, text: str) -> list[dict]:
+        """Consume the next piece of streamed text; return markets completed by it."""
+        completed: list[dict] = []
+        start = 0 if self._capture is not None else None
+
+        for i, ch in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._started = True
+                if ch == '{' and self._capture is None and self._stack and self._stack[-1] == '[':
+                    self._capture = []
+                    self._capture_depth = len(self._stack)
+                    start = i
+                self._stack.append(ch)
+            elif ch in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if ch == '}' and self._capture is not None and len(self._stack) == self._capture_depth:
+                    self._capture.append(text[start:i + 1])
+                    obj = self._decode(''.join(self._capture))
+                    if obj is not None:
+                        completed.append(obj)
+                    self._capture = None
+                    start = None
+
+        if self._capture is not None and start is not None:
+            self._capture.append(text[start:])
+        return completed
+
+    def _decode(self, raw: str) -> dict | None:
+        self.objects_seen += 1
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.parse_errors += 1
+            logger.warning(f"Skipping malformed market object: {e}")
+            return None
+        return obj if isinstance(obj, dict) else None
+
+    @property
+    def complete(self) -> bool:
+        """True once every opened container has been closed."""
+        return self._started and not self._stack and not self._in_string
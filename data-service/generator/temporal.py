@@ -0,0 +1,189 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from crawler.config import PageSegment
+
+logger = logging.getLogger(__name__)
+
+# Set TEMPORAL_PREFILTER=0 to send every page to the model
+PREFILTER_ENABLED = os.getenv("TEMPORAL_PREFILTER", "1").lower() not in ("0", "false", "no")
+# Pages published longer ago than this need an explicit future date to be kept
+STALE_DAYS = float(os.getenv("PREFILTER_STALE_DAYS", "3"))
+# Kept pages longer than this are trimmed to the lines around upcoming events
+TRIM_MIN_CHARS = 3000
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+
+# Whole month names and their usual abbreviations only, so "3 decades" or "market 5" are not dates
+_MONTH = (
+    r"(january|jan|february|feb|march|mar|april|apr|may|june|jun|july|jul|august|aug"
+    r"|september|sept|sep|october|oct|november|nov|december|dec)\b\.?"
+)
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+ISO_DATE = re.compile(r"\b(20\d\d)-(\d\d)-(\d\d)\b")
+DAY_MONTH = re.compile(rf"\b{_DAY}\s+(?:of\s+)?{_MONTH},?(?:\s+(20\d\d))?\b", re.I)
+MONTH_DAY = re.compile(rf"\b{_MONTH}\s+{_DAY}\b(?:,?\s+(20\d\d))?", re.I)
+# Day first, as written by the Nigerian and British sources
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(20\d\d)\b")
+
+RELATIVE_DAYS = {"today": 0, "tonight": 0, "this evening": 0, "tomorrow": 1, "yesterday": -1, "last night": -1}
+RELATIVE_DAY = re.compile(r"\b(today|tonight|this evening|tomorrow|yesterday|last night)\b", re.I)
+RELATIVE_WEEKDAY = re.compile(
+    r"\b(this|next|coming|last|on)\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", re.I
+)
+FUTURE_PERIOD = re.compile(
+    r"\b(next|coming|later this|this coming)\s+(week|weekend|month|season|year)\b|\bthis weekend\b|\bin the coming\b", re.I
+)
+PAST_PERIOD = re.compile(r"\b(last|earlier this|past)\s+(week|weekend|month|season|year)\b", re.I)
+# Forward-looking wording without a date
+FUTURE_CUES = re.compile(
+    r"\b(will|is set to|are set to|scheduled|upcoming|expected to|plans? to|due to|ahead of|"
+    r"kick-?off|fixtures?|deadline|to be held|forthcoming)\b",
+    re.I
+)
+
+
+@dataclass
+class PrefilterStats:
+    """Per-job counters for pages dropped or trimmed before generation."""
+    pages: int = 0
+    dropped: int = 0
+    trimmed: int = 0
+    chars_in: int = 0
+    chars_avoided: int = 0
+
+    @property
+    def tokens_avoided(self) -> int:
+        # Same 4 chars/token estimate as the chunk sizing
+        return self.chars_avoided // 4
+
+    def as_dict(self) -> dict:
+        return {
+            "pages": self.pages,
+            "dropped": self.dropped,
+            "trimmed": self.trimmed,
+            "chars_in": self.chars_in,
+            "chars_avoided": self.chars_avoided,
+            "tokens_avoided": self.tokens_avoided,
+        }
+
+
+def _make_date(year: int, month: int, day: int) -> date | None:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _yearless(month: int, day: int, reference: date) -> date | None:
+    """A date written without a year, placed in the year that keeps it nearest the reference."""
+    found = _make_date(reference.year, month, day)
+    if found and (found - reference).days < -180:
+        found = _make_date(reference.year + 1, month, day)
+    elif found and (found - reference).days > 180:
+        found = _make_date(reference.year - 1, month, day)
+    return found
+
+
+def find_dates(text: str, reference: date) -> list[date]:
+    """Absolute and relative date mentions in text; relative ones are resolved against reference."""
+    found: list[date | None] = []
+    for m in ISO_DATE.finditer(text):
+        found.append(_make_date(int(m[1]), int(m[2]), int(m[3])))
+    for m in NUMERIC_DATE.finditer(text):
+        found.append(_make_date(int(m[3]), int(m[2]), int(m[1])))
+    for day, month, year in ((m[1], m[2], m[3]) for m in DAY_MONTH.finditer(text)):
+        month_num = MONTHS[month[:3].lower()]
+        found.append(_make_date(int(year), month_num, int(day)) if year else _yearless(month_num, int(day), reference))
+    for month, day, year in ((m[1], m[2], m[3]) for m in MONTH_DAY.finditer(text)):
+        month_num = MONTHS[month[:3].lower()]
+        found.append(_make_date(int(year), month_num, int(day)) if year else _yearless(month_num, int(day), reference))
+
+    for m in RELATIVE_DAY.finditer(text):
+        found.append(reference + timedelta(days=RELATIVE_DAYS[m[1].lower()]))
+    for m in RELATIVE_WEEKDAY.finditer(text):
+        ahead = (WEEKDAYS[m[2].lower()] - reference.weekday()) % 7
+        if m[1].lower() == "last":
+            found.append(reference - timedelta(days=(7 - ahead) or 7))
+        elif m[1].lower() == "next":
+            found.append(reference + timedelta(days=ahead or 7))
+        elif m[1].lower() != "on":
+            found.append(reference + timedelta(days=ahead))
+        # A bare "on Saturday" could be either side of the reference; only the tense can tell
+    for _ in FUTURE_PERIOD.finditer(text):
+        found.append(reference + timedelta(days=7))
+    for _ in PAST_PERIOD.finditer(text):
+        found.append(reference - timedelta(days=7))
+
+    return [d for d in found if d is not None]
+
+
+def _line_signals(line: str, today: date, reference: date) -> tuple[int, int, bool]:
+    """(future date mentions, past date mentions, has forward-looking wording) for one line."""
+    dates = find_dates(line, reference)
+    future = sum(d >= today for d in dates)
+    return future, len(dates) - future, bool(FUTURE_CUES.search(line))
+
+
+def prefilter_page(page: PageSegment, now: datetime, stats: PrefilterStats | None = None) -> PageSegment | None:
+    """
+    Drop or trim a page by how likely it is to hold upcoming events.
+
+    A page with a date on or after today is kept; when long, it is trimmed to its
+    first line plus the lines with future dates or forward-looking wording and their
+    neighbours. A page with no future date is dropped if it is stale (published more
+    than STALE_DAYS ago) or only mentions past dates without forward-looking wording.
+    Pages with no temporal evidence at all are kept as they are.
+    """
+    if stats is not None:
+        stats.pages += 1
+        stats.chars_in += len(page)
+
+    today = now.date()
+    reference = page.published.date() if page.published else today
+    lines = page.text.split('\n')
+    signals = [_line_signals(line, today, reference) for line in lines]
+    future = sum(s[0] for s in signals)
+    past = sum(s[1] for s in signals)
+    cues = sum(s[2] for s in signals)
+
+    stale = page.published is not None and now - page.published > timedelta(days=STALE_DAYS)
+    if not future and (stale or (past and not cues)):
+        logger.info(f"Prefilter dropped {page.url} (no upcoming dates, {past} past, published {page.published or 'unknown'})")
+        if stats is not None:
+            stats.dropped += 1
+            stats.chars_avoided += len(page)
+        return None
+
+    if not future or len(page.text) <= TRIM_MIN_CHARS:
+        return page
+
+    keep = {0}
+    for i, (line_future, _, cue) in enumerate(signals):
+        if line_future or cue:
+            keep.update((i - 1, i, i + 1))
+    kept = [line for i, line in enumerate(lines) if i in keep]
+    if len(kept) == len(lines):
+        return page
+
+    trimmed = PageSegment(url=page.url, text='\n'.join(kept), published=page.published)
+    if stats is not None:
+        stats.trimmed += 1
+        stats.chars_avoided += len(page) - len(trimmed)
+    return trimmed
+
+
+def prefilter_pages(pages: list[PageSegment], now: datetime, stats: PrefilterStats | None = None) -> list[PageSegment]:
+    if not PREFILTER_ENABLED:
+        return pages
+    kept = [p for p in (prefilter_page(page, now, stats) for page in pages) if p is not None]
+    if len(kept) < len(pages):
+        logger.info(f"Prefilter kept {len(kept)} of {len(pages)} pages")
+    return kept
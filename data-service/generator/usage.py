@@ -0,0 +1,56 @@
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UsageStats:
+    """Cumulative token usage, including prompt tokens served from the provider cache."""
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+_stats: dict[str, UsageStats] = {}
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def record_usage(stage: str, usage: Any) -> int:
+    """Record a response's usage block for a pipeline stage. Returns cached prompt tokens."""
+    if usage is None:
+        return 0
+
+    prompt_tokens = _field(usage, "prompt_tokens") or 0
+    completion_tokens = _field(usage, "completion_tokens") or 0
+    cached_tokens = _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+
+    stats = _stats.setdefault(stage, UsageStats())
+    stats.requests += 1
+    stats.prompt_tokens += prompt_tokens
+    stats.completion_tokens += completion_tokens
+    stats.cached_tokens += cached_tokens
+
+    logger.info(f"[{stage}] tokens: prompt={prompt_tokens} (cached={cached_tokens}), completion={completion_tokens}")
+    return cached_tokens
+
+
+def usage_snapshot() -> dict[str, dict]:
+    """Per-stage usage totals for reporting."""
+    return {
+        stage: {**asdict(stats), "cache_hit_ratio": round(stats.cache_hit_ratio, 3)}
+        for stage, stats in _stats.items()
+    }
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Every replica that should coordinate must point at the same store
+LEASE_DB = os.getenv("LEASE_DB", "data/leases.sqlite3")
+LEASE_TTL_SECONDS = float(os.getenv("LEASE_TTL_SECONDS", "120"))
+REPLICA_ID = os.getenv("REPLICA_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseUnavailable(Exception):
+    """Another replica holds the lease."""
+
+    def __init__(self, name: str, holder: str | None) -> None:
+        super().__init__(f"{name} is leased by replica {holder or 'unknown'}")
+        self.holder = holder
+
+
+class LeaseLost(Exception):
+    """The lease expired or was taken over while the work was running."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"Lost lease on {name}")
+
+
+class LeaseBackend(ABC):
+    """
+    Store for named leases shared by all replicas.
+
+    Implementations must make acquire and renew atomic: acquire succeeds only if
+    the lease is free, expired or already held by owner. A networked store (e.g.
+    Redis SET NX PX plus a compare-and-renew script, or a SQL row lock) can stand
+    in for the SQLite backend by implementing these methods.
+    """
+
+    @abstractmethod
+    def acquire(self, name: str, owner: str, ttl_seconds: float) -> bool: ...
+
+    @abstractmethod
+    def renew(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Extend a lease still held by owner; False if it was lost."""
+
+    @abstractmethod
+    def release(self, name: str, owner: str) -> None: ...
+
+    @abstractmethod
+    def holder(self, name: str) -> str | None:
+        """Current owner of a live lease, or None."""
+
+    @abstractmethod
+    def leases(self) -> dict[str, dict]:
+        """Live leases by name, with owner and seconds until expiry."""
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """Leases in a shared SQLite file; enough for replicas on one host (or a shared volume)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Autocommit, so BEGIN IMMEDIATE below controls the write lock
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires_at REAL, acquired_at REAL)"
+            )
+        return self._conn
+
+    def _write(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                changed = conn.execute(sql, params).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return changed
+
+    def acquire(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        changed = self._write(
+            """
+            INSERT INTO leases VALUES (?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at,
+                acquired_at = excluded.acquired_at
+            WHERE leases.expires_at < ? OR leases.owner = excluded.owner
+            """,
+            (name, owner, now + ttl_seconds, now, now)
+        )
+        return changed > 0
+
+    def renew(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        # An expired lease nobody took over is still ours to renew
+        changed = self._write(
+            "UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ?",
+            (time.time() + ttl_seconds, name, owner)
+        )
+        return changed > 0
+
+    def release(self, name: str, owner: str) -> None:
+        self._write("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def holder(self, name: str) -> str | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT owner FROM leases WHERE name = ? AND expires_at >= ?", (name, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def leases(self) -> dict[str, dict]:
+        now = time.time()
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT name, owner, expires_at FROM leases WHERE expires_at >= ?", (now,)
+            ).fetchall()
+        return {name: {"owner": owner, "expires_in": round(expires_at - now, 1)} for name, owner, expires_at in rows}
+
+
+class LeaseManager:
+    """
+    Runs work under a named lease, renewing it every ttl/3 while the work runs.
+
+    A replica that finds the lease held elsewhere gets LeaseUnavailable and can move
+    on to other work; a lease whose holder stopped heartbeating expires after its TTL
+    and is taken over by the next replica that asks. If renewal fails midway (the
+    lease expired and another replica took it), the work is cancelled and LeaseLost
+    is raised, so a source is never crawled by two replicas at once.
+
+    Each run leases under its own owner (replica id plus a per-run token), so two
+    jobs in one replica exclude each other too, and one finishing cannot release
+    the lease the other is still running under.
+    """
+
+    def __init__(self, backend: LeaseBackend, owner: str = REPLICA_ID, ttl_seconds: float = LEASE_TTL_SECONDS) -> None:
+        self.backend = backend
+        self.owner = owner
+        self.ttl_seconds = ttl_seconds
+
+    async def run(self, name: str, work: Awaitable[T]) -> T:
+        owner = f"{self.owner}/{uuid.uuid4().hex[:8]}"
+        if not await asyncio.to_thread(self.backend.acquire, name, owner, self.ttl_seconds):
+            if asyncio.iscoroutine(work):
+                work.close()
+            raise LeaseUnavailable(name, await asyncio.to_thread(self.backend.holder, name))
+        logger.debug(f"Leased {name} as {owner}")
+
+        task = asyncio.ensure_future(work)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.ttl_seconds / 3)
+                if done:
+                    return task.result()
+                if not await asyncio.to_thread(self.backend.renew, name, owner, self.ttl_seconds):
+                    logger.error(f"Lease on {name} lost, cancelling its work")
+                    task.cancel()
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        pass
+                    raise LeaseLost(name)
+        finally:
+            if not task.done():
+                task.cancel()
+            try:
+                await asyncio.to_thread(self.backend.release, name, owner)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to release lease on {name}: {e}")
+
+    def snapshot(self) -> dict:
+        return {"replica": self.owner, "leases": self.backend.leases()}
+
+
+# Process-wide source leases; LEASE_DB=":memory:" keeps them within this process
+source_leases = LeaseManager(SQLiteLeaseBackend(LEASE_DB))
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import logging
 import os
 import time
@@ -6,18 +7,52 @@ import uuid
 from contextlib import asynccontextmanager
 from dataclasses import asdict
 from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Awaitable, Literal
+
+_import_started = time.perf_counter()  # Startup profile: third-party and service imports below
 
 import httpx
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from openai import AsyncOpenAI
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
-from crawler import guided_crawl, CrawlConfig
+from admission import QueueFull, SlotUnavailable, job_queue
+from crawler import guided_crawl, iter_guided_crawl, seed_links, CrawlConfig, CrawlResult, LinkInfo, PageSegment
+from crawler.archive import crawl_archive, start_archive
 from crawler.browser_engine import BrowserEngine
-from generator import generate_markets
-from sources import SOURCES, DataSource
+from crawler.extraction import extraction_profile, published_at
+from crawler.fetcher import extract_article_content
+from crawler.health import host_health
+from crawler.http import close_http_client, prime_connections
+from generator import (
+    add_generation_requests,
+    BatchFailed,
+    DeferredBatch,
+    generate_markets,
+    generate_markets_packed,
+    generate_markets_streaming,
+    dedupe_proposals,
+    DedupeStats,
+    markets_from_batch,
+    PackedSource,
+    PrefilterStats,
+    recent_markets,
+    model_router,
+    start_job_budget,
+    usage_snapshot,
+)
+from generator.batch import batch_client
+from generator.link_selector import link_selection_request, parse_link_selection
+from leases import LeaseUnavailable, source_leases
+from profiling import job_profiler, loop_monitor
+from schedules import SCHEDULES, Schedule, Scheduler, SourceTarget, initial_phase
+from shared_cache import SharedDict, shared_cache
+from sources import SOURCES, DataSource, packed_prompt
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 load_dotenv()
 
@@ -28,24 +63,76 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Global OpenAI client
-openai_client: AsyncOpenAI | None = None
+openai_client: "AsyncOpenAI | None" = None
+
+# Job state, written through to the shared cache so any worker can report any job
+JOB_STATE_TTL_SECONDS = 7 * 24 * 3600
+jobs = SharedDict(shared_cache, "jobs", JOB_STATE_TTL_SECONDS)
+
+# Collapsed-stack profiles of profiled jobs, served at /jobs/{id}/profile
+profiles = SharedDict(shared_cache, "profiles", JOB_STATE_TTL_SECONDS)
 
-# In-memory job storage
-jobs: dict[str, dict] = {}
+# Runs SCHEDULES when SCHEDULER_ENABLED is set
+scheduler: Scheduler | None = None
+
+# Startup phase durations in seconds, reported on /health
+startup_timings: dict[str, float] = {"imports": round(time.perf_counter() - _import_started, 3)}
+
+
+async def warm_up() -> None:
+    """Pre-launch browsers, pre-stealth a page and open pooled connections to every source."""
+    started = time.perf_counter()
+    if any(s.use_javascript for s in SOURCES.values()):
+        try:
+            await BrowserEngine.warm_up()
+        except Exception as e:
+            logger.warning(f"Browser warm-up failed: {type(e).__name__}: {e}")
+    startup_timings["warmup_browsers"] = round(time.perf_counter() - started, 3)
+    
+    started = time.perf_counter()
+    origins = {s.seed_url for s in SOURCES.values()}
+    if openai_client:
+        origins.add(str(openai_client.base_url))
+    primed = await prime_connections(sorted(origins))
+    startup_timings["warmup_connections"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Warm-up done: {primed}/{len(origins)} origins primed, timings {startup_timings}")
+
+
+def create_openai_client(api_key: str) -> "AsyncOpenAI":
+    """Build the OpenAI client; the SDK is imported here so importing the service doesn't load it."""
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global openai_client
+    global openai_client, scheduler
     api_key = os.getenv("OPENAI_API_KEY")
     if api_key:
-        openai_client = AsyncOpenAI(api_key=api_key)
+        openai_client = create_openai_client(api_key)
         logger.info("OpenAI client initialized")
     else:
         logger.warning("OPENAI_API_KEY not set")
+    for source in SOURCES.values():
+        model_router.set_source_models(source.id, source.models)
+    job_profiler.install(asyncio.get_running_loop())
+    loop_monitor.start()
+    if os.getenv("WARMUP_ON_STARTUP", "").lower() in ("1", "true", "yes"):
+        await warm_up()
+    startup_timings["ready"] = round(time.perf_counter() - _import_started, 3)
+    if openai_client and os.getenv("SCHEDULER_ENABLED", "").lower() in ("1", "true", "yes"):
+        scheduler = Scheduler(SCHEDULES, launch=launch_scheduled)
+        scheduler.start()
     yield
-    # Shutdown browser if it was used
+    if scheduler:
+        await scheduler.stop()
+    await loop_monitor.stop()
+    # Drain and shut down the browser farm if it was used
     await BrowserEngine.shutdown()
+    await close_http_client()
+    await batch_client.close()
+    await jobs.flush()
+    await profiles.flush()
     logger.info("Shutting down")
 
 
@@ -58,7 +145,7 @@ app = FastAPI(
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3001"],
-    allow_methods=["GET", "POST"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
 
@@ -68,6 +155,47 @@ app.add_middleware(
 class GenerateMarketsRequest(BaseModel):
     source_ids: list[str]
     target_count: int = 5
+    pack: bool = False  # Share LLM requests between small sources of the same prompt family
+    latency_budget_seconds: float | None = None  # Defaults to JOB_LATENCY_BUDGET_SECONDS
+    lane: Literal["high", "normal", "low"] = "normal"  # Queue priority when jobs are waiting
+    profile: bool = False  # Sample where the job spends its time; served at /jobs/{id}/profile
+    # "deferred": crawl now, send every LLM request through the Batch API (hours, at lower cost)
+    mode: Literal["realtime", "deferred"] = "realtime"
+
+
+class SourceTargetRequest(BaseModel):
+    source_id: str
+    target_count: int = 5
+    priority: int = 0  # Higher runs first
+    deadline: float | None = None  # Unix time; the source is abandoned if not finished by then
+
+
+class BulkGenerateRequest(BaseModel):
+    targets: list[SourceTargetRequest]
+    pack: bool = False
+    latency_budget_seconds: float | None = None  # Defaults to the latest deadline, else JOB_LATENCY_BUDGET_SECONDS
+    lane: Literal["high", "normal", "low"] = "normal"
+    profile: bool = False
+
+
+class RegenerateRequest(BaseModel):
+    source_ids: list[str] | None = None  # Defaults to every source archived for the job
+    target_count: int = 5
+    lane: Literal["high", "normal", "low"] = "normal"
+
+
+class ScheduleRequest(BaseModel):
+    targets: list[SourceTargetRequest]
+    interval_seconds: float
+    pack: bool = False
+    enabled: bool = True
+    mode: Literal["realtime", "deferred"] = "realtime"
+
+
+class ScheduleInfo(ScheduleRequest):
+    id: str
+    next_run_at: float
+    last_job_id: str | None = None
 
 
 class MarketResponse(BaseModel):
@@ -97,6 +225,18 @@ class JobStatusResponse(BaseModel):
     completed_at: float | None = None
     markets_generated: int | None = None
     errors: list[SourceError] | None = None
+    dedupe: dict | None = None
+    prefilter: dict | None = None  # Pages dropped/trimmed before generation and tokens avoided
+    queue_position: int | None = None  # Set while the job waits for a slot
+    queue_wait_seconds: float | None = None
+    profile: dict | None = None  # Sample counts and hottest frames; full stacks at /jobs/{id}/profile
+    mode: str = "realtime"
+    batch: dict | None = None  # Deferred jobs: the batch last submitted, with request counts
+
+
+class JobsResponse(BaseModel):
+    queue: dict
+    jobs: list[JobStatusResponse]
 
 
 class SourceInfo(BaseModel):
@@ -112,41 +252,304 @@ class SourcesResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     openai_configured: bool
+    llm_usage: dict[str, dict] = {}  # Per-stage token totals, incl. provider-cached prompt tokens
+    hosts: dict[str, dict] = {}  # Per-host circuit state and p95 fetch latency
+    browsers: list[dict] = []  # Per-browser load, renders and restarts
+    startup: dict[str, float] = {}  # Seconds spent in imports, warm-up, and until ready
+    queue: dict = {}  # Running/pending jobs and queue wait times
+    shared_cache: dict = {}  # Cross-worker cache hits, misses and evictions (this worker's view)
+    leases: dict = {}  # This replica's id and the source leases currently held by any replica
+    event_loop: dict = {}  # Loop lag percentiles and the number of stalls logged with their stacks
 
 
 # --- Helper Functions ---
 
-async def process_source(source: DataSource, target_count: int) -> list[MarketResponse]:
-    """AI-guided crawl and market generation. Raises on failure."""
-    model = os.getenv("AI_MODEL", "gpt-4o-mini")
-    
-    crawl_config = CrawlConfig(
+def crawl_config_for(source: DataSource) -> CrawlConfig:
+    return CrawlConfig(
         seed_url=source.seed_url,
         max_links_to_scrape=source.max_links_to_scrape,
         use_javascript=source.use_javascript,
         wait_selector=source.wait_selector,
-        wait_timeout_ms=source.wait_timeout_ms
+        wait_timeout_ms=source.wait_timeout_ms,
+        max_depth=source.max_depth,
+        max_pages=source.max_pages,
+        max_bytes=source.max_bytes,
+        max_page_bytes=source.max_page_bytes,
+        max_seconds=source.max_crawl_seconds,
+        discovery=source.discovery,
+        feed_urls=source.feed_urls,
+        content_selector=source.content_selector,
+        noise_selectors=source.noise_selectors,
+        prefetch_links=source.prefetch_links,
+        extract_in_page=source.extract_in_page
     )
-    
+
+
+async def crawl_source(source: DataSource) -> CrawlResult:
+    """AI-guided crawl of a source. Raises on empty corpus."""
     # AI-guided crawl: fetch homepage -> AI selects links -> scrape articles
-    crawl_result = await guided_crawl(crawl_config, openai_client, model=model)
+    crawl_result = await guided_crawl(crawl_config_for(source), openai_client, source_id=source.id)
     
-    if not crawl_result.text_corpus.strip():
+    if not crawl_result.pages:
         raise Exception(f"Empty corpus from {source.seed_url}")
     
-    logger.info(f"Crawled {len(crawl_result.pages_visited)} pages, corpus: {len(crawl_result.text_corpus)} chars")
+    logger.info(f"Crawled {len(crawl_result.pages)} pages, corpus: {crawl_result.corpus_chars} chars")
+    return crawl_result
+
+
+async def process_source(
+    source: DataSource,
+    target_count: int,
+    dedupe_stats: DedupeStats | None = None,
+    prefilter_stats: PrefilterStats | None = None
+) -> list[MarketResponse]:
+    """
+    AI-guided crawl streamed into market generation. Raises on failure.
+    Generation starts on the first full chunk instead of waiting for the last page.
+    """
+    pages_seen = 0
+    corpus_chars = 0
     
-    # Generate markets from the focused corpus
-    proposals = await generate_markets(
+    async def pages():
+        nonlocal pages_seen, corpus_chars
+        async for page in iter_guided_crawl(crawl_config_for(source), openai_client, source_id=source.id):
+            pages_seen += 1
+            corpus_chars += len(page)
+            yield page
+    
+    proposals = await generate_markets_streaming(
         client=openai_client,
-        corpus=crawl_result.text_corpus,
+        pages=pages(),
         prompt_template=source.prompt,
-        target_count=target_count
+        target_count=target_count,
+        dedupe_stats=dedupe_stats,
+        source_id=source.id,
+        prefilter_stats=prefilter_stats
     )
     
+    if not pages_seen:
+        raise Exception(f"Empty corpus from {source.seed_url}")
+    
+    logger.info(f"Crawled {pages_seen} pages, corpus: {corpus_chars} chars")
+    return [MarketResponse(**asdict(p)) for p in proposals]
+
+
+async def regenerate_source(
+    source: DataSource,
+    target_count: int,
+    archive_job_id: str,
+    dedupe_stats: DedupeStats | None = None,
+    prefilter_stats: PrefilterStats | None = None
+) -> list[MarketResponse]:
+    """Re-extract and regenerate from a job's archived pages, with no network fetches. Raises on failure."""
+    archived = [
+        page for page in await asyncio.to_thread(crawl_archive.pages, archive_job_id)
+        if page.source_id == source.id and page.url != source.seed_url
+    ]
+    pages: list[PageSegment] = []
+    for page in archived:
+        html = await asyncio.to_thread(crawl_archive.read_html, page)
+        content = await asyncio.to_thread(
+            extract_article_content,
+            html,
+            page.final_url,
+            extraction_profile(source.content_selector, tuple(source.noise_selectors))
+        )
+        if content:
+            pages.append(PageSegment(url=page.final_url, text=content, published=published_at(html)))
+    
+    if not pages:
+        raise Exception(f"No archived pages for {source.id} in job {archive_job_id}")
+    
+    logger.info(f"Regenerating {source.id} from {len(pages)} archived pages of job {archive_job_id}")
+    proposals = await generate_markets(
+        client=openai_client,
+        corpus=pages,
+        prompt_template=source.prompt,
+        target_count=target_count,
+        dedupe_stats=dedupe_stats,
+        source_id=source.id,
+        prefilter_stats=prefilter_stats,
+        # Regenerating exists to get a new answer, not the one cached for the same pages
+        refresh=True
+    )
     return [MarketResponse(**asdict(p)) for p in proposals]
 
 
+async def process_sources_packed(
+    job_id: str,
+    sources: list[tuple[DataSource, SourceTarget]],
+    errors: list[SourceError],
+    dedupe_stats: DedupeStats | None = None,
+    prefilter_stats: PrefilterStats | None = None
+) -> list[MarketResponse]:
+    """
+    Crawl every source, then generate per prompt family with packed LLM requests.
+    A family shares its FAMILY_PROMPTS entry; members of a family without one are packed
+    only with sources that have the same prompt.
+    """
+    families: dict[tuple[str, str], list[tuple[DataSource, CrawlResult]]] = {}
+    target_counts = {source.id: target.target_count for source, target in sources}
+    
+    for source, _ in sources:
+        try:
+            logger.info(f"[Job {job_id}] Crawling source: {source.id}")
+            crawl_result = await source_leases.run(f"source:{source.id}", crawl_source(source))
+            families.setdefault((source.prompt_family or source.id, packed_prompt(source)), []).append((source, crawl_result))
+        except LeaseUnavailable as e:
+            logger.info(f"[Job {job_id}] Skipping source {source.id}: {e}")
+            errors.append(SourceError(source_id=source.id, error=f"Skipped: {e}"))
+        except Exception as e:
+            logger.warning(f"[Job {job_id}] Source {source.id} failed: {e}")
+            errors.append(SourceError(source_id=source.id, error=str(e)))
+    
+    all_markets: list[MarketResponse] = []
+    for (family, prompt), members in families.items():
+        packed = [
+            PackedSource(
+                source_id=source.id,
+                pages=result.pages,
+                seed_url=source.seed_url
+            )
+            for source, result in members
+        ]
+        try:
+            results = await generate_markets_packed(
+                client=openai_client,
+                sources=packed,
+                prompt_template=prompt,
+                target_counts={source.id: target_counts[source.id] for source, _ in members},
+                dedupe_stats=dedupe_stats,
+                prefilter_stats=prefilter_stats
+            )
+        except Exception as e:
+            logger.warning(f"[Job {job_id}] Prompt family {family} failed: {e}")
+            errors.extend(SourceError(source_id=source.id, error=str(e)) for source, _ in members)
+            continue
+        
+        for source_id, proposals in results.items():
+            all_markets.extend(MarketResponse(**asdict(p)) for p in proposals)
+            logger.info(f"[Job {job_id}] Source {source_id}: generated {len(proposals)} markets (packed)")
+    
+    return all_markets
+
+
+async def await_batch(job_id: str, batch: DeferredBatch) -> dict[str, str | None]:
+    """Run a deferred job's batch, reporting its progress on the job while it is pending."""
+    def on_update(status: dict) -> None:
+        jobs[job_id] = {**jobs[job_id], "status": "awaiting_batch", "batch": status}
+    
+    try:
+        return await batch.run(on_update)
+    finally:
+        jobs[job_id] = {**jobs[job_id], "status": "processing"}
+
+
+async def process_sources_deferred(
+    job_id: str,
+    sources: list[tuple[DataSource, SourceTarget]],
+    errors: list[SourceError],
+    lane: str = "normal",
+    dedupe_stats: DedupeStats | None = None,
+    prefilter_stats: PrefilterStats | None = None
+) -> list[MarketResponse]:
+    """
+    Deferred mode: crawl right away, but send every LLM request through the Batch API.
+    
+    Seed pages are fetched first and every source's link selection goes into one batch;
+    once it completes, the selected articles are crawled and every chunk of every source
+    goes into a second batch. The job holds a queue slot only while it crawls, never
+    while a batch is pending, so real-time jobs are not held up. Feed sources need no
+    selection; if their feeds are empty they only crawl URLs left from earlier jobs.
+    """
+    failed: set[str] = set()
+    
+    def fail(source: DataSource, e: Exception) -> None:
+        failed.add(source.id)
+        if isinstance(e, LeaseUnavailable):
+            logger.info(f"[Job {job_id}] Skipping source {source.id}: {e}")
+            errors.append(SourceError(source_id=source.id, error=f"Skipped: {e}"))
+        else:
+            logger.warning(f"[Job {job_id}] Source {source.id} failed: {e}")
+            errors.append(SourceError(source_id=source.id, error=str(e)))
+    
+    # 1. Seed pages, with one link selection request per source
+    selection = DeferredBatch(metadata={"job_id": job_id, "stage": "link_selection"})
+    offered: dict[str, tuple[str, list[LinkInfo], str]] = {}  # source -> (seed URL, links, request id)
+    
+    async def fetch_seeds() -> None:
+        for source, _ in sources:
+            if source.discovery == "feed":
+                continue
+            try:
+                found = await source_leases.run(f"source:{source.id}", seed_links(crawl_config_for(source), source.id))
+                if found is None:
+                    raise Exception(f"Failed to fetch seed URL: {source.seed_url}")
+            except Exception as e:
+                fail(source, e)
+                continue
+            seed_url, links = found
+            if links:
+                model = model_router.primary("link_selection", source.id)
+                request = link_selection_request(links, seed_url, model, source.max_links_to_scrape)
+                offered[source.id] = (seed_url, links, selection.add("link_selection", request))
+            else:
+                offered[source.id] = (seed_url, [], "")
+    
+    await job_queue.run_in_slot(job_id, fetch_seeds, lane)
+    contents = await await_batch(job_id, selection)
+    
+    preselected: dict[str, tuple[str, list[str]]] = {}
+    for source, _ in sources:
+        if source.id not in offered:
+            continue
+        seed_url, links, request_id = offered[source.id]
+        selected: list[str] = []
+        try:
+            if request_id:
+                selected = parse_link_selection(contents.get(request_id), links, source.max_links_to_scrape)
+        except json.JSONDecodeError as e:
+            logger.error(f"[Job {job_id}] Failed to parse link selection for {source.id}: {e}")
+        preselected[source.id] = (seed_url, selected)
+    
+    # 2. Selected articles, with one generation request per chunk
+    generation = DeferredBatch(metadata={"job_id": job_id, "stage": "generation"})
+    request_ids: dict[str, list[str]] = {}
+    
+    async def crawl() -> None:
+        for source, _ in sources:
+            if source.id in failed:
+                continue
+            try:
+                config = crawl_config_for(source)
+                crawl_result = await source_leases.run(
+                    f"source:{source.id}",
+                    guided_crawl(config, openai_client, source.id, preselected.get(source.id, (source.seed_url, [])))
+                )
+                if not crawl_result.pages:
+                    raise Exception(f"Empty corpus from {source.seed_url}")
+            except Exception as e:
+                fail(source, e)
+                continue
+            logger.info(f"[Job {job_id}] Crawled {len(crawl_result.pages)} pages from {source.id}")
+            request_ids[source.id] = add_generation_requests(
+                generation, crawl_result.pages, source.prompt, source.id, prefilter_stats
+            )
+    
+    await job_queue.run_in_slot(job_id, crawl, lane)
+    contents = await await_batch(job_id, generation)
+    
+    # 3. Validate per source; the caller dedupes across sources and delivers
+    all_markets: list[MarketResponse] = []
+    for source, target in sources:
+        if source.id not in request_ids:
+            continue
+        proposals = markets_from_batch(contents, request_ids[source.id], target.target_count, dedupe_stats)
+        all_markets.extend(MarketResponse(**asdict(p)) for p in proposals)
+        logger.info(f"[Job {job_id}] Source {source.id}: generated {len(proposals)} markets (deferred)")
+    return all_markets
+
+
 async def post_to_oracle(markets: list[MarketResponse], errors: list[SourceError]) -> None:
     """POST generated markets to Oracle's ingest endpoint."""
     callback_url = os.getenv("ORACLE_CALLBACK_URL", "http://localhost:3001/api/markets/ingest")
@@ -163,31 +566,99 @@ async def post_to_oracle(markets: list[MarketResponse], errors: list[SourceError
             if response.status_code == 200:
                 result = response.json()
                 logger.info(f"Oracle ingested {result.get('created', 0)} markets")
+                await asyncio.to_thread(recent_markets.add, [m.question for m in markets])
             else:
                 logger.error(f"Oracle callback failed: {response.status_code} {response.text}")
     except Exception as e:
         logger.error(f"Failed to POST to Oracle: {type(e).__name__}: {e}")
 
 
-async def process_sources_background(job_id: str, source_ids: list[str], target_count: int) -> None:
-    """Background task: process sources and POST results to Oracle."""
+async def process_sources_background(
+    job_id: str,
+    targets: list[SourceTarget],
+    pack: bool = False,
+    latency_budget_seconds: float | None = None,
+    archive_job_id: str | None = None,
+    mode: str = "realtime",
+    lane: str = "normal"
+) -> None:
+    """
+    Background task: process sources by deadline then priority, and POST results to Oracle.
+    With archive_job_id, generate from that job's archived pages instead of crawling.
+    Sources leased by another replica are skipped; that replica is already crawling them.
+    Deferred jobs go through process_sources_deferred.
+    """
+    jobs[job_id] = {
+        **jobs[job_id],
+        "status": "processing",
+        "queue_wait_seconds": round(time.time() - jobs[job_id]["started_at"], 1)
+    }
+    targets = sorted(targets, key=lambda t: (t.deadline or float("inf"), -t.priority))
+    if latency_budget_seconds is None and targets and all(t.deadline for t in targets):
+        latency_budget_seconds = max(max(t.deadline for t in targets) - time.time(), 1.0)
+    start_job_budget(latency_budget_seconds)
+    if not archive_job_id:
+        start_archive(job_id)
     all_markets: list[MarketResponse] = []
     errors: list[SourceError] = []
+    sources: list[tuple[DataSource, SourceTarget]] = []
+    dedupe_stats = DedupeStats()
+    prefilter_stats = PrefilterStats()
     
-    for source_id in source_ids:
-        source = SOURCES.get(source_id)
+    for target in targets:
+        source = SOURCES.get(target.source_id)
         if not source:
-            errors.append(SourceError(source_id=source_id, error="Unknown source"))
+            errors.append(SourceError(source_id=target.source_id, error="Unknown source"))
             continue
-        
+        if target.deadline is not None and target.deadline <= time.time():
+            errors.append(SourceError(source_id=source.id, error="Deadline passed before start"))
+            continue
+        sources.append((source, target))
+    
+    if mode == "deferred" and not archive_job_id:
         try:
-            logger.info(f"[Job {job_id}] Processing source: {source_id}")
-            markets = await process_source(source, target_count)
-            all_markets.extend(markets)
-            logger.info(f"[Job {job_id}] Source {source_id}: generated {len(markets)} markets")
-        except Exception as e:
-            logger.warning(f"[Job {job_id}] Source {source_id} failed: {e}")
-            errors.append(SourceError(source_id=source_id, error=str(e)))
+            all_markets = await process_sources_deferred(job_id, sources, errors, lane, dedupe_stats, prefilter_stats)
+        except (BatchFailed, httpx.HTTPError) as e:
+            logger.error(f"[Job {job_id}] Batch failed: {type(e).__name__}: {e}")
+            errors.extend(SourceError(source_id=source.id, error=f"Batch failed: {e}") for source, _ in sources)
+        except SlotUnavailable as e:
+            logger.error(f"[Job {job_id}] {e}")
+            errors.extend(SourceError(source_id=source.id, error=str(e)) for source, _ in sources)
+    elif pack and not archive_job_id:
+        all_markets = await process_sources_packed(job_id, sources, errors, dedupe_stats, prefilter_stats)
+    else:
+        for source, target in sources:
+            timeout = target.deadline - time.time() if target.deadline is not None else None
+            try:
+                logger.info(f"[Job {job_id}] Processing source: {source.id}")
+                if archive_job_id:
+                    run = regenerate_source(source, target.target_count, archive_job_id, dedupe_stats, prefilter_stats)
+                else:
+                    # The lease keeps other replicas off this source while it is crawled
+                    run = source_leases.run(
+                        f"source:{source.id}",
+                        process_source(source, target.target_count, dedupe_stats, prefilter_stats)
+                    )
+                markets = await asyncio.wait_for(
+                    run,
+                    max(timeout, 0) if timeout is not None else None
+                )
+                all_markets.extend(markets)
+                logger.info(f"[Job {job_id}] Source {source.id}: generated {len(markets)} markets")
+            except LeaseUnavailable as e:
+                logger.info(f"[Job {job_id}] Skipping source {source.id}: {e}")
+                errors.append(SourceError(source_id=source.id, error=f"Skipped: {e}"))
+            except asyncio.TimeoutError:
+                logger.warning(f"[Job {job_id}] Source {source.id} missed its deadline")
+                errors.append(SourceError(source_id=source.id, error="Deadline exceeded"))
+            except Exception as e:
+                logger.warning(f"[Job {job_id}] Source {source.id} failed: {e}")
+                errors.append(SourceError(source_id=source.id, error=str(e)))
+    
+    # Merge near-duplicates across sources and against markets recently delivered by any worker
+    await asyncio.to_thread(recent_markets.sync)
+    all_markets = dedupe_proposals(all_markets, stats=dedupe_stats, check_recent=True)
+    dedupe_stats.kept = len(all_markets)
     
     # POST results to Oracle
     if all_markets:
@@ -199,10 +670,131 @@ async def process_sources_background(job_id: str, source_ids: list[str], target_
         "status": "completed",
         "completed_at": time.time(),
         "markets_generated": len(all_markets),
-        "errors": [e.model_dump() for e in errors]
+        "errors": [e.model_dump() for e in errors],
+        "dedupe": asdict(dedupe_stats),
+        "prefilter": prefilter_stats.as_dict()
+    }
+    
+    logger.info(
+        f"[Job {job_id}] Completed: {len(all_markets)} markets, {len(errors)} errors, "
+        f"~{prefilter_stats.tokens_avoided} tokens avoided by the prefilter"
+    )
+
+
+async def run_job(job_id: str, work: Awaitable[None], profile: bool) -> None:
+    """Run a job's work attributed to job_id, sampling a profile of it when asked."""
+    with job_profiler.job(job_id, profile) as job_profile:
+        try:
+            await work
+        finally:
+            if job_profile:
+                profiles[job_id] = {"collapsed": job_profile.collapsed(), **job_profile.summary()}
+    if job_profile:
+        jobs[job_id] = {**jobs[job_id], "profile": job_profile.summary()}
+
+
+def start_job(
+    targets: list[SourceTarget],
+    pack: bool = False,
+    latency_budget_seconds: float | None = None,
+    schedule_id: str | None = None,
+    lane: str = "normal",
+    archive_job_id: str | None = None,
+    profile: bool = False,
+    mode: str = "realtime"
+) -> tuple[str, asyncio.Future]:
+    """
+    Register a job and queue it. Raises QueueFull when the queue is saturated.
+    Deferred jobs start at once (up to MAX_DEFERRED_JOBS) and queue for a slot only while they crawl.
+    """
+    job_id = str(uuid.uuid4())
+    profile = job_profiler.should_profile(profile)
+    jobs[job_id] = {
+        "status": "queued",
+        "started_at": time.time(),
+        "source_ids": [t.source_id for t in targets],
+        "schedule_id": schedule_id,
+        "regenerated_from": archive_job_id,
+        "profiled": profile,
+        "mode": mode
     }
+    run = lambda: run_job(
+        job_id,
+        process_sources_background(job_id, targets, pack, latency_budget_seconds, archive_job_id, mode, lane),
+        profile
+    )
+    
+    if mode == "deferred" and not archive_job_id:
+        try:
+            done = job_queue.start_deferred(job_id, run)
+        except QueueFull:
+            del jobs[job_id]
+            raise
+        logger.info(f"[Job {job_id}] Started deferred job for sources: {[t.source_id for t in targets]}")
+        return job_id, done
+    
+    try:
+        done = job_queue.submit(job_id, run, lane=lane)
+    except QueueFull:
+        del jobs[job_id]
+        raise
     
-    logger.info(f"[Job {job_id}] Completed: {len(all_markets)} markets, {len(errors)} errors")
+    logger.info(f"[Job {job_id}] Queued in {lane} lane for sources: {[t.source_id for t in targets]}")
+    return job_id, done
+
+
+def admit(
+    targets: list[SourceTarget],
+    pack: bool,
+    latency_budget_seconds: float | None,
+    lane: str,
+    archive_job_id: str | None = None,
+    profile: bool = False,
+    mode: str = "realtime"
+) -> str:
+    """start_job for API requests: a saturated queue becomes 429 with Retry-After."""
+    try:
+        job_id, _ = start_job(
+            targets,
+            pack,
+            latency_budget_seconds,
+            lane=lane,
+            archive_job_id=archive_job_id,
+            profile=profile,
+            mode=mode
+        )
+    except QueueFull as e:
+        logger.warning(f"Rejected job for {[t.source_id for t in targets]}: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return job_id
+
+
+def launch_scheduled(schedule: Schedule) -> asyncio.Future:
+    job_id, done = start_job(schedule.targets, schedule.pack, schedule_id=schedule.id, lane="low", mode=schedule.mode)
+    schedule.last_job_id = job_id
+    return done
+
+
+def schedule_info(schedule: Schedule) -> ScheduleInfo:
+    return ScheduleInfo(
+        id=schedule.id,
+        targets=[SourceTargetRequest(**asdict(t)) for t in schedule.targets],
+        interval_seconds=schedule.interval_seconds,
+        pack=schedule.pack,
+        enabled=schedule.enabled,
+        mode=schedule.mode,
+        next_run_at=schedule.next_run_at,
+        last_job_id=schedule.last_job_id
+    )
+
+
+def validate_targets(targets: list[SourceTargetRequest]) -> list[SourceTarget]:
+    if not targets:
+        raise HTTPException(status_code=400, detail="targets cannot be empty")
+    unknown = [t.source_id for t in targets if t.source_id not in SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sources: {unknown}")
+    return [SourceTarget(**t.model_dump()) for t in targets]
 
 
 # --- Endpoints ---
@@ -211,7 +803,15 @@ async def process_sources_background(job_id: str, source_ids: list[str], target_
 async def health_check():
     return HealthResponse(
         status="healthy" if openai_client else "degraded",
-        openai_configured=openai_client is not None
+        openai_configured=openai_client is not None,
+        llm_usage=usage_snapshot(),
+        hosts=host_health.snapshot(),
+        browsers=BrowserEngine.metrics(),
+        startup=startup_timings,
+        queue=job_queue.stats(),
+        shared_cache=shared_cache.snapshot(),
+        leases=await asyncio.to_thread(source_leases.snapshot),
+        event_loop=loop_monitor.snapshot()
     )
 
 
@@ -235,41 +835,146 @@ async def generate_markets_endpoint(request: GenerateMarketsRequest):
     if not request.source_ids:
         raise HTTPException(status_code=400, detail="source_ids cannot be empty")
     
-    # Create job
-    job_id = str(uuid.uuid4())
-    jobs[job_id] = {
-        "status": "processing",
-        "started_at": time.time(),
-        "source_ids": request.source_ids
-    }
-    
-    # Fire background task - don't await
-    asyncio.create_task(
-        process_sources_background(job_id, request.source_ids, request.target_count)
+    targets = [SourceTarget(source_id, target_count=request.target_count) for source_id in request.source_ids]
+    job_id = admit(
+        targets,
+        request.pack,
+        request.latency_budget_seconds,
+        request.lane,
+        profile=request.profile,
+        mode=request.mode
     )
     
-    logger.info(f"[Job {job_id}] Started for sources: {request.source_ids}")
+    return TriggerResponse(job_id=job_id, status="accepted")
+
+
+@app.post("/generate-markets/bulk", response_model=TriggerResponse, status_code=202)
+async def generate_markets_bulk(request: BulkGenerateRequest):
+    """Trigger one job with per-source target counts, priorities and deadlines."""
+    if not openai_client:
+        raise HTTPException(status_code=503, detail="OpenAI not configured")
     
+    job_id = admit(
+        validate_targets(request.targets),
+        request.pack,
+        request.latency_budget_seconds,
+        request.lane,
+        profile=request.profile
+    )
     return TriggerResponse(job_id=job_id, status="accepted")
 
 
-@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
-async def get_job_status(job_id: str):
-    """Get status of a generation job."""
-    job = jobs.get(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+@app.get("/schedules", response_model=list[ScheduleInfo])
+async def list_schedules():
+    """Recurring jobs the service runs itself (when SCHEDULER_ENABLED is set)."""
+    return [schedule_info(s) for s in SCHEDULES.values()]
+
+
+@app.put("/schedules/{schedule_id}", response_model=ScheduleInfo)
+async def put_schedule(schedule_id: str, request: ScheduleRequest):
+    """Create or replace a recurring job."""
+    if request.interval_seconds < 60:
+        raise HTTPException(status_code=400, detail="interval_seconds must be at least 60")
     
+    schedule = Schedule(
+        id=schedule_id,
+        targets=validate_targets(request.targets),
+        interval_seconds=request.interval_seconds,
+        pack=request.pack,
+        enabled=request.enabled,
+        mode=request.mode
+    )
+    previous = SCHEDULES.get(schedule_id)
+    schedule.last_job_id = previous.last_job_id if previous else None
+    schedule.next_run_at = time.time() + initial_phase(schedule)
+    SCHEDULES[schedule_id] = schedule
+    return schedule_info(schedule)
+
+
+@app.delete("/schedules/{schedule_id}", status_code=204)
+async def delete_schedule(schedule_id: str):
+    if SCHEDULES.pop(schedule_id, None) is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+
+
+def job_status(job_id: str, job: dict) -> JobStatusResponse:
     return JobStatusResponse(
         job_id=job_id,
         status=job["status"],
         started_at=job["started_at"],
         completed_at=job.get("completed_at"),
         markets_generated=job.get("markets_generated"),
-        errors=[SourceError(**e) for e in job.get("errors", [])] if job.get("errors") else None
+        errors=[SourceError(**e) for e in job.get("errors", [])] if job.get("errors") else None,
+        dedupe=job.get("dedupe"),
+        prefilter=job.get("prefilter"),
+        queue_position=job_queue.position(job_id) if job["status"] == "queued" else None,
+        queue_wait_seconds=job.get("queue_wait_seconds"),
+        profile=job.get("profile"),
+        mode=job.get("mode", "realtime"),
+        batch=job.get("batch")
+    )
+
+
+@app.get("/jobs", response_model=JobsResponse)
+async def list_jobs():
+    """Queue depth and wait times, plus queued and running jobs."""
+    return JobsResponse(
+        queue=job_queue.stats(),
+        jobs=[
+            job_status(job_id, job) for job_id, job in await asyncio.to_thread(jobs.items)
+            if job["status"] != "completed"
+        ]
     )
 
 
+@app.post("/jobs/{job_id}/regenerate", response_model=TriggerResponse, status_code=202)
+async def regenerate_job(job_id: str, request: RegenerateRequest | None = None):
+    """Re-run generation on a job's archived crawl (no network fetches) as a new job."""
+    if not openai_client:
+        raise HTTPException(status_code=503, detail="OpenAI not configured")
+    
+    request = request or RegenerateRequest()
+    archived = await asyncio.to_thread(crawl_archive.pages, job_id)
+    if not archived:
+        raise HTTPException(status_code=404, detail="No archived pages for job")
+    
+    source_ids = request.source_ids or list(dict.fromkeys(p.source_id for p in archived))
+    targets = [SourceTarget(source_id, target_count=request.target_count) for source_id in source_ids]
+    new_job_id = admit(targets, False, None, request.lane, archive_job_id=job_id)
+    return TriggerResponse(job_id=new_job_id, status="accepted")
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """Get status of a generation job."""
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job_status(job_id, job)
+
+
+@app.get("/jobs/{job_id}/profile", response_class=PlainTextResponse)
+async def get_job_profile(job_id: str):
+    """
+    Sampled profile of a profiled job as collapsed stacks, for flamegraph.pl or speedscope.
+    Stacks start with "cpu" (running) or "wait" (suspended in an await).
+    """
+    profile = profiles.get(job_id)
+    if profile:
+        return PlainTextResponse(
+            profile["collapsed"],
+            headers={"Content-Disposition": f'attachment; filename="{job_id}.collapsed.txt"'}
+        )
+    
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.get("profiled"):
+        raise HTTPException(status_code=404, detail="Job was not profiled")
+    raise HTTPException(status_code=409, detail="Profile is available once the job finishes")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,346 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from types import FrameType
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Fraction of jobs profiled even when the request did not ask for it
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+# Distinct stacks kept per profile; further new stacks are only counted
+PROFILE_MAX_STACKS = 5000
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+# A callback holding the loop longer than this is logged with its stack
+LOOP_STALL_MS = float(os.getenv("LOOP_STALL_MS", "250"))
+
+# Job the current task (or the worker thread it handed work to) belongs to
+current_job: ContextVar[str | None] = ContextVar("current_job", default=None)
+
+_REPO_ROOT = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    if "site-packages" + os.sep in filename:
+        return filename.split("site-packages" + os.sep, 1)[1]
+    if filename.startswith(_REPO_ROOT):
+        return filename[len(_REPO_ROOT):]
+    return os.path.basename(filename)
+
+
+def _stack(frames: list[FrameType]) -> list[str]:
+    """Frame labels from outermost to innermost, without the loop/executor plumbing at the root."""
+    start = 0
+    for i, frame in enumerate(frames):
+        if frame.f_code in _ROOT_CODES:
+            start = i + 1
+    return [
+        f"{frame.f_code.co_name} ({_short_path(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})"
+        for frame in frames[start:]
+    ]
+
+
+def _thread_stack(frame: FrameType) -> list[str]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    return _stack(frames[::-1])
+
+
+def _await_stack(coro: Any) -> list[str]:
+    """The chain of coroutines a suspended task is waiting in, outermost first."""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return _stack(frames)
+
+
+class JobProfile:
+    """
+    Sampled stacks of one job, in collapsed-stack form ("frame;frame;frame count").
+
+    "cpu" stacks are where the job was running, on the event loop or in a worker
+    thread; "wait" stacks are where its suspended tasks were awaiting (fetches,
+    Playwright waits, LLM calls). Each sample counts once per task, so wait counts
+    add up across concurrent tasks.
+    """
+
+    def __init__(self, job_id: str, interval: float) -> None:
+        self.job_id = job_id
+        self.interval = interval
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.samples = 0
+        self.dropped = 0
+        self.stacks: Counter[str] = Counter()
+
+    def add(self, kind: str, stack: list[str]) -> None:
+        if not stack:
+            return
+        key = ";".join([kind, *stack])
+        if key in self.stacks or len(self.stacks) < PROFILE_MAX_STACKS:
+            self.stacks[key] += 1
+        else:
+            self.dropped += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def _top(self, kind: str, limit: int = 10) -> list[dict]:
+        innermost: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            if stack.startswith(kind + ";"):
+                innermost[stack.rsplit(";", 1)[1]] += count
+        total = sum(innermost.values()) or 1
+        return [{"frame": frame, "share": round(count / total, 3)} for frame, count in innermost.most_common(limit)]
+
+    def summary(self) -> dict:
+        return {
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 1),
+            "duration_seconds": round(self.duration, 1),
+            "cpu_samples": sum(c for s, c in self.stacks.items() if s.startswith("cpu;")),
+            "wait_samples": sum(c for s, c in self.stacks.items() if s.startswith("wait;")),
+            "dropped_samples": self.dropped,
+            "top_cpu": self._top("cpu"),
+            "top_wait": self._top("wait"),
+        }
+
+
+class _JobTaggingExecutor(ThreadPoolExecutor):
+    """Default executor that records which job each worker thread is running work for."""
+
+    def __init__(self, profiler: "JobProfiler") -> None:
+        super().__init__(thread_name_prefix="asyncio")
+        self._profiler = profiler
+
+    def submit(self, fn: Callable, /, *args, **kwargs):
+        job_id = current_job.get()
+        if job_id is None:
+            return super().submit(fn, *args, **kwargs)
+        return super().submit(self._profiler._run_for_job, job_id, fn, *args, **kwargs)
+
+
+class JobProfiler:
+    """
+    Low-overhead sampling profiler with per-job attribution.
+
+    Jobs run concurrently on one event loop, so samples are attributed through the
+    current_job context variable: a task factory tags every task a job creates, and
+    the default executor tags the worker threads running its asyncio.to_thread work.
+    A daemon thread samples the loop thread, tagged worker threads and the job's
+    suspended tasks every PROFILE_INTERVAL_MS, and only while a profiled job runs.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000, sample_rate: float = PROFILE_SAMPLE_RATE) -> None:
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread = 0
+        self._task_jobs: weakref.WeakKeyDictionary[asyncio.Task, str] = weakref.WeakKeyDictionary()
+        self._thread_jobs: dict[int, str] = {}
+        self._active: dict[str, JobProfile] = {}
+        self._sampler: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Tag tasks and executor work on this loop with their job. Call from the loop thread."""
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        previous = loop.get_task_factory()
+
+        def task_factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            context = kwargs.get("context")
+            job_id = context.get(current_job) if context is not None else current_job.get()
+            if job_id is not None:
+                self._task_jobs[task] = job_id
+            return task
+
+        loop.set_task_factory(task_factory)
+        loop.set_default_executor(_JobTaggingExecutor(self))
+
+    def should_profile(self, requested: bool) -> bool:
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    @contextmanager
+    def job(self, job_id: str, profile: bool = False) -> Iterator[JobProfile | None]:
+        """
+        Run the enclosed work as job_id: tasks and threads it starts are attributed to it.
+        With profile, yields the JobProfile that is sampled until the block exits.
+        """
+        self.install(asyncio.get_running_loop())
+        token = current_job.set(job_id)
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_jobs[task] = job_id
+        job_profile = JobProfile(job_id, self.interval) if profile else None
+        if job_profile:
+            with self._lock:
+                self._active[job_id] = job_profile
+                if self._sampler is None or not self._sampler.is_alive():
+                    self._sampler = threading.Thread(target=self._sample_while_active, name="job-profiler", daemon=True)
+                    self._sampler.start()
+        try:
+            yield job_profile
+        finally:
+            current_job.reset(token)
+            if job_profile:
+                with self._lock:
+                    self._active.pop(job_id, None)
+                job_profile.duration = time.monotonic() - job_profile.started
+                logger.info(f"[Job {job_id}] Profiled {job_profile.samples} samples over {job_profile.duration:.1f}s")
+
+    def job_of_running_task(self) -> str | None:
+        """Job of the task the loop is running right now; safe to call from another thread."""
+        task = asyncio.current_task(self._loop) if self._loop else None
+        return self._task_jobs.get(task) if task is not None else None
+
+    def _run_for_job(self, job_id: str, fn: Callable, *args, **kwargs) -> Any:
+        thread = threading.get_ident()
+        self._thread_jobs[thread] = job_id
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._thread_jobs.pop(thread, None)
+
+    def _sample_while_active(self) -> None:
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+            started = time.perf_counter()
+            try:
+                self._sample()
+            except Exception as e:
+                logger.debug(f"Profiler sample failed: {type(e).__name__}: {e}")
+            time.sleep(max(self.interval - (time.perf_counter() - started), self.interval / 2))
+
+    def _sample(self) -> None:
+        active = dict(self._active)
+        frames = sys._current_frames()
+        running = asyncio.current_task(self._loop) if self._loop else None
+
+        job_id = self._task_jobs.get(running) if running is not None else None
+        if job_id in active and self._loop_thread in frames:
+            active[job_id].add("cpu", _thread_stack(frames[self._loop_thread]))
+        for thread, job_id in list(self._thread_jobs.items()):
+            if job_id in active and thread in frames:
+                active[job_id].add("cpu", _thread_stack(frames[thread]))
+
+        # The task map is mutated on the loop thread; retry if it changed under us
+        for _ in range(3):
+            try:
+                tasks = list(self._task_jobs.items())
+                break
+            except RuntimeError:
+                tasks = []
+        for task, job_id in tasks:
+            if job_id in active and task is not running and not task.done():
+                active[job_id].add("wait", _await_stack(task.get_coro()))
+
+        for job_profile in active.values():
+            job_profile.samples += 1
+
+
+class LoopMonitor:
+    """
+    Event-loop lag monitor.
+
+    A task measures how late a short sleep wakes up (the loop's scheduling lag), and
+    a watchdog thread logs the loop thread's stack, plus the job it was running for,
+    while a single callback has held the loop longer than LOOP_STALL_MS.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_MS / 1000, stall: float = LOOP_STALL_MS / 1000) -> None:
+        self.interval = interval
+        self.stall = stall
+        self.stalls = 0
+        self._lags: deque[float] = deque(maxlen=600)
+        self._last_tick = time.monotonic()
+        self._reported_tick = 0.0
+        self._loop_thread = 0
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _tick(self) -> None:
+        while True:
+            started = time.monotonic()
+            self._last_tick = started
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - started - self.interval, 0.0)
+            self._lags.append(lag)
+            if lag > self.stall:
+                logger.warning(f"Event loop lagged {lag * 1000:.0f}ms")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            tick = self._last_tick
+            blocked = time.monotonic() - tick - self.interval
+            if blocked <= self.stall or tick == self._reported_tick or not self._task or self._task.done():
+                continue
+            # Report each stall once, with the stack that is holding the loop
+            self._reported_tick = tick
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(no frame)\n"
+            job_id = job_profiler.job_of_running_task()
+            logger.warning(
+                f"Event loop blocked for {blocked * 1000:.0f}ms"
+                f"{f' in job {job_id}' if job_id else ''}, at:\n{stack.rstrip()}"
+            )
+
+    def snapshot(self) -> dict:
+        lags = sorted(self._lags)
+        pick = lambda q: round(lags[min(len(lags) - 1, int(len(lags) * q))] * 1000, 1) if lags else 0.0
+        return {
+            "lag_p50_ms": pick(0.50),
+            "lag_p99_ms": pick(0.99),
+            "lag_max_ms": round(lags[-1] * 1000, 1) if lags else 0.0,
+            "stalls": self.stalls,
+        }
+
+
+# Where the loop runs a callback and where a worker thread enters job work; stacks start below these
+_ROOT_CODES = frozenset({asyncio.events.Handle._run.__code__, JobProfiler._run_for_job.__code__})
+
+# Process-wide profiler and loop monitor; the monitor is started in the app lifespan
+job_profiler = JobProfiler()
+loop_monitor = LoopMonitor()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlparse
+
+from sources import SOURCES
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_TICK_SECONDS = 30.0
+# Minimum gap between two scheduled job launches, so ticks never burst the LLM quota
+MIN_SPACING_SECONDS = float(os.getenv("SCHEDULER_MIN_SPACING_SECONDS", "120"))
+
+
+@dataclass
+class SourceTarget:
+    """How many markets to generate from one source, and how urgently."""
+    source_id: str
+    target_count: int = 5
+    priority: int = 0               # Higher runs first within a job
+    deadline: float | None = None   # Unix time; a source not finished by then is abandoned
+
+
+@dataclass
+class Schedule:
+    """A recurring generation job run by the service itself."""
+    id: str
+    targets: list[SourceTarget]
+    interval_seconds: float
+    pack: bool = False
+    enabled: bool = True
+    mode: str = "realtime"  # "deferred" runs LLM requests through the Batch API
+    next_run_at: float = 0.0
+    last_job_id: str | None = None
+
+    def hosts(self) -> set[str]:
+        return {
+            urlparse(SOURCES[t.source_id].seed_url).netloc
+            for t in self.targets if t.source_id in SOURCES
+        }
+
+
+# Built-in cadences; only run when SCHEDULER_ENABLED is set (Oracle triggers jobs otherwise)
+SCHEDULES: dict[str, Schedule] = {
+    "news": Schedule(
+        id="news",
+        targets=[SourceTarget("punch", target_count=10, priority=1), SourceTarget("bbc", target_count=5)],
+        interval_seconds=4 * 3600,
+        pack=True,
+    ),
+    "sports": Schedule(
+        id="sports",
+        targets=[SourceTarget("npfl", target_count=3)],
+        interval_seconds=12 * 3600,
+    ),
+}
+
+
+def initial_phase(schedule: Schedule) -> float:
+    """Stable per-schedule offset within its interval, so schedules don't all fire at startup."""
+    return zlib.crc32(schedule.id.encode()) % max(int(schedule.interval_seconds), 1)
+
+
+class Scheduler:
+    """
+    Runs due schedules from the registry.
+
+    At most one schedule launches per MIN_SPACING_SECONDS, and a schedule is
+    deferred while another running job crawls the same hosts or while its own
+    previous run is still going. launch(schedule) starts a job and returns a future
+    that resolves when it finishes; if it raises (e.g. the job queue is full) the
+    schedule stays due and is retried on a later tick.
+    """
+
+    def __init__(
+        self,
+        schedules: dict[str, Schedule],
+        launch: Callable[[Schedule], asyncio.Future],
+        tick_seconds: float = SCHEDULER_TICK_SECONDS,
+        min_spacing_seconds: float = MIN_SPACING_SECONDS
+    ) -> None:
+        self.schedules = schedules
+        self.launch = launch
+        self.tick_seconds = tick_seconds
+        self.min_spacing_seconds = min_spacing_seconds
+        self._running: dict[str, asyncio.Future] = {}
+        self._last_launch = float("-inf")
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        now = time.time()
+        for schedule in self.schedules.values():
+            if not schedule.next_run_at:
+                schedule.next_run_at = now + initial_phase(schedule)
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Scheduler started with {len(self.schedules)} schedule(s)")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def busy_hosts(self) -> set[str]:
+        self._running = {sid: t for sid, t in self._running.items() if not t.done()}
+        return {
+            host
+            for sid in self._running if sid in self.schedules
+            for host in self.schedules[sid].hosts()
+        }
+
+    def tick(self, now: float) -> Schedule | None:
+        """Launch the most overdue schedule that can run now, if any."""
+        if now - self._last_launch < self.min_spacing_seconds:
+            return None
+        busy = self.busy_hosts()
+        due = sorted(
+            (s for s in self.schedules.values() if s.enabled and s.next_run_at <= now),
+            key=lambda s: s.next_run_at
+        )
+        for schedule in due:
+            if schedule.id in self._running or schedule.hosts() & busy:
+                continue
+            try:
+                self._running[schedule.id] = self.launch(schedule)
+            except Exception as e:
+                logger.warning(f"Scheduler could not launch '{schedule.id}': {e}")
+                return None
+            self._last_launch = now
+            # Keep the original phase rather than drifting with launch delays
+            while schedule.next_run_at <= now:
+                schedule.next_run_at += schedule.interval_seconds
+            return schedule
+        return None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                schedule = self.tick(time.time())
+                if schedule:
+                    logger.info(f"Scheduler launched '{schedule.id}' (job {schedule.last_job_id})")
+            except Exception as e:
+                logger.error(f"Scheduler tick failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.tick_seconds)
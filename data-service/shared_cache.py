@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Shared by every worker on the host; empty SHARED_CACHE_DB disables the tier
+SHARED_CACHE_DB = os.getenv("SHARED_CACHE_DB", "data/shared_cache.sqlite3")
+SHARED_CACHE_MAX_BYTES = int(float(os.getenv("SHARED_CACHE_MAX_MB", "512")) * 1024 * 1024)
+# Eviction runs at most this often (in writes) per process
+EVICT_EVERY_WRITES = 50
+# Reads refresh an entry's recency at most this often, to keep reads mostly read-only
+TOUCH_INTERVAL_SECONDS = 60.0
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key for arbitrary JSON-serializable parts (prompts, URLs, link lists)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SharedCache:
+    """
+    Cross-process key-value cache in a SQLite WAL database.
+
+    Every uvicorn/PM2 worker on the host opens the same file, so HTTP responses,
+    extraction results, LLM responses and job state computed by one worker are
+    visible to the others. Values are JSON, namespaced, with a TTL; when the
+    database grows past max_bytes the least recently used entries are evicted.
+    SQLite's file locking makes concurrent access safe; each process (and each
+    fork) opens its own connection.
+    """
+
+    def __init__(self, path: str, max_bytes: int = SHARED_CACHE_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: sqlite3.Connection | None = None
+        self._pid = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not cross a fork
+        if self._conn is None or self._pid != os.getpid():
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            self._pid = os.getpid()
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT, key TEXT, value TEXT, size INTEGER,
+                    expires_at REAL, accessed_at REAL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE INDEX IF NOT EXISTS entries_by_access ON entries (accessed_at);
+            """)
+        return self._conn
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        """Cached value, or None if missing, expired or the cache is disabled."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+                if row is None or row[1] < now:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                if now - row[2] > TOUCH_INTERVAL_SECONDS:
+                    with conn:
+                        conn.execute(
+                            "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                            (now, namespace, key)
+                        )
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed ({namespace}): {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: float) -> None:
+        if not self.enabled:
+            return
+        payload = json.dumps(value, default=str)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                        (namespace, key, payload, len(payload), now + ttl_seconds, now)
+                    )
+                self._writes += 1
+                if self._writes % EVICT_EVERY_WRITES == 0:
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed ({namespace}): {e}")
+
+    def delete(self, namespace: str, key: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache delete failed ({namespace}): {e}")
+
+    def items(self, namespace: str) -> Iterator[tuple[str, Any]]:
+        """Live entries of a namespace (used for small namespaces such as job state)."""
+        if not self.enabled:
+            return iter(())
+        try:
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT key, value FROM entries WHERE namespace = ? AND expires_at >= ?",
+                    (namespace, time.time())
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache scan failed ({namespace}): {e}")
+            return iter(())
+        return ((key, json.loads(value)) for key, value in rows)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under 90% of max_bytes."""
+        with conn:
+            expired = conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            excess = total - int(self.max_bytes * 0.9)
+            victims: list[int] = []
+            if total > self.max_bytes:
+                for rowid, size in conn.execute("SELECT rowid, size FROM entries ORDER BY accessed_at"):
+                    if excess <= 0:
+                        break
+                    victims.append(rowid)
+                    excess -= size
+                conn.executemany("DELETE FROM entries WHERE rowid = ?", [(r,) for r in victims])
+        self.evicted += expired + len(victims)
+        if victims:
+            logger.info(f"Shared cache evicted {len(victims)} LRU and {expired} expired entries ({total} bytes before)")
+
+    def snapshot(self) -> dict:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+
+# Marks a key deleted while its delete is waiting to be written
+_DELETED = object()
+
+
+class SharedDict:
+    """
+    Write-through dict for small shared state (e.g. job status).
+    Local reads are served from memory; keys written by another worker are read from the cache.
+    Inside an event loop, writes reach the cache from a background task, latest value per key
+    first, so a write never blocks the loop on SQLite (or on eviction); see flush().
+    """
+
+    def __init__(self, cache: SharedCache, namespace: str, ttl_seconds: float) -> None:
+        self.cache = cache
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self._local: dict[str, Any] = {}
+        self._pending: dict[str, Any] = {}
+        self._writer: asyncio.Task | None = None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._local[key] = value
+        self._write(key, value)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key: str) -> None:
+        self._local.pop(key, None)
+        self._write(key, _DELETED)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._local:
+            return self._local[key]
+        if self._pending.get(key) is _DELETED:
+            return default
+        value = self.cache.get(self.namespace, key)
+        return default if value is None else value
+
+    def items(self) -> list[tuple[str, Any]]:
+        """Entries from every worker; this worker's copies win."""
+        merged = dict(self.cache.items(self.namespace))
+        merged.update(self._local)
+        return [(key, value) for key, value in merged.items() if self._pending.get(key) is not _DELETED]
+
+    def _write(self, key: str, value: Any) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._store(key, value)
+            return
+        self._pending[key] = value
+        if self._writer is None or self._writer.done():
+            self._writer = loop.create_task(self._drain())
+
+    def _store(self, key: str, value: Any) -> None:
+        if value is _DELETED:
+            self.cache.delete(self.namespace, key)
+        else:
+            self.cache.set(self.namespace, key, value, self.ttl_seconds)
+
+    async def _drain(self) -> None:
+        while self._pending:
+            key, value = next(iter(self._pending.items()))
+            await asyncio.to_thread(self._store, key, value)
+            # Keep the key pending if it was written again meanwhile; until then reads still see it
+            if self._pending.get(key) is value:
+                del self._pending[key]
+
+    async def flush(self) -> None:
+        """Wait until every write so far has reached the cache (e.g. before shutdown)."""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+
+# Process-wide handle on the host-wide cache
+shared_cache = SharedCache(SHARED_CACHE_DB)
@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from generator.prompts import NPFL_PROMPT, PUNCH_PROMPT, BBC_PROMPT
+from generator.prompts import NPFL_PROMPT, PUNCH_PROMPT, BBC_PROMPT, NEWS_PROMPT
 
 
 @dataclass
@@ -13,6 +13,19 @@ class DataSource:
     wait_selector: str | None = None
     wait_timeout_ms: int = 5000
     max_links_to_scrape: int = 6
+    max_depth: int = 1
+    max_pages: int | None = None
+    max_bytes: int = 20_000_000
+    max_page_bytes: int = 3_000_000
+    max_crawl_seconds: float = 300.0
+    discovery: str = "seed"  # "feed" reads RSS/sitemaps instead of rendering the seed page
+    feed_urls: list[str] = field(default_factory=list)
+    content_selector: str | None = None  # Extraction profile; hosts without one get learned containers
+    noise_selectors: list[str] = field(default_factory=list)
+    prefetch_links: int = 0  # Speculatively fetch this many likely links during link selection
+    extract_in_page: bool = False  # JS sources: only article text and links leave the browser
+    prompt_family: str | None = None  # Sources in the same family share packed LLM requests (see FAMILY_PROMPTS)
+    models: dict[str, str] = field(default_factory=dict)  # Per-stage model overrides, e.g. {"generation": "gpt-4o"}
 
 
 SOURCES: dict[str, DataSource] = {
@@ -21,13 +34,22 @@ SOURCES: dict[str, DataSource] = {
         seed_url="https://npfl.ng/fixtures",
         category="sports",
         prompt=NPFL_PROMPT,
+        max_depth=2,  # Fixture lists link out to match pages
+        max_pages=10,
+        prefetch_links=3,
     ),
     "punch": DataSource(
         id="punch",
         seed_url="https://punchng.com/topics/news/",
         category="news",
         prompt=PUNCH_PROMPT,
+        prompt_family="news",
+        discovery="feed",
+        feed_urls=["https://punchng.com/feed/"],
+        content_selector=".post-content, .entry-content",
+        noise_selectors=[".related-posts", ".jp-relatedposts", ".sharedaddy"],
         use_javascript=True,
+        extract_in_page=True,
         wait_selector="article",
         wait_timeout_ms=10000,
     ),
@@ -36,8 +58,25 @@ SOURCES: dict[str, DataSource] = {
         seed_url="https://www.bbc.com/news/topics/c50znx8v848t",
         category="news",
         prompt=BBC_PROMPT,
+        prompt_family="news",
+        discovery="feed",
+        feed_urls=["https://feeds.bbci.co.uk/news/world/africa/rss.xml"],
+        content_selector="article",
+        noise_selectors=['[data-component="links-block"]', '[data-component="topic-list"]'],
         use_javascript=True,
+        extract_in_page=True,
         wait_selector="article",
         wait_timeout_ms=10000,
     ),
 }
+
+
+# Prompts for packed requests, which carry several sources of a family at once
+FAMILY_PROMPTS: dict[str, str] = {
+    "news": NEWS_PROMPT,
+}
+
+
+def packed_prompt(source: DataSource) -> str:
+    """The prompt a source is generated with in packed mode: its family's, else its own."""
+    return FAMILY_PROMPTS.get(source.prompt_family or "", source.prompt)
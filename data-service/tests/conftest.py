@@ -0,0 +1,13 @@
+import os
+import sys
+
+# Keep tests off the on-disk stores and the network; set before any service module is imported
+os.environ.update({
+    "ARCHIVE_DIR": "",
+    "SHARED_CACHE_DB": "",
+    "FRONTIER_DB": ":memory:",
+    "LEASE_DB": ":memory:",
+    "SCHEDULER_ENABLED": "",
+})
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
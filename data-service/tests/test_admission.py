@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from admission import JobQueue, QueueFull, SlotUnavailable
+
+
+async def noop() -> None:
+    return None
+
+
+def test_lanes_run_by_priority_then_fifo():
+    async def scenario() -> list[str]:
+        queue = JobQueue(max_concurrent=1, max_pending=10)
+        order: list[str] = []
+        gate = asyncio.Event()
+        queue.submit("blocker", gate.wait)
+
+        def job(name: str):
+            async def run() -> None:
+                order.append(name)
+            return run
+
+        futures = [
+            queue.submit(name, job(name), lane=lane)
+            for name, lane in [("low1", "low"), ("normal1", "normal"), ("high1", "high"), ("normal2", "normal")]
+        ]
+        assert queue.position("high1") == 1
+        assert queue.position("low1") == 4
+        gate.set()
+        await asyncio.gather(*futures)
+        return order
+
+    assert asyncio.run(scenario()) == ["high1", "normal1", "normal2", "low1"]
+
+
+def test_full_queue_raises_with_retry_after():
+    async def scenario() -> None:
+        queue = JobQueue(max_concurrent=1, max_pending=2)
+        gate = asyncio.Event()
+        queue.submit("running", gate.wait)
+        queue.submit("a", noop)
+        queue.submit("b", noop)
+        with pytest.raises(QueueFull) as excinfo:
+            queue.submit("c", noop)
+        assert 5 <= excinfo.value.retry_after <= 600
+        assert queue.stats()["rejected"] == 1
+        assert queue.stats()["pending"] == 2
+        gate.set()
+
+    asyncio.run(scenario())
+
+
+def test_low_lane_only_gets_half_the_queue():
+    async def scenario() -> None:
+        queue = JobQueue(max_concurrent=0, max_pending=4)
+        queue.submit("low1", noop, lane="low")
+        queue.submit("low2", noop, lane="low")
+        with pytest.raises(QueueFull):
+            queue.submit("low3", noop, lane="low")
+        queue.submit("normal", noop)
+
+    asyncio.run(scenario())
+
+
+def test_deferred_jobs_are_bounded():
+    async def scenario() -> None:
+        queue = JobQueue(max_concurrent=1, max_deferred=1)
+        gate = asyncio.Event()
+        done = queue.start_deferred("a", gate.wait)
+        with pytest.raises(QueueFull):
+            queue.start_deferred("b", gate.wait)
+        assert queue.stats()["deferred"] == 1
+        gate.set()
+        await done
+        assert queue.stats()["deferred"] == 0
+        await queue.start_deferred("b", noop)
+
+    asyncio.run(scenario())
+
+
+def test_run_in_slot_gives_up_after_max_wait():
+    async def scenario() -> None:
+        queue = JobQueue(max_concurrent=1, max_pending=5)
+        gate = asyncio.Event()
+        queue.submit("running", gate.wait)
+        with pytest.raises(SlotUnavailable):
+            await queue.run_in_slot("deferred", noop, max_wait=0.05)
+        assert queue.stats()["pending"] == 0
+
+        gate.set()
+        await asyncio.sleep(0)
+
+        async def work() -> str:
+            assert queue.stats()["running"] == 1
+            return "done"
+
+        assert await queue.run_in_slot("deferred", work, max_wait=1) == "done"
+
+    asyncio.run(scenario())
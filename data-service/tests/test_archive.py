@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+import pytest
+import zstandard
+
+import crawler
+from crawler import archive, fetcher
+from crawler.archive import CrawlArchive, start_archive
+from crawler.config import CrawlConfig
+from shared_cache import SharedCache
+
+URL = "https://origin.test/news/story"
+HTML = "<html><body><article><p>" + "The vote is scheduled for next week. " * 20 + "</p></article></body></html>"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch) -> CrawlArchive:
+    """A real archive and shared cache in tmp_path, and an origin that counts its requests."""
+    crawl_archive = CrawlArchive(str(tmp_path / "archive"))
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", crawl_archive.directory)
+    monkeypatch.setattr(archive, "crawl_archive", crawl_archive)
+    monkeypatch.setattr(crawler, "shared_cache", cache)
+    monkeypatch.setattr(fetcher, "shared_cache", cache)
+
+    crawl_archive.requests = 0
+    crawl_archive.extractions = 0
+    extract_article = crawler.extract_article
+
+    def counting_extract(*args):
+        crawl_archive.extractions += 1
+        return extract_article(*args)
+
+    monkeypatch.setattr(crawler, "extract_article", counting_extract)
+
+    def origin(request: httpx.Request) -> httpx.Response:
+        crawl_archive.requests += 1
+        return httpx.Response(203, headers={"content-type": "text/html", "x-origin": "1"}, text=HTML)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(origin))
+    monkeypatch.setattr(crawler, "get_http_client", lambda: client)
+    return crawl_archive
+
+
+async def archived_job(job_id: str):
+    start_archive(job_id)
+    return await crawler._fetch_article(CrawlConfig(seed_url="https://origin.test/"), URL, "https://origin.test/", 1, None)
+
+
+def test_cached_article_is_archived_from_its_cached_html(store):
+    first = asyncio.run(archived_job("job-1"))
+    second = asyncio.run(archived_job("job-2"))
+
+    assert store.requests == 1
+    assert store.extractions == 1
+    assert second.text == first.text
+    [page] = store.pages("job-2")
+    assert page.url == URL and page.status == 203
+    assert store.read_html(page) == HTML
+
+
+def test_http_cache_hit_archives_the_original_response(store):
+    async def fetch(job_id: str) -> str | None:
+        start_archive(job_id)
+        html, _ = await fetcher.fetch_page(crawler.get_http_client(), URL)
+        return html
+
+    assert asyncio.run(fetch("job-1")) == asyncio.run(fetch("job-2")) == HTML
+    assert store.requests == 1
+    [page] = store.pages("job-2")
+    assert page.status == 203
+    with open(f"{store.directory}/{page.file}", "rb") as f:
+        f.seek(page.offset)
+        record = zstandard.ZstdDecompressor().decompress(f.read(page.length))
+    assert b"x-origin: 1\r\n" in record
@@ -0,0 +1,71 @@
+import asyncio
+import types
+
+import pytest
+
+from crawler import browser_engine
+from crawler.browser_engine import BrowserEngine, BrowserSlot
+
+
+class FakeBrowser:
+    """Enough of a Playwright Browser: closing or crashing fires "disconnected"."""
+
+    def __init__(self) -> None:
+        self.connected = True
+        self.handlers: list = []
+
+    def on(self, event: str, handler) -> None:
+        self.handlers.append(handler)
+
+    def remove_listener(self, event: str, handler) -> None:
+        self.handlers.remove(handler)
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def crash(self) -> None:
+        self.connected = False
+        for handler in list(self.handlers):
+            handler(self)
+
+    async def close(self) -> None:
+        if self.connected:
+            self.crash()
+
+
+@pytest.fixture
+def farm(monkeypatch) -> BrowserSlot:
+    async def launch(**kwargs) -> FakeBrowser:
+        return FakeBrowser()
+
+    playwright = types.SimpleNamespace(firefox=types.SimpleNamespace(launch=launch))
+    slot = BrowserSlot(index=0)
+    monkeypatch.setattr(BrowserEngine, "_playwright", playwright)
+    monkeypatch.setattr(BrowserEngine, "_slots", [slot])
+    return slot
+
+
+def render(times: int = 1) -> None:
+    async def run() -> None:
+        for _ in range(times):
+            BrowserEngine.release(await BrowserEngine.acquire())
+    asyncio.run(run())
+
+
+def test_recycling_is_not_counted_as_a_crash(farm, monkeypatch):
+    monkeypatch.setattr(browser_engine, "MAX_RENDERS", 2)
+    render(3)
+    assert farm.restarts == 1
+    assert farm.crashes == 0
+
+
+def test_disconnect_counts_as_a_crash_and_relaunches(farm):
+    render()
+    first = farm.browser
+    first.crash()
+    assert farm.crashes == 1
+
+    render()
+    assert farm.browser is not first
+    assert farm.restarts == 1
+    assert farm.crashes == 1
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+
+import pytest
+
+from generator import dedupe_proposals
+from generator.similarity import DedupeStats, RecentMarketIndex, SimilarityIndex, question_features, similarity
+from shared_cache import SharedCache
+
+
+@dataclass
+class Proposal:
+    question: str
+    description: str = ""
+
+
+def test_synonyms_and_stopwords_normalize():
+    a = question_features("Will Enyimba beat Rivers United on Sunday?")
+    b = question_features("Will Enyimba defeat Rivers United on Sunday?")
+    assert a == b
+
+
+def test_word_order_keeps_opposite_outcomes_apart():
+    a = question_features("Will Enyimba beat Rivers United?")
+    b = question_features("Will Rivers United beat Enyimba?")
+    assert similarity(a, b) < 0.6
+
+
+def test_index_returns_best_match_above_threshold():
+    index = SimilarityIndex(threshold=0.6)
+    index.add(0, "Will Enyimba beat Rivers United on Sunday?")
+    index.add(1, "Will the CBN raise interest rates in March?")
+    key, score = index.query("Will Enyimba defeat Rivers United this Sunday?")
+    assert key == 0
+    assert score >= 0.6
+    assert index.query("Will Tinubu sign the budget before April?") is None
+
+    index.remove(0)
+    assert index.query("Will Enyimba defeat Rivers United this Sunday?") is None
+
+
+@pytest.mark.parametrize("threshold, merged", [(0.3, True), (0.99, False)])
+def test_threshold_decides_near_duplicates(threshold, merged):
+    proposals = [
+        Proposal("Will Enyimba beat Rivers United on Sunday?"),
+        Proposal("Will Enyimba beat Rivers United in Aba on Sunday?"),
+    ]
+    stats = DedupeStats()
+    unique = dedupe_proposals(proposals, threshold=threshold, stats=stats)
+    assert len(unique) == (1 if merged else 2)
+    assert stats.near_duplicates == (1 if merged else 0)
+
+
+def test_exact_duplicates_and_richer_description_kept():
+    proposals = [
+        Proposal("Will Enyimba beat Rivers United?", "short"),
+        Proposal("will enyimba beat rivers united?", "ignored"),
+        Proposal("Will Enyimba defeat Rivers United?", "a longer description"),
+    ]
+    stats = DedupeStats()
+    unique = dedupe_proposals(proposals, threshold=0.6, stats=stats)
+    assert stats.exact_duplicates == 1
+    assert stats.near_duplicates == 1
+    assert [(p.question, p.description) for p in unique] == [
+        ("Will Enyimba defeat Rivers United?", "a longer description")
+    ]
+
+
+def test_recent_markets_are_shared_across_workers(tmp_path):
+    cache = SharedCache(str(tmp_path / "shared.sqlite3"))
+    first, second = RecentMarketIndex(cache), RecentMarketIndex(cache)
+    first.add(["Will Enyimba beat Rivers United on Sunday?"])
+
+    assert first.contains("Will Enyimba defeat Rivers United on Sunday?", 0.6)
+    assert not second.contains("Will Enyimba defeat Rivers United on Sunday?", 0.6)
+    assert second.sync() == 1
+    assert second.sync() == 0
+    assert second.contains("Will Enyimba defeat Rivers United on Sunday?", 0.6)
+    assert not second.contains("Will the CBN raise interest rates in March?", 0.6)
+
+
+def test_recent_markets_expire():
+    index = RecentMarketIndex(ttl_seconds=0.0)
+    index.add(["Will Enyimba beat Rivers United?"])
+    assert not index.contains("Will Enyimba beat Rivers United?", 0.6)
@@ -0,0 +1,77 @@
+import pytest
+
+from crawler.frontier import CrawlBudget, CrawlFrontier, FrontierStore, canonicalize_url
+
+
+@pytest.mark.parametrize("url, canonical", [
+    ("HTTPS://Example.COM:443/News/?b=2&a=1#top", "https://example.com/News?a=1&b=2"),
+    ("http://example.com:80//sport//story/", "http://example.com/sport/story"),
+    ("https://example.com:8443/a", "https://example.com:8443/a"),
+    ("https://example.com/a?utm_source=x&fbclid=y&id=5&ref=home", "https://example.com/a?id=5"),
+    ("https://example.com", "https://example.com/"),
+])
+def test_canonicalize_url(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+def make_frontier(store: FrontierStore, budget: CrawlBudget | None = None, max_depth: int = 1) -> CrawlFrontier:
+    return CrawlFrontier("src", store, budget or CrawlBudget(max_pages=10), max_depth=max_depth)
+
+
+def test_push_dedupes_canonical_forms_and_depth():
+    frontier = make_frontier(FrontierStore(":memory:"))
+    assert frontier.push("https://example.com/a?utm_source=x", 1)
+    assert not frontier.push("https://EXAMPLE.com/a/#comments", 1)
+    assert not frontier.push("https://example.com/deep", 2)
+    assert len(frontier) == 1
+
+
+def test_pop_orders_by_priority_and_carried_last():
+    frontier = make_frontier(FrontierStore(":memory:"))
+    frontier.push("https://example.com/carried", 1, priority=9.0, carried=True)
+    frontier.push("https://example.com/low", 1, priority=1.0)
+    frontier.push("https://example.com/high", 1, priority=5.0)
+    assert [frontier.pop().url for _ in range(3)] == [
+        "https://example.com/high", "https://example.com/low", "https://example.com/carried"
+    ]
+    assert frontier.pop() is None
+
+
+@pytest.mark.parametrize("budget", [
+    CrawlBudget(max_pages=2),
+    CrawlBudget(max_pages=10, max_bytes=1500),
+])
+def test_pop_stops_when_budget_is_spent(budget):
+    frontier = make_frontier(FrontierStore(":memory:"), budget)
+    for i in range(5):
+        frontier.push(f"https://example.com/{i}", 1)
+    fetched = 0
+    while (entry := frontier.pop()) is not None:
+        frontier.mark_fetched(entry.url, 1000)
+        fetched += 1
+    assert fetched == 2
+    assert budget.exhausted() is not None
+    assert len(frontier) == 3
+
+
+def test_time_budget():
+    budget = CrawlBudget(max_pages=10, max_seconds=0.0)
+    assert budget.exhausted() == "time budget (0s)"
+
+
+def test_seen_and_leftovers_carry_over_to_the_next_job():
+    store = FrontierStore(":memory:")
+    first = make_frontier(store, CrawlBudget(max_pages=1))
+    first.push("https://example.com/a", 1, priority=2.0)
+    first.push("https://example.com/b", 1, priority=1.0)
+    entry = first.pop()
+    first.mark_fetched(entry.url, 100, final_url="https://example.com/a-final")
+    assert first.pop() is None
+    first.save()
+
+    second = make_frontier(store)
+    assert second.is_seen("https://example.com/a")
+    assert second.is_seen("https://example.com/a-final?utm_medium=rss")
+    assert not second.push("https://example.com/a", 1)
+    assert second.resume() == 1
+    assert second.pop().url == "https://example.com/b"
@@ -0,0 +1,139 @@
+import pytest
+
+from crawler import health
+from crawler.health import CLOSED, HALF_OPEN, OPEN, HostHealthRegistry
+
+URL = "https://origin.test/news/story"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(health, "time", clock)
+    return clock
+
+
+def trip(registry: HostHealthRegistry) -> None:
+    for _ in range(health.FAILURE_THRESHOLD):
+        registry.record_failure(URL, "timeout")
+
+
+def test_opens_after_consecutive_failures(clock):
+    registry = HostHealthRegistry()
+    for _ in range(health.FAILURE_THRESHOLD - 1):
+        registry.record_failure(URL, "timeout")
+    assert registry.allow(URL)
+
+    registry.record_failure(URL, "timeout")
+    assert registry.is_open(URL)
+    assert not registry.allow(URL)
+    assert registry.snapshot()["origin.test"]["state"] == OPEN
+
+
+def test_success_resets_failure_count(clock):
+    registry = HostHealthRegistry()
+    for _ in range(health.FAILURE_THRESHOLD - 1):
+        registry.record_failure(URL, "timeout")
+    registry.record_success(URL, 0.1)
+    registry.record_failure(URL, "timeout")
+    assert registry.allow(URL)
+
+
+def test_half_open_lets_one_probe_through(clock):
+    registry = HostHealthRegistry()
+    trip(registry)
+    clock.now += health.COOLDOWN_SECONDS
+
+    assert not registry.is_open(URL)
+    assert registry.allow(URL)
+    assert registry.snapshot()["origin.test"]["state"] == HALF_OPEN
+    assert not registry.allow(URL)
+    assert registry.is_open(URL)
+
+
+def test_probe_success_closes(clock):
+    registry = HostHealthRegistry()
+    trip(registry)
+    clock.now += health.COOLDOWN_SECONDS
+    assert registry.allow(URL)
+
+    registry.record_success(URL, 0.2)
+    assert registry.snapshot()["origin.test"]["state"] == CLOSED
+    assert registry.allow(URL)
+    assert registry.allow(URL)
+
+
+def test_probe_failure_reopens(clock):
+    registry = HostHealthRegistry()
+    trip(registry)
+    clock.now += health.COOLDOWN_SECONDS
+    assert registry.allow(URL)
+
+    registry.record_failure(URL, "HTTP 503")
+    assert registry.snapshot()["origin.test"]["state"] == OPEN
+    assert not registry.allow(URL)
+    clock.now += health.COOLDOWN_SECONDS
+    assert registry.allow(URL)
+
+
+def test_abandoned_probe_is_released(clock):
+    registry = HostHealthRegistry()
+    trip(registry)
+    clock.now += health.COOLDOWN_SECONDS
+    assert registry.allow(URL)  # Probe taken, never recorded
+
+    clock.now += health.PROBE_TIMEOUT_SECONDS - 1
+    assert not registry.allow(URL)
+    clock.now += 1
+    assert not registry.is_open(URL)
+    assert registry.allow(URL)
+    assert not registry.allow(URL)
+
+
+def test_timeout_follows_p95_within_bounds(clock):
+    registry = HostHealthRegistry()
+    assert registry.timeout_for(URL, 30) == 30
+    for _ in range(health.MIN_SAMPLES):
+        registry.record_success(URL, 4.0)
+    assert registry.timeout_for(URL, 30) == 4.0 * health.TIMEOUT_FACTOR
+    assert registry.timeout_for(URL, 6) == 6
+    for _ in range(50):
+        registry.record_success(URL, 0.1)
+    assert registry.timeout_for(URL, 30) == health.MIN_TIMEOUT_SECONDS
+
+
+def test_fetch_counts_rate_limited_json_as_failure(clock, monkeypatch):
+    import asyncio
+
+    import httpx
+
+    from crawler import fetcher
+
+    registry = HostHealthRegistry()
+    monkeypatch.setattr(fetcher, "host_health", registry)
+    responses = {
+        "/limited": httpx.Response(429, json={"error": "slow down"}),
+        "/feed.json": httpx.Response(200, json={"items": []}),
+    }
+    transport = httpx.MockTransport(lambda request: responses[request.url.path])
+
+    async def fetch(path: str) -> tuple[str | None, str | None]:
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await fetcher.fetch_page(client, f"https://origin.test{path}")
+
+    for _ in range(health.FAILURE_THRESHOLD - 1):
+        assert asyncio.run(fetch("/limited")) == (None, None)
+    assert registry.snapshot()["origin.test"]["failures"] == health.FAILURE_THRESHOLD - 1
+    assert registry.snapshot()["origin.test"]["successes"] == 0
+
+    # A 2xx non-HTML response means the host is healthy
+    assert asyncio.run(fetch("/feed.json")) == (None, None)
+    assert registry.snapshot()["origin.test"]["successes"] == 1
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from leases import LeaseLost, LeaseManager, LeaseUnavailable, SQLiteLeaseBackend
+
+
+@pytest.fixture
+def backend(tmp_path) -> SQLiteLeaseBackend:
+    return SQLiteLeaseBackend(str(tmp_path / "leases.sqlite3"))
+
+
+def test_acquire_is_exclusive_until_release(backend):
+    assert backend.acquire("source:a", "r1", 60)
+    assert backend.acquire("source:a", "r1", 60)  # Re-entrant for the same owner
+    assert not backend.acquire("source:a", "r2", 60)
+    assert backend.holder("source:a") == "r1"
+
+    backend.release("source:a", "r2")  # Not the owner: no effect
+    assert backend.holder("source:a") == "r1"
+    backend.release("source:a", "r1")
+    assert backend.holder("source:a") is None
+    assert backend.acquire("source:a", "r2", 60)
+
+
+def test_expired_lease_is_taken_over(backend):
+    assert backend.acquire("source:a", "r1", 0.05)
+    time.sleep(0.1)
+    assert backend.holder("source:a") is None
+    assert backend.acquire("source:a", "r2", 60)
+    assert not backend.renew("source:a", "r1", 60)
+    assert backend.renew("source:a", "r2", 60)
+    assert set(backend.leases()) == {"source:a"}
+
+
+def test_manager_runs_work_and_releases(backend):
+    manager = LeaseManager(backend, owner="r1", ttl_seconds=60)
+
+    async def work() -> str:
+        assert backend.holder("source:a").startswith("r1/")
+        return "crawled"
+
+    assert asyncio.run(manager.run("source:a", work())) == "crawled"
+    assert backend.holder("source:a") is None
+
+
+def test_manager_raises_when_held_elsewhere(backend):
+    backend.acquire("source:a", "r2", 60)
+    manager = LeaseManager(backend, owner="r1", ttl_seconds=60)
+
+    async def work() -> None:
+        raise AssertionError("must not run")
+
+    with pytest.raises(LeaseUnavailable) as excinfo:
+        asyncio.run(manager.run("source:a", work()))
+    assert excinfo.value.holder == "r2"
+
+
+def test_manager_cancels_work_when_lease_is_lost(backend):
+    manager = LeaseManager(backend, owner="r1", ttl_seconds=0.15)
+    cancelled = False
+
+    async def work() -> None:
+        nonlocal cancelled
+        try:
+            # Another replica takes over while we run
+            backend._write("UPDATE leases SET owner = 'r2', expires_at = ? WHERE name = 'source:a'", (time.time() + 60,))
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    with pytest.raises(LeaseLost):
+        asyncio.run(manager.run("source:a", work()))
+    assert cancelled
+    assert backend.holder("source:a") == "r2"
+
+
+def test_manager_excludes_a_second_job_in_the_same_replica(backend):
+    manager = LeaseManager(backend, owner="r1", ttl_seconds=60)
+
+    async def scenario() -> None:
+        started = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def long_job() -> str:
+            started.set()
+            await finish.wait()
+            return "first"
+
+        async def second_job() -> None:
+            raise AssertionError("must not run while the first job holds the lease")
+
+        first = asyncio.create_task(manager.run("source:a", long_job()))
+        await started.wait()
+        holder = backend.holder("source:a")
+
+        with pytest.raises(LeaseUnavailable):
+            await manager.run("source:a", second_job())
+        # The refused job must not have released the running job's lease
+        assert backend.holder("source:a") == holder
+
+        finish.set()
+        assert await first == "first"
+        assert backend.holder("source:a") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+import main
+from crawler.config import CrawlResult, PageSegment
+from generator.prompts import NEWS_PROMPT, compile_prompt
+from sources import SOURCES, packed_prompt
+
+FUTURE = "2099-01-01T00:00:00Z"
+
+
+class RecordingCompletions:
+    """Fake streamed LLM: one market per page in the corpus, and a log of every request."""
+
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        corpus = kwargs["messages"][-1]["content"]
+        urls = [line[len("--- PAGE: "):-len(" ---")] for line in corpus.splitlines() if line.startswith("--- PAGE: ")]
+        content = json.dumps({"markets": [
+            {
+                "question": f"Will the event at {url} happen?",
+                "description": "d",
+                "source_url": url,
+                "category": "news",
+                "betting_closes_at": FUTURE,
+                "resolves_at": "2099-01-02T00:00:00Z",
+                "resolution_context": "r",
+            }
+            for url in urls
+        ]})
+
+        async def events():
+            delta = types.SimpleNamespace(content=content)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+        return events()
+
+
+@pytest.fixture
+def completions(monkeypatch) -> RecordingCompletions:
+    completions = RecordingCompletions()
+    monkeypatch.setattr(main, "openai_client", types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions)))
+
+    async def crawl_source(source):
+        host = source.seed_url.split("/")[2]
+        text = "The vote is scheduled for 2099-01-01."
+        return CrawlResult(pages=[PageSegment(url=f"https://{host}/story-{i}", text=text) for i in range(2)], errors=[])
+
+    monkeypatch.setattr(main, "crawl_source", crawl_source)
+    return completions
+
+
+def test_family_members_share_the_family_prompt():
+    assert packed_prompt(SOURCES["punch"]) == packed_prompt(SOURCES["bbc"]) == NEWS_PROMPT
+    assert packed_prompt(SOURCES["npfl"]) == SOURCES["npfl"].prompt
+
+
+def test_same_family_sources_produce_one_packed_request(completions):
+    sources = [(SOURCES[source_id], main.SourceTarget(source_id=source_id, target_count=5)) for source_id in ("punch", "bbc")]
+    errors = []
+    markets = asyncio.run(main.process_sources_packed("job", sources, errors))
+
+    assert errors == []
+    assert len(completions.requests) == 1
+    corpus = completions.requests[0]["messages"][-1]["content"]
+    assert "=== SOURCE: punch ===" in corpus and "=== SOURCE: bbc ===" in corpus
+    assert completions.requests[0]["messages"][0]["content"] == compile_prompt(NEWS_PROMPT).prefix
+    # Markets are split back out to both sources
+    assert {m.source_url.split("/")[2] for m in markets} == {"punchng.com", "www.bbc.com"}
@@ -0,0 +1,32 @@
+import asyncio
+
+import crawler
+from crawler.config import CrawlConfig
+from crawler.prefetch import Prefetcher
+
+URL = "https://origin.test/news/story"
+HTML = "<html><body><article><p>" + "The vote is scheduled for next week. " * 20 + "</p></article></body></html>"
+
+
+def test_failed_prefetch_is_fetched_again(monkeypatch):
+    fetched: list[str] = []
+
+    async def failed_prefetch(url: str, max_bytes: int):
+        return None, None
+
+    async def fetch(config, url, referer, depth, max_bytes=None):
+        fetched.append(url)
+        return HTML, url
+
+    monkeypatch.setattr(crawler, "_fetch", fetch)
+
+    async def scenario():
+        prefetcher = Prefetcher(failed_prefetch)
+        prefetcher.start([URL])
+        article = await crawler._fetch_article(CrawlConfig(seed_url="https://origin.test/"), URL, "https://origin.test/", 1, None, prefetcher)
+        return prefetcher, article
+
+    prefetcher, article = asyncio.run(scenario())
+    assert fetched == [URL]
+    assert article is not None and "scheduled for next week" in article.text
+    assert prefetcher.used == 0
@@ -0,0 +1,31 @@
+import asyncio
+
+from shared_cache import SharedCache, SharedDict
+
+
+def test_shared_dict_writes_through_in_the_background(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    local = SharedDict(cache, "jobs", 60)
+    other_worker = SharedDict(cache, "jobs", 60)
+
+    async def scenario() -> None:
+        local["a"] = {"status": "queued"}
+        local["a"] = {"status": "processing"}
+        local["b"] = {"status": "queued"}
+        assert local["a"] == {"status": "processing"}  # Served from memory before the write lands
+        await local.flush()
+        assert other_worker.get("a") == {"status": "processing"}
+
+        del local["b"]
+        assert "b" not in local
+        assert [key for key, _ in local.items()] == ["a"]
+        await local.flush()
+        assert other_worker.get("b") is None
+
+    asyncio.run(scenario())
+
+
+def test_shared_dict_writes_directly_outside_a_loop(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    SharedDict(cache, "jobs", 60)["a"] = 1
+    assert SharedDict(cache, "jobs", 60).get("a") == 1
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+import generator
+from generator import generate_chunk, parse_markets, process_chunk
+from generator.stream_parser import MarketStreamParser
+from shared_cache import SharedCache
+
+
+def market(question: str, **fields) -> dict:
+    return {
+        "question": question,
+        "description": "d",
+        "source_url": "https://origin.test/a",
+        "category": "news",
+        "betting_closes_at": "2099-01-01T00:00:00Z",
+        "resolves_at": "2099-01-02T00:00:00Z",
+        "resolution_context": "r",
+        **fields,
+    }
+
+
+def feed_in_pieces(parser: MarketStreamParser, text: str, size: int) -> list[dict]:
+    return [m for i in range(0, len(text), size) for m in parser.feed(text[i:i + size])]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_yields_each_market_as_it_closes(size):
+    markets = [market("Will A win?"), market("Will B {draw} \"again\"?", description="braces } and [brackets]")]
+    parser = MarketStreamParser()
+    assert feed_in_pieces(parser, json.dumps({"markets": markets}), size) == markets
+    assert parser.complete
+    assert parser.objects_seen == 2
+
+
+def test_bare_array_and_nested_objects():
+    markets = [{"question": "Q?", "meta": {"inner": [1, {"x": 2}]}}]
+    parser = MarketStreamParser()
+    assert parser.feed(json.dumps(markets)) == markets
+    assert parser.complete
+
+
+def test_truncated_tail_keeps_closed_markets():
+    text = json.dumps({"markets": [market("Will A win?"), market("Will B win?")]})
+    parser = MarketStreamParser()
+    found = parser.feed(text[:text.index("Will B") + 10])
+    assert [m["question"] for m in found] == ["Will A win?"]
+    assert not parser.complete
+
+
+def test_malformed_object_is_skipped():
+    parser = MarketStreamParser()
+    found = parser.feed('{"markets": [{"question": "A?" "x": 1}, {"question": "B?"}]}')
+    assert found == [{"question": "B?"}]
+    assert parser.parse_errors == 1
+
+
+def test_parse_markets_salvages_valid_markets():
+    text = json.dumps({"markets": [
+        market("Will A win?"),
+        market("Not a question"),
+        market("Will C win?", betting_closes_at=None),
+        market(7),
+        market("Will E win?"),
+    ]})
+    assert [p.question for p in parse_markets(text)] == ["Will A win?", "Will E win?"]
+    assert [p.question for p in parse_markets(text[:text.index("Will E")])] == ["Will A win?"]
+    assert parse_markets(None) == []
+
+
+class FailingStream:
+    """Streams content in pieces, then raises mid-stream."""
+
+    def __init__(self, text: str, fail_at: int) -> None:
+        self.text = text
+        self.fail_at = fail_at
+
+    async def create(self, **kwargs):
+        async def events():
+            for i in range(0, self.fail_at, 5):
+                delta = types.SimpleNamespace(content=self.text[i:min(i + 5, self.fail_at)])
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+            raise ConnectionError("stream reset")
+        return events()
+
+
+def run_chunk(text: str, fail_at: int):
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=FailingStream(text, fail_at)))
+    return asyncio.run(process_chunk(client, "corpus", "{current_date}\n{corpus}", "gpt-4o-mini", "2099-01-01"))
+
+
+def test_process_chunk_keeps_markets_before_a_stream_error():
+    text = json.dumps({"markets": [market("Will A win?"), market("Will B win?")]})
+    proposals = run_chunk(text, text.index("Will B"))
+    assert [p.question for p in proposals] == ["Will A win?"]
+
+
+def test_process_chunk_raises_when_nothing_was_salvaged():
+    text = json.dumps({"markets": [market("Will A win?")]})
+    with pytest.raises(ConnectionError):
+        run_chunk(text, 10)
+
+
+
+class ScriptedStream:
+    """Streams one scripted response per request; a response given as (text, fail_at) raises at fail_at."""
+
+    def __init__(self, *responses: str | tuple[str, int]) -> None:
+        self.responses = list(responses)
+
+    async def create(self, **kwargs):
+        response = self.responses.pop(0)
+        if isinstance(response, tuple):
+            return await FailingStream(*response).create(**kwargs)
+
+        async def events():
+            delta = types.SimpleNamespace(content=response)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+        return events()
+
+
+def test_salvaged_markets_are_not_cached_and_refresh_bypasses_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "shared_cache", SharedCache(str(tmp_path / "cache.sqlite3")))
+    first = json.dumps({"markets": [market("Will A win?"), market("Will B win?")]})
+    second = json.dumps({"markets": [market("Will C win?")]})
+    stream = ScriptedStream((first, first.index("Will B")), first, second)
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=stream))
+
+    def generate(refresh: bool = False) -> list[str]:
+        proposals = asyncio.run(generate_chunk(client, "corpus", "{current_date}\n{corpus}", "2099-01-01", refresh=refresh))
+        return [p.question for p in proposals]
+
+    assert generate() == ["Will A win?"]
+    # The salvaged partial was not cached, so this asks the model again
+    assert generate() == ["Will A win?", "Will B win?"]
+    assert generate() == ["Will A win?", "Will B win?"]
+    assert generate(refresh=True) == ["Will C win?"]
+    assert generate() == ["Will C win?"]
+    assert stream.responses == []
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from crawler.config import PageSegment
+from generator.temporal import PrefilterStats, find_dates, prefilter_page
+
+# A Wednesday
+REFERENCE = date(2026, 3, 11)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Kick-off is on 2026-03-14.", date(2026, 3, 14)),
+    ("Polls open 14/03/2026 nationwide.", date(2026, 3, 14)),
+    ("The match on 14th March 2026 in Aba.", date(2026, 3, 14)),
+    ("Due on March 14, 2026.", date(2026, 3, 14)),
+    ("The final is on 14 March.", date(2026, 3, 14)),
+    ("Tomorrow the court rules.", date(2026, 3, 12)),
+    ("Yesterday the senate voted.", date(2026, 3, 10)),
+    ("The vote is this Friday.", date(2026, 3, 13)),
+    ("They meet next Wednesday.", date(2026, 3, 18)),
+    ("It happened last Monday.", date(2026, 3, 9)),
+])
+def test_find_dates_resolves_against_reference(text, expected):
+    assert find_dates(text, REFERENCE) == [expected]
+
+
+def test_yearless_dates_stay_near_the_reference():
+    assert find_dates("Due on 5 January.", date(2026, 12, 20)) == [date(2027, 1, 5)]
+    assert find_dates("It began on 20 December.", date(2027, 1, 5)) == [date(2026, 12, 20)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Results due Sept. 14, 2026.", [date(2026, 9, 14)]),
+    ("The recall vote is set for 14 Apr.", [date(2026, 4, 14)]),
+    ("Over 3 decades of rule.", []),
+    ("The market 5 miles away.", []),
+    ("He scored 2 marvellous goals in June.", []),
+    ("Section 12 of the Decree.", []),
+])
+def test_month_names_must_be_whole_words(text, expected):
+    assert find_dates(text, REFERENCE) == expected
+
+
+def test_bare_weekday_and_invalid_dates_are_ignored():
+    assert find_dates("The club trained on Saturday.", REFERENCE) == []
+    assert find_dates("Filed on 2026-02-30.", REFERENCE) == []
+
+
+NOW = datetime(2026, 3, 11, 12, tzinfo=timezone.utc)
+
+
+def page(text: str, published: datetime | None = None) -> PageSegment:
+    return PageSegment(url="https://origin.test/a", text=text, published=published)
+
+
+def test_prefilter_keeps_pages_with_upcoming_dates():
+    stats = PrefilterStats()
+    kept = prefilter_page(page("Enyimba host Rivers United on 2026-03-15."), NOW, stats)
+    assert kept is not None
+    assert stats.dropped == 0
+
+
+def test_prefilter_drops_stale_pages_without_future_dates():
+    stats = PrefilterStats()
+    stale = page("The ministry announced new rules.", published=NOW - timedelta(days=10))
+    assert prefilter_page(stale, NOW, stats) is None
+    assert stats.dropped == 1
+    assert stats.chars_avoided == len(stale)
+
+
+def test_prefilter_drops_past_only_reports_but_keeps_forward_wording():
+    assert prefilter_page(page("Rivers United won yesterday in Aba."), NOW) is None
+    assert prefilter_page(page("After yesterday's win, the club is set to sign a striker."), NOW) is not None
+    assert prefilter_page(page("No dates here at all."), NOW) is not None
+
+
+def test_prefilter_trims_long_pages_to_relevant_lines():
+    filler = ["Background paragraph about the league's history."] * 100
+    text = "\n".join(["Headline", *filler[:50], "The derby kicks off on 2026-03-15.", *filler[50:]])
+    stats = PrefilterStats()
+    trimmed = prefilter_page(page(text), NOW, stats)
+    assert trimmed.text.split("\n") == ["Headline", filler[0], "The derby kicks off on 2026-03-15.", filler[0]]
+    assert stats.trimmed == 1
+    assert stats.chars_avoided == len(text) - len(trimmed.text)